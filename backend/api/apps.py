@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'api'
\ No newline at end of file
+    name = 'api'
+
+    def ready(self):
+        from . import authcache  # noqa: F401  (registers invalidation signals)
+        from . import querystats  # noqa: F401  (instruments new DB connections)
@@ -0,0 +1,164 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, PermissionDenied, ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import availability_cache, availability_sql, busy_cache, metrics
+from .availability import availability_from_counts, choose_engine, compute_availability, parse_range, slot_count
+from .models import Event, Group, Membership, Schedule
+from .pagination import KeysetPage
+from .serializers import EventSerializer
+from .views import EventListCreateView, availability_params, availability_payload, expand_events, occurrence_page
+
+# Async counterparts of the availability and event list views (ASYNC_VIEWS).
+# They hold no ASGI thread while waiting on the database: queries use the
+# async ORM, cache/DB-bound helpers run through sync_to_async, and slot
+# computation and serialization run in worker threads off the event loop.
+# Responses and error bodies match the DRF views.
+
+def _cpu(fn):
+    return sync_to_async(fn, thread_sensitive=False)
+
+
+class AsyncAPIView(View):
+    """JWT-authenticated async view rendering DRF-style JSON errors."""
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+            if auth is None:
+                raise NotAuthenticated()
+            request.user = auth[0]
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return self.error(NotFound())
+        except APIException as exc:
+            return self.error(exc)
+
+    @staticmethod
+    def error(exc):
+        body = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = JsonResponse(body, status=exc.status_code, safe=False)
+        if isinstance(exc, NotAuthenticated):
+            response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
+
+
+class GroupAvailabilityAsyncView(AsyncAPIView):
+
+    async def get(self, request, group_id):
+        start, end, step, mode, min_people, engine, fmt = availability_params(request.GET)
+
+        group = await Group.objects.filter(
+            Q(id=group_id) & (Q(admin=request.user) | Q(memberships__user=request.user))
+        ).distinct().afirst()
+        if not group:
+            raise PermissionDenied("Not allowed")
+
+        tag = availability_cache.etag(group.id, group.availability_version, start, end, step, mode, min_people, engine, fmt)
+        if availability_cache.matches(tag, request.headers.get("If-None-Match")):
+            return self.cacheable(HttpResponseNotModified(), tag)
+        body = availability_cache.get(tag)
+        if body is not None:
+            return self.cacheable(JsonResponse(body), tag)
+
+        t0 = time.perf_counter()
+        active_ids, missing_ids, schedule_ids = [], [], []
+        async for mid, sid in Membership.objects.filter(group=group).values_list("id", "active_schedule_id"):
+            if sid is None:
+                missing_ids.append(mid)
+            else:
+                active_ids.append(mid)
+                schedule_ids.append(sid)
+        total_members = len(active_ids) + len(missing_ids)
+
+        if not active_ids:
+            grid, _ = availability_from_counts(start, end, step, [], 0, fmt=fmt)
+            body = availability_payload(step, mode, min_people, total_members, [], missing_ids, grid, [])
+            availability_cache.put(tag, body)
+            return self.cacheable(JsonResponse(body), tag)
+
+        cache_stats = {"hits": 0, "misses": 0}
+        events = None
+        if engine == "sql" and not await sync_to_async(availability_sql.has_series)(schedule_ids, start, end):
+            counts = await sync_to_async(availability_sql.busy_counts_sql)(start, end, step, schedule_ids)
+            t1 = time.perf_counter()
+            grid, all_free_blocks = await _cpu(availability_from_counts)(start, end, step, counts, len(active_ids), fmt=fmt)
+        else:
+            by_sched = await sync_to_async(busy_cache.window_intervals)(schedule_ids, start, end, stats=cache_stats)
+            events = sum(map(len, by_sched.values()))
+            t1 = time.perf_counter()
+            engine = choose_engine(
+                start, end, step, schedule_ids,
+                requested=None if engine in ("auto", "sql") else engine,
+                min_cells=settings.AVAILABILITY_BITMAP_MIN_CELLS,
+            )
+            grid, all_free_blocks = await _cpu(compute_availability)(start, end, step, schedule_ids, by_sched, engine=engine, fmt=fmt)
+        metrics.observe_availability(
+            engine, t1 - t0, time.perf_counter() - t1, slot_count(start, end, step), total_members, events,
+        )
+
+        body = availability_payload(step, mode, min_people, total_members, active_ids, missing_ids, grid, all_free_blocks)
+        availability_cache.put(tag, body)
+        response = self.cacheable(JsonResponse(body), tag)
+        response["X-Busy-Cache"] = f"hits={cache_stats['hits']} misses={cache_stats['misses']}"
+        return response
+
+    @staticmethod
+    def cacheable(response, tag):
+        response["ETag"] = tag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+_event_list_create = EventListCreateView.as_view()
+
+
+class EventListAsyncView(AsyncAPIView):
+
+    async def get(self, request, schedule_id):
+        try:
+            schedule = await Schedule.objects.aget(id=schedule_id, user=request.user)
+        except (Schedule.DoesNotExist, DjangoValidationError):
+            raise NotFound("No Schedule matches the given query.")
+        events = Event.objects.filter(schedule=schedule)
+
+        start_str = request.GET.get("start")
+        end_str = request.GET.get("end")
+        page = KeysetPage(request) if KeysetPage.requested(request) else None
+        serialize = lambda event: EventSerializer(event).data
+        if not start_str and not end_str:
+            if page is None:
+                rows = [event async for event in events]
+                return JsonResponse(await _cpu(lambda: EventSerializer(rows, many=True).data)(), safe=False)
+            rows = [event async for event in page.filter(events)]
+            page_rows = await _cpu(lambda: [(e.start, e.id, serialize(e)) for e in rows])()
+            return JsonResponse(page.response_data(page_rows))
+        try:
+            start, end = parse_range(start_str, end_str)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        events = events.filter(start__lt=end).filter(Q(series_end__isnull=True) | Q(series_end__gt=start))
+        if page is not None:
+            page_rows = await sync_to_async(occurrence_page)(events, start, end, page, serialize)
+            return JsonResponse(page.response_data(page_rows))
+        rows = [event async for event in events.order_by("start")]
+        items = await _cpu(expand_events)(rows, start, end, serialize)
+        return JsonResponse(items, safe=False)
+
+    async def post(self, request, schedule_id):
+        # Writes stay on the DRF view: validation and the change broadcast are sync.
+        return await sync_to_async(_event_list_create)(request, schedule_id=schedule_id)
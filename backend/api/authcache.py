@@ -0,0 +1,138 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import metrics
+from .models import Group, Membership, Schedule
+
+log = logging.getLogger(__name__)
+
+# Short-lived identity and room-permission cache for WebSocket connects, kept in
+# the shared cache so invalidation reaches every process. Entries expire after
+# WS_AUTH_CACHE_TTL seconds; membership, group admin and schedule changes
+# delete the affected entries immediately. A TTL of 0 disables caching.
+
+User = get_user_model()
+_MISSING = object()
+
+
+def _user_key(user_id):
+    return f"ws:user:{user_id}"
+
+
+def _allowed_key(ns, oid, user_id):
+    return f"ws:allowed:{ns}:{oid}:{user_id}"
+
+
+def _ttl():
+    return settings.WS_AUTH_CACHE_TTL
+
+
+def get_user(user_id):
+    """The user for a token's user_id, or None if it does not exist."""
+    if _ttl() > 0:
+        user = cache.get(_user_key(user_id), _MISSING)
+        if user is not _MISSING:
+            metrics.WS_AUTH_CACHE.inc(kind="user", result="hit")
+            return user
+        metrics.WS_AUTH_CACHE.inc(kind="user", result="miss")
+    user = User.objects.filter(id=user_id).first()
+    if _ttl() > 0 and user is not None:
+        cache.set(_user_key(user_id), user, timeout=_ttl())
+    return user
+
+
+def _check(ns, oid, uid):
+    if ns == "groups":
+        return Group.objects.filter(Q(id=oid) & (Q(admin_id=uid) | Q(memberships__user_id=uid))).exists()
+    if ns == "schedules":
+        return Schedule.objects.filter(id=oid, user_id=uid).exists()
+    return False
+
+
+def is_allowed(ns, oid, uid):
+    try:
+        oid = str(uuid.UUID(str(oid)))
+    except ValueError:
+        return False
+    if _ttl() <= 0:
+        return _check(ns, oid, uid)
+    key = _allowed_key(ns, oid, uid)
+    allowed = cache.get(key)
+    metrics.WS_AUTH_CACHE.inc(kind="room", result="miss" if allowed is None else "hit")
+    if allowed is None:
+        allowed = _check(ns, oid, uid)
+        cache.set(key, allowed, timeout=_ttl())
+    return allowed
+
+
+def allowed_rooms(uid, rooms):
+    """The subset of (ns, oid) rooms uid may join, with one query per namespace for cache misses."""
+    keys = {room: _allowed_key(*room, uid) for room in rooms}
+    cached = cache.get_many(list(keys.values())) if _ttl() > 0 else {}
+    allowed = {room for room, key in keys.items() if cached.get(key)}
+    unknown = [room for room, key in keys.items() if key not in cached]
+    if _ttl() > 0:
+        metrics.WS_AUTH_CACHE.inc(len(keys) - len(unknown), kind="room", result="hit")
+        metrics.WS_AUTH_CACHE.inc(len(unknown), kind="room", result="miss")
+
+    group_ids = [oid for ns, oid in unknown if ns == "groups"]
+    schedule_ids = [oid for ns, oid in unknown if ns == "schedules"]
+    found = set()
+    if group_ids:
+        found.update(
+            ("groups", str(gid)) for gid in Group.objects.filter(id__in=group_ids)
+            .filter(Q(admin_id=uid) | Q(memberships__user_id=uid)).values_list("id", flat=True).distinct()
+        )
+    if schedule_ids:
+        found.update(
+            ("schedules", str(sid)) for sid in Schedule.objects.filter(id__in=schedule_ids, user_id=uid).values_list("id", flat=True)
+        )
+    if _ttl() > 0 and unknown:
+        cache.set_many({keys[room]: room in found for room in unknown}, timeout=_ttl())
+    return allowed | (found & set(unknown))
+
+
+def _forget(*keys):
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        log.exception("ws auth cache invalidation failed keys=%s", keys)
+
+
+def forget_group_members(group_id, user_ids):
+    """Drop cached room permissions of user_ids for group_id; for bulk membership changes, which send no signals."""
+    _forget(*(_allowed_key("groups", group_id, uid) for uid in user_ids))
+
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, instance, **kwargs):
+    _forget(_user_key(instance.id))
+
+
+@receiver([post_save, post_delete], sender=Membership)
+def _membership_changed(sender, instance, **kwargs):
+    _forget(_allowed_key("groups", instance.group_id, instance.user_id))
+
+
+@receiver(pre_save, sender=Group)
+def _group_saving(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_admin_id = Group.objects.filter(id=instance.id).values_list("admin_id", flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def _group_changed(sender, instance, **kwargs):
+    admins = {instance.admin_id, getattr(instance, "_previous_admin_id", None)} - {None}
+    _forget(*(_allowed_key("groups", instance.id, uid) for uid in admins))
+
+
+@receiver(post_delete, sender=Schedule)
+def _schedule_deleted(sender, instance, **kwargs):
+    _forget(_allowed_key("schedules", instance.id, instance.user_id))
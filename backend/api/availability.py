@@ -0,0 +1,252 @@
+import base64
+import sys
+from array import array
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional at runtime
+    np = None
+
+ENGINE_SWEEP = "sweep"
+ENGINE_BITMAP = "bitmap"
+ENGINES = (ENGINE_SWEEP, ENGINE_BITMAP)
+
+# Response encodings of the slot grid: a list of slot dicts, run-length
+# [available, slots] pairs, or base64 little-endian unsigned ints per slot.
+FORMAT_SLOTS = "slots"
+FORMAT_RLE = "rle"
+FORMAT_BINARY = "binary"
+FORMATS = (FORMAT_SLOTS, FORMAT_RLE, FORMAT_BINARY)
+
+MINUTE = timedelta(minutes=1)
+# Upper bound on busy cells (schedules x minutes) materialized at once by the bitmap engine.
+BITMAP_CHUNK_CELLS = 8_000_000
+
+
+def parse_window(start_str, end_str, step):
+    """Validate an availability window; raises ValueError with a client-facing message."""
+    start, end = parse_range(start_str, end_str)
+    if step <= 0 or step > 240:
+        raise ValueError("step must be 1..240 minutes")
+    return start, end
+
+
+def parse_range(start_str, end_str):
+    if not start_str or not end_str:
+        raise ValueError("start and end are required ISO datetimes")
+    start = parse_datetime(start_str)
+    end = parse_datetime(end_str)
+    if start is None or end is None or start >= end:
+        raise ValueError("Invalid start/end")
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start, dt_timezone.utc)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end, dt_timezone.utc)
+    return start, end
+
+
+def slot_count(start, end, step):
+    step_delta = timedelta(minutes=step)
+    return -((start - end) // step_delta)
+
+
+def slot_range(start, end, step, ev_start, ev_end):
+    # Indices [first, last] of the slots that overlap (ev_start, ev_end), using
+    # the same test as the original per-slot loop: not (ev_end <= slot_start or
+    # ev_start >= slot_end).
+    step_delta = timedelta(minutes=step)
+    n = slot_count(start, end, step)
+    if ev_start >= end or ev_end <= start:
+        return 0, -1
+    first = max(0, (ev_start - start) // step_delta)
+    last = min(n - 1, -((start - ev_end) // step_delta) - 1)
+    return first, last
+
+
+def busy_counts(start, end, step, schedule_ids, by_sched):
+    """Number of busy schedules per slot, via one sorted sweep over event boundaries."""
+    n = slot_count(start, end, step)
+    weights = Counter(schedule_ids)
+    diff = [0] * (n + 1)
+    for sid, weight in weights.items():
+        ranges = sorted(
+            r for r in (slot_range(start, end, step, s, e) for s, e in by_sched.get(sid, ()))
+            if r[0] <= r[1]
+        )
+        cur_first = cur_last = None
+        for first, last in ranges:
+            if cur_last is not None and first <= cur_last + 1:
+                cur_last = max(cur_last, last)
+                continue
+            if cur_last is not None:
+                diff[cur_first] += weight
+                diff[cur_last + 1] -= weight
+            cur_first, cur_last = first, last
+        if cur_last is not None:
+            diff[cur_first] += weight
+            diff[cur_last + 1] -= weight
+
+    counts = []
+    running = 0
+    for i in range(n):
+        running += diff[i]
+        counts.append(running)
+    return counts
+
+
+def busy_counts_bitmap(start, end, step, schedule_ids, by_sched):
+    """Number of busy schedules per slot, from minute-resolution busy bitmaps.
+
+    Each distinct schedule becomes one row of a (schedules x minutes) boolean
+    matrix; slot counts are a reshape/any reduction followed by a weighted sum.
+    """
+    n = slot_count(start, end, step)
+    minutes = n * step
+    weights = Counter(schedule_ids)
+    sids = list(weights)
+    weight_arr = np.array([weights[sid] for sid in sids], dtype=np.int64)
+
+    rows, lo, hi = [], [], []
+    for row, sid in enumerate(sids):
+        for s, e in by_sched.get(sid, ()):
+            first = max(0, (s - start) // MINUTE)
+            last = min(minutes, -((start - e) // MINUTE))
+            if first >= last:
+                # Zero-length or inverted events only ever touch a single slot;
+                # mark that slot's first minute so the reduction sees it.
+                slot_first, slot_last = slot_range(start, end, step, s, e)
+                if slot_first > slot_last:
+                    continue
+                first = slot_first * step
+                last = first + 1
+            rows.append(row)
+            lo.append(first)
+            hi.append(last)
+
+    counts = np.zeros(n, dtype=np.int64)
+    if not rows:
+        return counts.tolist()
+    rows = np.array(rows, dtype=np.int64)
+    lo = np.array(lo, dtype=np.int64)
+    hi = np.array(hi, dtype=np.int64)
+
+    chunk = max(1, BITMAP_CHUNK_CELLS // (minutes + 1))
+    for row_start in range(0, len(sids), chunk):
+        row_end = min(row_start + chunk, len(sids))
+        mask = (rows >= row_start) & (rows < row_end)
+        diff = np.zeros((row_end - row_start, minutes + 1), dtype=np.int32)
+        np.add.at(diff, (rows[mask] - row_start, lo[mask]), 1)
+        np.add.at(diff, (rows[mask] - row_start, hi[mask]), -1)
+        busy = np.cumsum(diff[:, :minutes], axis=1, dtype=np.int32) > 0
+        per_slot = busy.reshape(row_end - row_start, n, step).any(axis=2)
+        counts += weight_arr[row_start:row_end] @ per_slot
+    return counts.tolist()
+
+
+def choose_engine(start, end, step, schedule_ids, requested=None, min_cells=None):
+    if requested == ENGINE_BITMAP and np is not None:
+        return ENGINE_BITMAP
+    if requested == ENGINE_SWEEP or np is None or min_cells is None:
+        return ENGINE_SWEEP
+    cells = len(set(schedule_ids)) * slot_count(start, end, step) * step
+    return ENGINE_BITMAP if cells >= min_cells else ENGINE_SWEEP
+
+
+def count_busy(start, end, step, schedule_ids, by_sched, engine=ENGINE_SWEEP):
+    if engine == ENGINE_BITMAP:
+        return busy_counts_bitmap(start, end, step, schedule_ids, by_sched)
+    return busy_counts(start, end, step, schedule_ids, by_sched)
+
+
+def iso(dt):
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def build_slots(start, end, step, counts, active_count):
+    slots = []
+    step_delta = timedelta(minutes=step)
+    cursor = start
+    for busy in counts:
+        slot_end = min(cursor + step_delta, end)
+        slots.append({
+            "start": iso(cursor),
+            "end": iso(slot_end),
+            "available": active_count - busy,
+        })
+        cursor = slot_end
+    return slots
+
+
+def all_free_blocks(slots, active_count):
+    blocks = []
+    curr_start = None
+    last_end = None
+    for s in slots:
+        if s["available"] == active_count:
+            if curr_start is None:
+                curr_start = s["start"]
+            last_end = s["end"]
+        else:
+            if curr_start is not None:
+                blocks.append({"start": curr_start, "end": last_end})
+                curr_start = None
+    if curr_start is not None:
+        blocks.append({"start": curr_start, "end": last_end})
+    return blocks
+
+
+def free_blocks_from_counts(start, end, step, counts):
+    """all_free_blocks computed straight from busy counts, without slot dicts."""
+    blocks = []
+    step_delta = timedelta(minutes=step)
+    run = None
+    for i, busy in enumerate(counts):
+        if busy == 0:
+            if run is None:
+                run = i
+        elif run is not None:
+            blocks.append({"start": iso(start + run * step_delta), "end": iso(start + i * step_delta)})
+            run = None
+    if run is not None:
+        blocks.append({"start": iso(start + run * step_delta), "end": iso(min(start + len(counts) * step_delta, end))})
+    return blocks
+
+
+def encode_grid(start, end, counts, active_count, fmt):
+    """Compact grid fields (origin, end, slotCount and rle or counts) standing in for `slots`."""
+    grid = {"origin": iso(start), "end": iso(end), "slotCount": len(counts)}
+    if fmt == FORMAT_RLE:
+        runs = []
+        for busy in counts:
+            available = active_count - busy
+            if runs and runs[-1][0] == available:
+                runs[-1][1] += 1
+            else:
+                runs.append([available, 1])
+        grid["rle"] = runs
+    else:
+        packed = array("H" if active_count <= 0xFFFF else "I", (active_count - busy for busy in counts))
+        if sys.byteorder == "big":
+            packed.byteswap()
+        grid["encoding"] = f"uint{packed.itemsize * 8}le"
+        grid["counts"] = base64.b64encode(packed.tobytes()).decode("ascii")
+    return grid
+
+
+def compute_availability(start, end, step, schedule_ids, by_sched, engine=ENGINE_SWEEP, fmt=FORMAT_SLOTS):
+    """Return (grid, allFreeBlocks) for the active schedules over [start, end)."""
+    counts = count_busy(start, end, step, schedule_ids, by_sched, engine=engine)
+    return availability_from_counts(start, end, step, counts, len(schedule_ids), fmt=fmt)
+
+
+def availability_from_counts(start, end, step, counts, active_count, fmt=FORMAT_SLOTS):
+    """(grid, allFreeBlocks); grid is {"slots": [...]} or, for compact formats, encode_grid's fields."""
+    if fmt != FORMAT_SLOTS:
+        return encode_grid(start, end, counts, active_count, fmt), free_blocks_from_counts(start, end, step, counts)
+    slots = build_slots(start, end, step, counts, active_count)
+    return {"slots": slots}, all_free_blocks(slots, active_count)
@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.http import parse_etags
+
+# Availability responses keyed by a strong ETag of the group's
+# availability_version plus the normalized query. A version bump changes every
+# tag for the group, so entries are never invalidated, only evicted. Bodies
+# are kept in a small per-process LRU (AVAILABILITY_RESULT_CACHE_SIZE).
+
+_lock = threading.Lock()
+_lru = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def etag(group_id, version, start, end, step, mode, min_people, engine, fmt):
+    query = f"{group_id}|{version}|{start.isoformat()}|{end.isoformat()}|{step}|{mode}|{min_people}|{engine}|{fmt}"
+    return '"' + hashlib.sha256(query.encode()).hexdigest()[:32] + '"'
+
+
+def matches(tag, if_none_match):
+    """Whether an If-None-Match header value names tag (or is *)."""
+    if not if_none_match:
+        return False
+    tags = [t.removeprefix("W/") for t in parse_etags(if_none_match)]
+    if "*" in tags or tag in tags:
+        with _lock:
+            _stats["not_modified"] += 1
+        return True
+    return False
+
+
+def get(tag):
+    with _lock:
+        body = _lru.get(tag)
+        if body is None:
+            _stats["misses"] += 1
+        else:
+            _stats["hits"] += 1
+            _lru.move_to_end(tag)
+        return body
+
+
+def put(tag, body):
+    size = settings.AVAILABILITY_RESULT_CACHE_SIZE
+    if size <= 0:
+        return
+    with _lock:
+        _lru[tag] = body
+        _lru.move_to_end(tag)
+        while len(_lru) > size:
+            _lru.popitem(last=False)
+
+
+def stats():
+    with _lock:
+        return dict(_stats, size=len(_lru))
+
+
+def clear():
+    with _lock:
+        _lru.clear()
@@ -0,0 +1,210 @@
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+from . import busy_cache, metrics
+from .availability import choose_engine, count_busy, iso
+from .models import Membership
+
+log = logging.getLogger(__name__)
+
+# Server-side availability deltas. Group sockets register the windows they
+# display; after a change each watched (group, window) is recomputed once and
+# only the slots whose count moved are pushed to the room, tagged with the
+# window key. The last pushed grid is kept in the cache as the delta base, with
+# a per-window sequence number so clients can detect a missed or racing delta
+# and re-watch to get a fresh snapshot.
+#
+# The watched windows of a group live in AVAILABILITY_WATCH_MAX_WINDOWS index
+# slots, each claimed with an atomic cache.add, so concurrent watchers never
+# overwrite each other's registrations and a group cannot grow an unbounded
+# amount of push work.
+
+WATCH_TTL = 60 * 60 * 24
+
+
+def window_key(start, end, step):
+    return f"{iso(start)}|{iso(end)}|{step}"
+
+
+def parse_key(key):
+    start_str, end_str, step = key.split("|")
+    return parse_datetime(start_str), parse_datetime(end_str), int(step)
+
+
+def _slot_key(group_id, slot):
+    return f"avail:watchidx:{group_id}:{slot}"
+
+
+def _slot_keys(group_id):
+    return [_slot_key(group_id, slot) for slot in range(settings.AVAILABILITY_WATCH_MAX_WINDOWS)]
+
+
+def _ref_key(group_id, key):
+    return f"avail:watch:{group_id}:{key}"
+
+
+def _snap_key(group_id, key):
+    return f"avail:snap:{group_id}:{key}"
+
+
+def _seq_key(group_id, key):
+    return f"avail:seq:{group_id}:{key}"
+
+
+def _next_seq(group_id, key):
+    seq_key = _seq_key(group_id, key)
+    cache.add(seq_key, 0, timeout=WATCH_TTL)
+    return cache.incr(seq_key)
+
+
+def _schedule_ids(group_id):
+    return list(
+        Membership.objects.filter(group_id=group_id, active_schedule__isnull=False)
+        .values_list("active_schedule_id", flat=True)
+    )
+
+
+def _available(schedule_ids, by_sched, start, end, step):
+    engine = choose_engine(start, end, step, schedule_ids, min_cells=settings.AVAILABILITY_BITMAP_MIN_CELLS)
+    busy = count_busy(start, end, step, schedule_ids, by_sched, engine=engine)
+    return [len(schedule_ids) - b for b in busy]
+
+
+def compute_available(group_id, start, end, step):
+    schedule_ids = _schedule_ids(group_id)
+    if not schedule_ids:
+        return 0, []
+    by_sched = busy_cache.window_intervals(schedule_ids, start, end)
+    return len(schedule_ids), _available(schedule_ids, by_sched, start, end, step)
+
+
+def _snapshot_event(group_id, key, snap):
+    return {
+        "type": "availability_snapshot",
+        "groupId": str(group_id),
+        "window": key,
+        "seq": snap["seq"],
+        "activeCount": snap["activeCount"],
+        "available": snap["available"],
+    }
+
+
+def check_window(start, end):
+    if end - start > timedelta(days=settings.AVAILABILITY_WATCH_MAX_DAYS):
+        raise ValueError(f"watched windows are limited to {settings.AVAILABILITY_WATCH_MAX_DAYS} days")
+
+
+def _register(group_id, keys):
+    # Returns the keys that found no free index slot.
+    slots = _slot_keys(group_id)
+    taken = cache.get_many(slots)
+    wanted = [key for key in dict.fromkeys(keys) if key not in taken.values()]
+    for slot in slots:
+        if not wanted:
+            break
+        if slot not in taken and cache.add(slot, wanted[0], timeout=WATCH_TTL):
+            wanted.pop(0)
+    return wanted
+
+
+def watch(group_id, start, end, step):
+    """Register a watcher for the window and return the snapshot event to send it.
+
+    Raises ValueError if the window is too long or the group already watches
+    AVAILABILITY_WATCH_MAX_WINDOWS other windows.
+    """
+    check_window(start, end)
+    key = window_key(start, end, step)
+    if _register(group_id, [key]):
+        raise ValueError(f"this group already watches {settings.AVAILABILITY_WATCH_MAX_WINDOWS} windows")
+    ref_key = _ref_key(group_id, key)
+    cache.add(ref_key, 0, timeout=WATCH_TTL)
+    cache.incr(ref_key)
+
+    snap = cache.get(_snap_key(group_id, key))
+    if snap is None:
+        active_count, available = compute_available(group_id, start, end, step)
+        snap = {"seq": _next_seq(group_id, key), "activeCount": active_count, "available": available}
+        cache.set(_snap_key(group_id, key), snap, timeout=WATCH_TTL)
+    return key, _snapshot_event(group_id, key, snap)
+
+
+def unwatch(group_id, key):
+    try:
+        cache.decr(_ref_key(group_id, key))
+    except ValueError:
+        pass
+
+
+def ensure_watched(group_id, keys):
+    # Re-register keys whose slot was freed while they were still watched;
+    # called on every ping.
+    lost = _register(group_id, keys)
+    if lost:
+        log.warning("availability push group=%s has no index slot for %s windows", group_id, len(lost))
+
+
+def push_deltas(group_id, layer):
+    """Recompute every live watched window of the group and push what changed.
+
+    Busy data is loaded once over the union of the windows, so the cost is one
+    membership query and one busy-cache lookup per change, plus the counting.
+    """
+    slots = cache.get_many(_slot_keys(group_id))
+    if not slots:
+        return
+    refs = cache.get_many([_ref_key(group_id, key) for key in slots.values()])
+    live = {}
+    for slot, key in slots.items():
+        if (refs.get(_ref_key(group_id, key)) or 0) > 0:
+            live[key] = parse_key(key)
+        else:
+            cache.delete_many([slot, _ref_key(group_id, key), _snap_key(group_id, key), _seq_key(group_id, key)])
+    if not live:
+        return
+
+    schedule_ids = _schedule_ids(group_id)
+    by_sched = {}
+    if schedule_ids:
+        union_start = min(start for start, _, _ in live.values())
+        union_end = max(end for _, end, _ in live.values())
+        by_sched = busy_cache.window_intervals(schedule_ids, union_start, union_end)
+    active_count = len(schedule_ids)
+    olds = cache.get_many([_snap_key(group_id, key) for key in live])
+
+    for key, (start, end, step) in live.items():
+        if schedule_ids:
+            window = {sid: [(s, e) for s, e in found if e > start and s < end] for sid, found in by_sched.items()}
+            available = _available(schedule_ids, window, start, end, step)
+        else:
+            available = []
+        old = olds.get(_snap_key(group_id, key))
+        if old is not None and old["activeCount"] == active_count:
+            changes = [[i, v] for i, (prev, v) in enumerate(zip(old["available"], available)) if prev != v]
+            if not changes:
+                continue
+        snap = {"seq": _next_seq(group_id, key), "activeCount": active_count, "available": available}
+        cache.set(_snap_key(group_id, key), snap, timeout=WATCH_TTL)
+        if old is not None and old["activeCount"] == active_count:
+            event = {
+                "type": "availability_delta",
+                "groupId": str(group_id),
+                "window": key,
+                "baseSeq": old["seq"],
+                "seq": snap["seq"],
+                "activeCount": active_count,
+                "changes": changes,
+            }
+        else:
+            event = _snapshot_event(group_id, key, snap)
+        async_to_sync(metrics.group_send)(
+            layer, f"group_{group_id}",
+            {"type": "availability.delta", "room": f"group_{group_id}", "window": key, "event": event},
+            "availability_delta",
+        )
+    log.info("availability push group=%s windows=%s", group_id, len(live))
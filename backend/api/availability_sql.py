@@ -0,0 +1,63 @@
+from django.db import connection
+
+from .availability import slot_count
+from .models import Event
+
+# PostgreSQL-only availability path. Migration 0006 adds a generated
+# tstzrange column `span` on api_event with a GiST index; this computes busy
+# counts per slot in one statement so only (slot, busy) pairs for busy slots
+# leave the database. Unlike the Python engines it ignores zero-length events
+# and treats inverted ones as their normalized range, and it only covers
+# single events: callers fall back when recurring series touch the window.
+
+BUSY_COUNTS_SQL = """
+WITH weights AS (
+    SELECT id AS schedule_id, COUNT(*) AS weight
+    FROM unnest(%(ids)s::uuid[]) AS id
+    GROUP BY id
+),
+busy AS (
+    SELECT ev.schedule_id,
+           EXTRACT(EPOCH FROM lower(ev.span) - %(start)s::timestamptz) / %(step)s AS lo,
+           EXTRACT(EPOCH FROM upper(ev.span) - %(start)s::timestamptz) / %(step)s AS hi
+    FROM api_event ev
+    WHERE ev.schedule_id = ANY(%(ids)s::uuid[])
+      AND ev.rrule = ''
+      AND ev.span && tstzrange(%(start)s::timestamptz, %(end)s::timestamptz, '[)')
+),
+pairs AS (
+    SELECT DISTINCT i, busy.schedule_id
+    FROM busy, generate_series(GREATEST(FLOOR(busy.lo)::int, 0), LEAST(CEIL(busy.hi)::int, %(n)s) - 1) AS i
+)
+SELECT pairs.i, SUM(weights.weight)
+FROM pairs JOIN weights USING (schedule_id)
+GROUP BY pairs.i
+ORDER BY pairs.i
+"""
+
+
+def supported():
+    return connection.vendor == "postgresql"
+
+
+def has_series(schedule_ids, start, end):
+    return Event.objects.filter(
+        schedule_id__in=schedule_ids, start__lt=end
+    ).exclude(rrule="").exclude(series_end__lte=start).exists()
+
+
+def busy_counts_sql(start, end, step, schedule_ids):
+    n = slot_count(start, end, step)
+    counts = [0] * n
+    params = {
+        "start": start,
+        "end": end,
+        "step": step * 60,
+        "n": n,
+        "ids": [str(sid) for sid in schedule_ids],
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(BUSY_COUNTS_SQL, params)
+        for i, busy in cursor.fetchall():
+            counts[i] = int(busy)
+    return counts
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from . import availability_push, metrics
+from .models import Membership
+
+log = logging.getLogger(__name__)
+
+
+def _groups_for(schedule_ids):
+    return list(
+        Membership.objects.filter(active_schedule_id__in=schedule_ids)
+        .values_list("active_schedule_id", "group_id")
+        .distinct()
+    )
+
+
+async def send_changes(layer, schedules, groups):
+    """Send one event_changed per schedule and one availability_changed per affected group.
+
+    schedules and groups are Counters of how many notifications asked for each
+    id; returns how many messages were saved by sending each only once.
+    """
+    await asyncio.gather(*(
+        metrics.group_send(
+            layer, f"schedule_{sid}",
+            {"type": "broadcast", "room": f"schedule_{sid}", "event": {"type": "event_changed", "scheduleId": str(sid)}},
+            "schedule_changed",
+        )
+        for sid in schedules
+    ))
+    requested = Counter(groups)
+    if schedules:
+        for sid, gid in await database_sync_to_async(_groups_for)(list(schedules)):
+            requested[str(gid)] += schedules[str(sid)]
+    log.info("broadcast schedules=%s -> groups=%s", list(schedules), list(requested))
+    await asyncio.gather(*(
+        metrics.group_send(
+            layer, f"group_{gid}",
+            {"type": "broadcast", "room": f"group_{gid}", "event": {"type": "availability_changed", "groupId": str(gid)}},
+            "availability_changed",
+        )
+        for gid in requested
+    ))
+    for gid in requested:
+        if settings.AVAILABILITY_PUSH_DELTAS:
+            await database_sync_to_async(availability_push.push_deltas)(gid, layer)
+    return (sum(schedules.values()) - len(schedules)) + (sum(requested.values()) - len(requested))
+
+
+class CoalescingBroadcaster:
+    """Collapses change notifications arriving within window_ms into one flush.
+
+    Notifications are queued after the surrounding transaction commits and
+    sent from a background event loop, so request threads never wait on the
+    channel layer.
+    """
+
+    def __init__(self, window_ms):
+        self.window = window_ms / 1000
+        self._loop = None
+        self._lock = threading.Lock()
+        self._schedules = Counter()
+        self._groups = Counter()
+        self._timer = None
+        self._task = None
+        self.notifications = 0
+        self.flushes = 0
+        self.suppressed = 0
+
+    def schedule_changed(self, schedule_id):
+        transaction.on_commit(lambda: self._enqueue("schedules", str(schedule_id)))
+
+    def group_changed(self, group_id):
+        transaction.on_commit(lambda: self._enqueue("groups", str(group_id)))
+
+    def stats(self):
+        return {"notifications": self.notifications, "flushes": self.flushes, "suppressed": self.suppressed}
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="broadcast-coalescer", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _enqueue(self, kind, key):
+        self._ensure_loop().call_soon_threadsafe(self._add, kind, key)
+
+    def _add(self, kind, key):
+        # Runs on the coalescer loop, which owns the pending counters.
+        self.notifications += 1
+        pending = self._schedules if kind == "schedules" else self._groups
+        pending[key] += 1
+        if self._timer is None:
+            self._timer = self._loop.call_later(self.window, self._start_flush)
+
+    def _start_flush(self):
+        # The loop only keeps a weak reference to tasks; hold the flush until it is done.
+        self._task = self._loop.create_task(self._flush())
+        self._task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        if self._task is task:
+            self._task = None
+        if not task.cancelled() and task.exception() is not None:
+            log.error("coalesced broadcast flush crashed", exc_info=task.exception())
+
+    async def _flush(self):
+        schedules, groups = self._schedules, self._groups
+        self._schedules, self._groups = Counter(), Counter()
+        self._timer = None
+        layer = get_channel_layer()
+        if not layer:
+            log.error("no channel layer")
+            return
+        try:
+            saved = await send_changes(layer, schedules, groups)
+        except Exception:
+            log.exception("coalesced broadcast failed schedules=%s groups=%s", list(schedules), list(groups))
+            return
+        self.flushes += 1
+        self.suppressed += saved
+        if saved:
+            log.info("coalesced broadcast suppressed=%s total_suppressed=%s", saved, self.suppressed)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def coalesce_window_ms():
+    """BROADCAST_COALESCE_MS, defaulting to 150 on a Redis channel layer and 0 otherwise."""
+    if settings.BROADCAST_COALESCE_MS is not None:
+        return settings.BROADCAST_COALESCE_MS
+    backend = settings.CHANNEL_LAYERS.get("default", {}).get("BACKEND", "")
+    return 150 if backend.startswith("channels_redis.") else 0
+
+
+def get_broadcaster():
+    """The process-wide coalescer, or None when the coalescing window is 0."""
+    global _broadcaster
+    window_ms = coalesce_window_ms()
+    if window_ms <= 0:
+        return None
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = CoalescingBroadcaster(window_ms)
+    return _broadcaster
@@ -0,0 +1,184 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import recurrence
+from .models import Event
+
+log = logging.getLogger(__name__)
+
+# Busy time per schedule: merged single events plus recurring series. Redis
+# (the default cache) holds one entry per (schedule, generation); invalidation
+# bumps the generation, so stale entries written by in-flight readers are never
+# served again. Each process keeps a small LRU in front of Redis, validated
+# against the generation.
+
+_lock = threading.Lock()
+_lru = OrderedDict()
+_stats = {"hits": 0, "redis_hits": 0, "misses": 0, "errors": 0}
+
+
+def _gen_key(sid):
+    return f"busy:gen:{sid}"
+
+
+def _data_key(sid, gen):
+    return f"busy:data:v3:{sid}:{gen}"
+
+
+def merge_intervals(pairs):
+    merged = []
+    for s, e in sorted(pairs):
+        if merged and s <= merged[-1][1] and s < e:
+            if e > merged[-1][1]:
+                merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+    return merged
+
+
+class _Entry:
+    __slots__ = ("gen", "intervals", "series", "starts", "max_ends")
+
+    def __init__(self, gen, busy):
+        self.gen = gen
+        intervals, self.series = busy
+        self.intervals = intervals
+        self.starts = [s for s, _ in intervals]
+        self.max_ends = []
+        running = None
+        for _, e in intervals:
+            running = e if running is None or e > running else running
+            self.max_ends.append(running)
+
+    def window(self, start, end):
+        lo = bisect_right(self.max_ends, start)
+        hi = bisect_left(self.starts, end)
+        found = [(s, e) for s, e in self.intervals[lo:hi] if e > start]
+        for s, e, rrule, exdates, last_end in self.series:
+            if s < end and (last_end is None or last_end > start):
+                found.extend(recurrence.occurrences(s, e, rrule, exdates, last_end, start, end))
+        return found
+
+
+def _remember(sid, entry):
+    with _lock:
+        _lru[sid] = entry
+        _lru.move_to_end(sid)
+        while len(_lru) > settings.BUSY_CACHE_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def _bump(key, n=1):
+    with _lock:
+        _stats[key] += n
+
+
+def _load_from_db(sids):
+    # Single events are merged; recurring series are kept as rules and
+    # expanded per window, since unbounded series cannot be materialized.
+    # Always read from the primary: an entry is stored under the current
+    # generation, which a lagging replica may not have caught up with yet.
+    rows = Event.objects.using("default").filter(schedule_id__in=sids).values_list(
+        "schedule_id", "start", "end", "rrule", "exdates", "series_end"
+    )
+    pairs = {sid: [] for sid in sids}
+    series = {sid: [] for sid in sids}
+    for sid, s, e, rrule, exdates, last_end in rows:
+        if rrule:
+            series[str(sid)].append((s, e, rrule, exdates, last_end))
+        else:
+            pairs[str(sid)].append((s, e))
+    return {sid: (merge_intervals(pairs[sid]), series[sid]) for sid in sids}
+
+
+def window_intervals(schedule_ids, start, end, stats=None):
+    """Busy intervals overlapping [start, end) for each schedule, keyed like schedule_ids."""
+    keys = {str(sid): sid for sid in schedule_ids}
+    sids = list(keys)
+    counts = {"hits": 0, "misses": 0}
+
+    try:
+        gens = cache.get_many([_gen_key(sid) for sid in sids])
+    except Exception:
+        log.exception("busy cache unavailable, reading events directly")
+        _bump("errors")
+        loaded = _load_from_db(sids)
+        return {keys[sid]: _Entry(0, loaded[sid]).window(start, end) for sid in sids}
+
+    entries = {}
+    pending = []
+    for sid in sids:
+        gen = gens.get(_gen_key(sid), 0)
+        with _lock:
+            entry = _lru.get(sid)
+            if entry is not None and entry.gen == gen:
+                _lru.move_to_end(sid)
+        if entry is not None and entry.gen == gen:
+            entries[sid] = entry
+        else:
+            pending.append((sid, gen))
+    counts["hits"] += len(entries)
+
+    if pending:
+        try:
+            stored = cache.get_many([_data_key(sid, gen) for sid, gen in pending])
+        except Exception:
+            log.exception("busy cache read failed, reading events directly")
+            _bump("errors")
+            stored = {}
+        missing = []
+        for sid, gen in pending:
+            busy = stored.get(_data_key(sid, gen))
+            if busy is None:
+                missing.append((sid, gen))
+                continue
+            entries[sid] = _Entry(gen, busy)
+            _remember(sid, entries[sid])
+        _bump("redis_hits", len(pending) - len(missing))
+        counts["hits"] += len(pending) - len(missing)
+
+        if missing:
+            loaded = _load_from_db([sid for sid, _ in missing])
+            try:
+                cache.set_many(
+                    {_data_key(sid, gen): loaded[sid] for sid, gen in missing},
+                    timeout=settings.BUSY_CACHE_TTL,
+                )
+            except Exception:
+                log.exception("busy cache write failed")
+                _bump("errors")
+            for sid, gen in missing:
+                entries[sid] = _Entry(gen, loaded[sid])
+                _remember(sid, entries[sid])
+            counts["misses"] += len(missing)
+
+    _bump("hits", counts["hits"])
+    _bump("misses", counts["misses"])
+    if stats is not None:
+        stats["hits"] = stats.get("hits", 0) + counts["hits"]
+        stats["misses"] = stats.get("misses", 0) + counts["misses"]
+    return {keys[sid]: entries[sid].window(start, end) for sid in sids}
+
+
+def invalidate(schedule_id):
+    sid = str(schedule_id)
+    with _lock:
+        _lru.pop(sid, None)
+    try:
+        try:
+            cache.incr(_gen_key(sid))
+        except ValueError:
+            cache.add(_gen_key(sid), 1, timeout=None) or cache.incr(_gen_key(sid))
+    except Exception:
+        log.exception("busy cache invalidation failed schedule=%s", sid)
+        _bump("errors")
+
+
+def stats():
+    with _lock:
+        return dict(_stats, size=len(_lru))
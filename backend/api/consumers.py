@@ -1,25 +1,32 @@
 import json
 import logging
+import time
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.db.models import Q
-from .models import Group, Schedule
+from django.conf import settings
+from . import authcache, availability_push, metrics
+from .availability import parse_window
 
 log = logging.getLogger(__name__)
 
 class Consumer(AsyncWebsocketConsumer):
     async def connect(self):
         try:
+            self.namespace = self.scope["url_route"]["kwargs"]["namespace"]
             user = self.scope.get("user")
             if not user or user.is_anonymous:
-                await self.close(code=4401)
+                await self._reject(4401)
+                return
+            try:
+                # Canonical form, so cache keys and room names match the ones signals and senders use.
+                self.obj_id = str(uuid.UUID(self.scope["url_route"]["kwargs"]["obj_id"]))
+            except ValueError:
+                await self._reject(4400)
                 return
-
-            self.namespace = self.scope["url_route"]["kwargs"]["namespace"]
-            self.obj_id = self.scope["url_route"]["kwargs"]["obj_id"]
 
             if not await self._allowed(self.namespace, self.obj_id, user.id):
-                await self.close(code=4403)
+                await self._reject(4403)
                 return
 
             singular = "group" if self.namespace == "groups" else "schedule"
@@ -27,16 +34,28 @@ class Consumer(AsyncWebsocketConsumer):
 
             await self.channel_layer.group_add(self.room, self.channel_name)
             await self.accept()
-            log.info("ws connect ok ns=%s room=%s user=%s", self.namespace, self.room, user.id)
+            metrics.WS_OPEN.inc(namespace=self.namespace)
+            self.accepted = True
+            started = self.scope.get("connect_started")
+            elapsed_ms = (time.perf_counter() - started) * 1000 if started else -1
+            log.info("ws connect ok ns=%s room=%s user=%s connect_ms=%.1f", self.namespace, self.room, user.id, elapsed_ms)
         except Exception as e:
             log.exception("ws connect error: %s", e)
             try:
-                await self.close(code=1011)
+                await self._reject(1011)
             except Exception:
                 pass
 
+    async def _reject(self, code):
+        metrics.WS_REJECTED.inc(namespace=getattr(self, "namespace", "unknown"), code=code)
+        await self.close(code=code)
+
     async def disconnect(self, code):
+        if getattr(self, "accepted", False):
+            metrics.WS_OPEN.dec(namespace=self.namespace)
         try:
+            for key in list(getattr(self, "watches", ())):
+                await database_sync_to_async(availability_push.unwatch)(self.obj_id, key)
             if hasattr(self, "room"):
                 await self.channel_layer.group_discard(self.room, self.channel_name)
             log.info("ws disconnect room=%s code=%s", getattr(self, "room", None), code)
@@ -46,17 +65,25 @@ class Consumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
+            action = data.get("action")
+            if action in ("watch_availability", "unwatch_availability"):
+                await self._handle_watch(action, data)
+                return
             event = data.get("event")
             if event is None:
                 return
             # Re-broadcast to everyone in the room
-            await self.channel_layer.group_send(self.room, {"type": "broadcast", "event": event})
+            await metrics.group_send(self.channel_layer, self.room, {"type": "broadcast", "room": self.room, "event": event}, "client")
             log.info("ws recv -> broadcast room=%s event=%s", self.room, event.get("type"))
         except Exception as e:
             log.exception("ws receive error: %s", e)
 
     async def broadcast(self, message):
         try:
+            if getattr(self, "watches", None) and message["event"].get("type") == "availability_changed":
+                # Watchers are kept current by availability_push deltas.
+                await database_sync_to_async(availability_push.ensure_watched)(self.obj_id, self.watches)
+                return
             await self.send(text_data=json.dumps({"event": message["event"]}))
         except Exception as e:
             log.exception("ws send error: %s", e)
@@ -66,10 +93,230 @@ class Consumer(AsyncWebsocketConsumer):
         # Treat it the same as "broadcast".
         await self.broadcast(message)
 
+    async def availability_delta(self, message):
+        if message["window"] not in getattr(self, "watches", ()):
+            return
+        try:
+            await self.send(text_data=json.dumps({"event": message["event"]}))
+        except Exception as e:
+            log.exception("ws send error: %s", e)
+
+    async def _handle_watch(self, action, data):
+        if self.namespace != "groups" or not settings.AVAILABILITY_PUSH_DELTAS:
+            await self.send(text_data=json.dumps({"error": "availability push is not enabled"}))
+            return
+        if not hasattr(self, "watches"):
+            self.watches = set()
+        if action == "unwatch_availability":
+            key = data.get("window")
+            if key in self.watches:
+                self.watches.discard(key)
+                await database_sync_to_async(availability_push.unwatch)(self.obj_id, key)
+            return
+        try:
+            step = int(data.get("step", 30))
+            start, end = parse_window(data.get("start"), data.get("end"), step)
+        except (TypeError, ValueError) as e:
+            await self.send(text_data=json.dumps({"error": str(e)}))
+            return
+        if availability_push.window_key(start, end, step) in self.watches:
+            return
+        if len(self.watches) >= settings.AVAILABILITY_WATCH_MAX_PER_SOCKET:
+            await self.send(text_data=json.dumps({"error": f"at most {settings.AVAILABILITY_WATCH_MAX_PER_SOCKET} watched windows per connection"}))
+            return
+        try:
+            key, snapshot = await database_sync_to_async(availability_push.watch)(self.obj_id, start, end, step)
+        except ValueError as e:
+            await self.send(text_data=json.dumps({"error": str(e)}))
+            return
+        self.watches.add(key)
+        await self.send(text_data=json.dumps({"event": snapshot}))
+        log.info("ws watch room=%s window=%s", self.room, key)
+
     @database_sync_to_async
     def _allowed(self, ns, oid, uid):
-        if ns == "groups":
-            return Group.objects.filter(Q(id=oid) & (Q(admin_id=uid) | Q(memberships__user_id=uid))).exists()
-        if ns == "schedules":
-            return Schedule.objects.filter(id=oid, user_id=uid).exists()
-        return False
+        return authcache.is_allowed(ns, oid, uid)
+
+
+class StreamConsumer(AsyncWebsocketConsumer):
+    """One socket, many rooms. Clients name rooms as "groups/<id>" or "schedules/<id>".
+
+    Control messages:
+      {"action": "subscribe", "rooms": [...]}    -> {"action": "subscribed", "rooms": [...], "denied": [...]}
+      {"action": "unsubscribe", "rooms": [...]}  -> {"action": "unsubscribed", "rooms": [...]}
+      {"action": "publish", "room": ..., "event": {...}}
+      {"action": "watch_availability", "room": "groups/<id>", "start", "end", "step"}
+      {"action": "unwatch_availability", "room": "groups/<id>", "window": ...}
+    Every room message is delivered as {"room": ..., "event": {...}}.
+    """
+
+    max_rooms = 100
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or user.is_anonymous:
+            metrics.WS_REJECTED.inc(namespace="stream", code=4401)
+            await self.close(code=4401)
+            return
+        self.user_id = user.id
+        self.rooms = {}
+        self.watches = set()
+        await self.accept()
+        metrics.WS_OPEN.inc(namespace="stream")
+        started = self.scope.get("connect_started")
+        elapsed_ms = (time.perf_counter() - started) * 1000 if started else -1
+        log.info("ws stream connect ok user=%s connect_ms=%.1f", user.id, elapsed_ms)
+
+    async def disconnect(self, code):
+        if hasattr(self, "rooms"):
+            metrics.WS_OPEN.dec(namespace="stream")
+        try:
+            for group_name, key in list(getattr(self, "watches", ())):
+                await database_sync_to_async(availability_push.unwatch)(group_name.removeprefix("group_"), key)
+            for group_name in list(getattr(self, "rooms", {})):
+                await self.channel_layer.group_discard(group_name, self.channel_name)
+            log.info("ws stream disconnect rooms=%s code=%s", len(getattr(self, "rooms", {})), code)
+        except Exception as e:
+            log.exception("ws stream disconnect error: %s", e)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            action = data.get("action")
+            if action == "subscribe":
+                await self._subscribe(data.get("rooms") or [])
+            elif action == "unsubscribe":
+                await self._unsubscribe(data.get("rooms") or [])
+            elif action == "publish":
+                group_name = self._group_name(data.get("room"))
+                event = data.get("event")
+                if group_name not in self.rooms or not isinstance(event, dict):
+                    await self._error("not subscribed", data.get("room"))
+                    return
+                await metrics.group_send(self.channel_layer, group_name, {"type": "broadcast", "room": group_name, "event": event}, "client")
+            elif action in ("watch_availability", "unwatch_availability"):
+                await self._handle_watch(action, data)
+            else:
+                await self._error("unknown action")
+        except Exception as e:
+            log.exception("ws stream receive error: %s", e)
+
+    async def broadcast(self, message):
+        group_name = message.get("room")
+        if group_name not in self.rooms:
+            return
+        event = message["event"]
+        keys = [key for g, key in self.watches if g == group_name]
+        if keys and event.get("type") == "availability_changed":
+            await database_sync_to_async(availability_push.ensure_watched)(group_name.removeprefix("group_"), keys)
+            return
+        await self._send_tagged(group_name, event)
+
+    async def broadcast_message(self, message):
+        await self.broadcast(message)
+
+    async def availability_delta(self, message):
+        if (message.get("room"), message["window"]) in self.watches:
+            await self._send_tagged(message["room"], message["event"])
+
+    async def _send_tagged(self, group_name, event):
+        try:
+            await self.send(text_data=json.dumps({"room": self.rooms[group_name], "event": event}))
+        except Exception as e:
+            log.exception("ws send error: %s", e)
+
+    async def _error(self, error, room=None):
+        payload = {"error": error}
+        if room is not None:
+            payload["room"] = room
+        await self.send(text_data=json.dumps(payload))
+
+    @staticmethod
+    def _parse_room(name):
+        if not isinstance(name, str):
+            return None
+        ns, _, oid = name.partition("/")
+        if ns not in ("groups", "schedules"):
+            return None
+        try:
+            return ns, str(uuid.UUID(oid))
+        except ValueError:
+            return None
+
+    def _group_name(self, name):
+        room = self._parse_room(name)
+        if room is None:
+            return None
+        ns, oid = room
+        return f"{'group' if ns == 'groups' else 'schedule'}_{oid}"
+
+    async def _subscribe(self, names):
+        wanted = {}
+        denied = []
+        for name in names:
+            room = self._parse_room(name)
+            if room is None:
+                denied.append(name)
+            elif self._group_name(name) not in self.rooms:
+                wanted[room] = name
+        if len(self.rooms) + len(wanted) > self.max_rooms:
+            await self._error(f"at most {self.max_rooms} rooms per connection")
+            return
+        allowed = await database_sync_to_async(authcache.allowed_rooms)(self.user_id, list(wanted))
+        joined = []
+        for room, name in wanted.items():
+            if room not in allowed:
+                denied.append(name)
+                continue
+            group_name = self._group_name(name)
+            await self.channel_layer.group_add(group_name, self.channel_name)
+            self.rooms[group_name] = f"{room[0]}/{room[1]}"
+            joined.append(self.rooms[group_name])
+        await self.send(text_data=json.dumps({"action": "subscribed", "rooms": joined, "denied": denied}))
+        log.info("ws stream subscribe user=%s joined=%s denied=%s", self.user_id, len(joined), len(denied))
+
+    async def _unsubscribe(self, names):
+        left = []
+        for name in names:
+            group_name = self._group_name(name)
+            if group_name in self.rooms:
+                await self.channel_layer.group_discard(group_name, self.channel_name)
+                left.append(self.rooms.pop(group_name))
+                for watch in [w for w in self.watches if w[0] == group_name]:
+                    self.watches.discard(watch)
+                    await database_sync_to_async(availability_push.unwatch)(group_name.removeprefix("group_"), watch[1])
+        await self.send(text_data=json.dumps({"action": "unsubscribed", "rooms": left}))
+
+    async def _handle_watch(self, action, data):
+        group_name = self._group_name(data.get("room"))
+        if not settings.AVAILABILITY_PUSH_DELTAS or not (group_name or "").startswith("group_"):
+            await self._error("availability push is not enabled for this room", data.get("room"))
+            return
+        if group_name not in self.rooms:
+            await self._error("not subscribed", data.get("room"))
+            return
+        group_id = group_name.removeprefix("group_")
+        if action == "unwatch_availability":
+            watch = (group_name, data.get("window"))
+            if watch in self.watches:
+                self.watches.discard(watch)
+                await database_sync_to_async(availability_push.unwatch)(group_id, watch[1])
+            return
+        try:
+            step = int(data.get("step", 30))
+            start, end = parse_window(data.get("start"), data.get("end"), step)
+        except (TypeError, ValueError) as e:
+            await self._error(str(e), data.get("room"))
+            return
+        if (group_name, availability_push.window_key(start, end, step)) in self.watches:
+            return
+        if len(self.watches) >= settings.AVAILABILITY_WATCH_MAX_PER_SOCKET:
+            await self._error(f"at most {settings.AVAILABILITY_WATCH_MAX_PER_SOCKET} watched windows per connection", data.get("room"))
+            return
+        try:
+            key, snapshot = await database_sync_to_async(availability_push.watch)(group_id, start, end, step)
+        except ValueError as e:
+            await self._error(str(e), data.get("room"))
+            return
+        self.watches.add((group_name, key))
+        await self._send_tagged(group_name, snapshot)
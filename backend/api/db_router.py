@@ -0,0 +1,107 @@
+import contextvars
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+log = logging.getLogger(__name__)
+
+# Read-replica routing. Reads go to a replica only inside GET requests for the
+# views listed in REPLICA_READ_VIEWS; everything else, and all writes, use the
+# primary. A user whose request changed data reads from the primary for the
+# next REPLICA_STICKY_SECONDS (tracked in the shared cache, so it holds across
+# processes), so nobody sees their own write go missing. User lookups always
+# use the primary so freshly registered accounts can authenticate.
+
+PRIMARY = "default"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_current = contextvars.ContextVar("replica_reads", default=None)
+
+
+def _sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+class _Reads:
+    __slots__ = ("request", "enabled", "alias")
+
+    def __init__(self, request):
+        self.request = request
+        self.enabled = False
+        self.alias = None
+
+    def resolve(self):
+        # Decided on the first read, after DRF has authenticated the user.
+        if self.alias is None:
+            user = getattr(self.request, "user", None)
+            sticky = user is not None and user.is_authenticated and cache.get(_sticky_key(user.pk))
+            self.alias = PRIMARY if sticky else random.choice(settings.DATABASE_REPLICAS)
+        return self.alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = _current.get()
+        if reads is None or not reads.enabled or not settings.DATABASE_REPLICAS or model is get_user_model():
+            return PRIMARY
+        return reads.resolve()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
+
+
+class ReplicaMiddleware:
+    """Enables replica reads for REPLICA_READ_VIEWS and pins writers to the primary."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        token = _current.set(_Reads(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._after(request, response)
+        return response
+
+    async def _acall(self, request):
+        token = _current.set(_Reads(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        # The cache client blocks; keep it off the event loop.
+        await sync_to_async(self._after)(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        reads = _current.get()
+        if reads is not None and request.method in SAFE_METHODS:
+            reads.enabled = request.resolver_match.url_name in settings.REPLICA_READ_VIEWS
+
+    def _after(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not settings.DATABASE_REPLICAS:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            try:
+                cache.set(_sticky_key(user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+            except Exception:
+                log.exception("could not pin user=%s to the primary", user.pk)
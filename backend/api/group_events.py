@@ -0,0 +1,107 @@
+from django.utils import timezone
+
+from .models import Event, GroupEvent, GroupEventAttendee, Membership
+from .utils import broadcast_group_event, broadcast_schedules_change
+
+# Attendee and personal-event fan-out for group events. Every function here
+# runs a fixed number of queries whatever the group size (bulk inserts are
+# batched by the database backend) and returns the ids of the schedules whose
+# events it changed, for announce().
+
+DETAIL_FIELDS = ('title', 'start', 'end', 'description')
+
+
+def _personal_event(group_event, schedule_id):
+    event = Event(
+        schedule_id=schedule_id, title=group_event.title, start=group_event.start,
+        end=group_event.end, description=group_event.description,
+    )
+    event.refresh_series_end()
+    return event
+
+
+def sync(group_event, details_changed=False):
+    """Give every member an attendee row and every attending member a personal event matching group_event."""
+    schedule_of = dict(Membership.objects.filter(group_id=group_event.group_id).values_list('id', 'active_schedule_id'))
+    rows = list(GroupEventAttendee.objects.filter(group_event=group_event).values_list(
+        'id', 'membership_id', 'rsvp', 'personal_event_id', 'personal_event__schedule_id',
+    ))
+    linked = {event_id: schedule_id for _, _, _, event_id, schedule_id in rows if event_id}
+    touched = set(linked.values())
+
+    if group_event.status == GroupEvent.CANCELLED:
+        if linked:
+            Event.objects.filter(id__in=linked).delete()
+        return touched
+
+    if details_changed and linked:
+        Event.objects.filter(id__in=linked).update(
+            title=group_event.title, start=group_event.start, end=group_event.end,
+            description=group_event.description, series_end=group_event.end,
+        )
+
+    events, relinked = [], []
+    for attendee_id, membership_id, rsvp, event_id, _ in rows:
+        schedule_id = schedule_of.get(membership_id)
+        if event_id is None and schedule_id and rsvp != GroupEventAttendee.DECLINED:
+            events.append(_personal_event(group_event, schedule_id))
+            relinked.append(GroupEventAttendee(id=attendee_id, personal_event=events[-1]))
+    invited = {membership_id for _, membership_id, _, _, _ in rows}
+    attendees = []
+    for membership_id, schedule_id in schedule_of.items():
+        if membership_id in invited:
+            continue
+        attendee = GroupEventAttendee(group_event=group_event, membership_id=membership_id)
+        if schedule_id:
+            events.append(_personal_event(group_event, schedule_id))
+            attendee.personal_event = events[-1]
+        attendees.append(attendee)
+
+    Event.objects.bulk_create(events)
+    GroupEventAttendee.objects.bulk_create(attendees)
+    if relinked:
+        GroupEventAttendee.objects.bulk_update(relinked, ['personal_event'])
+    return touched | {event.schedule_id for event in events}
+
+
+def delete(group_event):
+    linked = dict(
+        Event.objects.filter(from_group_attendance__group_event=group_event).values_list('id', 'schedule_id')
+    )
+    if linked:
+        Event.objects.filter(id__in=linked).delete()
+    group_event.delete()
+    return set(linked.values())
+
+
+def respond(attendee, rsvp):
+    """Record attendee's RSVP (accepted or declined) to the event's current version."""
+    group_event = attendee.group_event
+    touched = set()
+    attendee.rsvp = rsvp
+    attendee.responded_at = timezone.now()
+    if rsvp == GroupEventAttendee.ACCEPTED:
+        attendee.accepted_version = group_event.version
+        schedule_id = attendee.membership.active_schedule_id
+        if attendee.personal_event_id is None and schedule_id and group_event.status == GroupEvent.SCHEDULED:
+            attendee.personal_event = _personal_event(group_event, schedule_id)
+            attendee.personal_event.save()
+            touched.add(schedule_id)
+    else:
+        attendee.accepted_version = None
+        if attendee.personal_event_id is not None:
+            touched.add(attendee.personal_event.schedule_id)
+            attendee.personal_event.delete()
+            attendee.personal_event = None
+    attendee.save(update_fields=['rsvp', 'responded_at', 'accepted_version', 'personal_event'])
+    return touched
+
+
+def announce(group_event, schedule_ids, action, **extra):
+    """Send schedule_ids through the usual schedule-change path and one group_event_changed to the group."""
+    if schedule_ids:
+        broadcast_schedules_change(schedule_ids)
+    broadcast_group_event(group_event.group_id, {
+        'type': 'group_event_changed', 'action': action, 'groupId': str(group_event.group_id),
+        'groupEventId': str(group_event.id), 'version': group_event.version, **extra,
+    })
@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils.dateparse import parse_datetime
+
+from . import recurrence
+
+# Minimal streaming iCalendar (RFC 5545) reader/writer for schedule import and
+# export. VEVENT start/end/summary/description map onto Event, plus RRULE and
+# EXDATE when the rule is within the subset api/recurrence.py supports.
+
+_DURATION = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+class ICSError(ValueError):
+    pass
+
+
+def unfold(raw_lines):
+    """Yield logical content lines from an iterable of bytes/str physical lines."""
+    current = None
+    for raw in raw_lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="replace")
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _split(line):
+    head, sep, value = line.partition(":")
+    if not sep:
+        raise ICSError(f"Malformed line: {line[:60]}")
+    name, *params = head.split(";")
+    parsed = {}
+    for p in params:
+        k, _, v = p.partition("=")
+        parsed[k.upper()] = v.strip('"')
+    return name.upper(), parsed, value
+
+
+def _unescape(value):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _parse_dt(value, params):
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime.strptime(value, "%Y%m%d").replace(tzinfo=dt_timezone.utc), True
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=dt_timezone.utc), False
+        naive = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise ICSError(f"Invalid date-time: {value}")
+    tz = dt_timezone.utc
+    if "TZID" in params:
+        try:
+            tz = ZoneInfo(params["TZID"])
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return naive.replace(tzinfo=tz), False
+
+
+def _is_utc(dt):
+    # Offset zero in both halves of the year, so UTC aliases pass and zones
+    # like Europe/London (GMT in winter only) do not.
+    return dt.utcoffset() == timedelta(0) and dt.tzinfo.utcoffset(dt + timedelta(days=182)) == timedelta(0)
+
+
+def _parse_duration(value):
+    m = _DURATION.match(value)
+    if not m:
+        raise ICSError(f"Invalid duration: {value}")
+    sign, w, d, h, mi, s = m.groups()
+    delta = timedelta(weeks=int(w or 0), days=int(d or 0), hours=int(h or 0), minutes=int(mi or 0), seconds=int(s or 0))
+    return -delta if sign == "-" else delta
+
+
+def parse_events(raw_lines):
+    """Yield one dict per VEVENT (title, start, end, description), in file order."""
+    event = None
+    depth = 0
+    for line in unfold(raw_lines):
+        if not line:
+            continue
+        name, params, value = _split(line)
+        if name == "BEGIN":
+            if event is not None:
+                depth += 1
+            elif value.upper() == "VEVENT":
+                event = {"props": {}}
+            continue
+        if name == "END":
+            if event is None:
+                continue
+            if depth:
+                depth -= 1
+                continue
+            yield _to_event(event["props"])
+            event = None
+            continue
+        if event is not None and not depth and name not in event["props"]:
+            event["props"][name] = (params, value)
+    if event is not None:
+        raise ICSError("Unterminated VEVENT")
+
+
+def _to_event(props):
+    if "DTSTART" not in props:
+        raise ICSError("VEVENT without DTSTART")
+    start, all_day = _parse_dt(props["DTSTART"][1], props["DTSTART"][0])
+    if "DTEND" in props:
+        end, _ = _parse_dt(props["DTEND"][1], props["DTEND"][0])
+    elif "DURATION" in props:
+        end = start + _parse_duration(props["DURATION"][1])
+    else:
+        end = start + timedelta(days=1) if all_day else start
+    title = _unescape(props.get("SUMMARY", ({}, ""))[1]).strip() or "Busy"
+    event = {
+        "title": title[:100],
+        "start": start,
+        "end": end,
+        "description": _unescape(props.get("DESCRIPTION", ({}, ""))[1]),
+    }
+    if "RRULE" in props and end > start:
+        try:
+            recurrence.series_end(start, end, props["RRULE"][1])
+            if not _is_utc(start):
+                # Rules are expanded in UTC, which would shift a local-time
+                # series across DST changes and move BYDAY across midnight.
+                raise recurrence.RecurrenceError("RRULE with a non-UTC TZID")
+        except recurrence.RecurrenceError:
+            pass  # outside the supported subset; keep the first occurrence only
+        else:
+            event["rrule"] = props["RRULE"][1].upper()
+            event["exdates"] = [
+                _parse_dt(v, props["EXDATE"][0])[0].astimezone(dt_timezone.utc).isoformat().replace("+00:00", "Z")
+                for v in props["EXDATE"][1].split(",")
+            ] if "EXDATE" in props else []
+    return event
+
+
+def _fold(line):
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    chunk = ""
+    size = 0
+    limit = 75
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > limit:
+            parts.append(chunk)
+            chunk, size, limit = "", 0, 74
+        chunk += ch
+        size += n
+    parts.append(chunk)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _fmt(dt):
+    return dt.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+async def aiter_calendar(events, name="Converge"):
+    """Yield an iCalendar document chunk by chunk for an async iterable of dicts with id/title/start/end/description.
+
+    Async so that ASGI servers stream it; a sync iterator would be consumed
+    whole in a worker thread before the first byte is sent.
+    """
+    stamp = _fmt(datetime.now(dt_timezone.utc))
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Converge//Schedule Export//EN\r\n"
+    yield _fold(f"X-WR-CALNAME:{_escape(name)}")
+    async for e in events:
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{e['id']}@converge",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{_fmt(e['start'])}",
+            f"DTEND:{_fmt(e['end'])}",
+            f"SUMMARY:{_escape(e['title'])}",
+        ]
+        if e.get("rrule"):
+            lines.append(f"RRULE:{e['rrule']}")
+            if e.get("exdates"):
+                lines.append("EXDATE:" + ",".join(_fmt(parse_datetime(d)) for d in e["exdates"]))
+        if e["description"]:
+            lines.append(f"DESCRIPTION:{_escape(e['description'])}")
+        lines.append("END:VEVENT")
+        yield "".join(_fold(line) for line in lines)
+    yield "END:VCALENDAR\r\n"
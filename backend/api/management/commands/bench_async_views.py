@@ -0,0 +1,116 @@
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from channels.testing import HttpCommunicator
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import availability_cache
+from api.async_views import EventListAsyncView, GroupAvailabilityAsyncView
+from api.models import Event, Group, Membership, Schedule, User
+from api.views import EventListCreateView, GroupAvailabilityView
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def urlconf(availability_view, events_view):
+    # A class rather than a module: URL resolvers are cached by urlconf, so it must be hashable.
+    return type("BenchURLConf", (), {"urlpatterns": [
+        path("api/groups/<uuid:group_id>/availability/", availability_view.as_view()),
+        path("api/schedules/<uuid:schedule_id>/events/", events_view.as_view()),
+    ]})
+
+
+class Command(BaseCommand):
+    help = "Compare sync and async availability/event list views under concurrent in-flight requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", default="50,200,500", help="Comma-separated in-flight request counts.")
+        parser.add_argument("--requests", type=int, default=1000, help="Requests per run (at least the concurrency).")
+        parser.add_argument("--members", type=int, default=20)
+        parser.add_argument("--events-per-member", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        start = datetime(2025, 3, 3, tzinfo=dt_timezone.utc)
+        suffix = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            users = [User.objects.create_user(f"async-bench-{suffix}-{i}@example.com", "bench") for i in range(opts["members"])]
+            group = Group.objects.create(name=f"async bench {suffix}", admin=users[0])
+            schedules = []
+            for user in users:
+                schedule = Schedule.objects.create(user=user, name="bench")
+                schedules.append(schedule)
+                Membership.objects.create(user=user, group=group, active_schedule=schedule)
+                events = []
+                for _ in range(opts["events_per_member"]):
+                    s = start + timedelta(minutes=rng.randrange(7 * 1440))
+                    events.append(Event(schedule=schedule, title="busy", start=s, end=s + timedelta(minutes=rng.choice((30, 60, 90)))))
+                    events[-1].refresh_series_end()
+                Event.objects.bulk_create(events)
+
+        headers = [(b"authorization", f"Bearer {AccessToken.for_user(users[0])}".encode())]
+        window = "start=2025-03-03T00:00:00Z&end=2025-03-10T00:00:00Z"
+        targets = {
+            "availability": f"/api/groups/{group.id}/availability/?{window}&step=30",
+            "events": f"/api/schedules/{schedules[0].id}/events/?{window}",
+        }
+        modes = {
+            "sync": urlconf(GroupAvailabilityView, EventListCreateView),
+            "async": urlconf(GroupAvailabilityAsyncView, EventListAsyncView),
+        }
+        try:
+            application = get_asgi_application()
+            for concurrency in [int(c) for c in opts["concurrency"].split(",")]:
+                total = max(concurrency, opts["requests"])
+                for name, target in targets.items():
+                    for mode, conf in modes.items():
+                        # An in-process cache, so a run neither flushes the shared one nor
+                        # serves bodies the previous run left in the result cache.
+                        with override_settings(ROOT_URLCONF=conf, CACHES=LOCMEM_CACHES):
+                            cache.clear()
+                            availability_cache.clear()
+                            elapsed, latencies, errors = asyncio.run(self.run(application, target, headers, total, concurrency))
+                        self.report(f"{name}/{mode}", concurrency, elapsed, latencies, errors)
+        finally:
+            group.delete()
+            User.objects.filter(id__in=[u.id for u in users]).delete()
+
+    async def run(self, application, target, headers, total, concurrency):
+        sem = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                comm = HttpCommunicator(application, "GET", target, headers=headers)
+                response = await comm.get_response(timeout=120)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                await comm.send_input({"type": "http.disconnect"})
+                await comm.wait(timeout=10)
+                if response["status"] != 200:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return time.perf_counter() - t0, latencies, errors
+
+    def report(self, label, concurrency, elapsed, latencies, errors):
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{label:>18} c={concurrency:<4} n={len(latencies)} rps={len(latencies) / elapsed:.1f} "
+            f"p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms errors={errors}"
+        )
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import availability
+
+
+def loop_busy_counts(start, end, step, schedule_ids, by_sched):
+    # The original GroupAvailabilityView loop, kept as the benchmark baseline.
+    counts = []
+    step_delta = timedelta(minutes=step)
+    cursor = start
+    while cursor < end:
+        slot_end = min(cursor + step_delta, end)
+        busy_count = 0
+        for sid in schedule_ids:
+            for s, ev in by_sched.get(sid, []):
+                if not (ev <= cursor or s >= slot_end):
+                    busy_count += 1
+                    break
+        counts.append(busy_count)
+        cursor = slot_end
+    return counts
+
+
+def synthetic_events(start, end, members, events_per_member, seed):
+    rng = random.Random(seed)
+    span = int((end - start).total_seconds() // 60)
+    schedule_ids = [f"schedule-{i}" for i in range(members)]
+    by_sched = {}
+    for sid in schedule_ids:
+        for _ in range(events_per_member):
+            s = start + timedelta(minutes=rng.randrange(span))
+            by_sched.setdefault(sid, []).append((s, s + timedelta(minutes=rng.choice((15, 30, 60, 90, 120)))))
+    return schedule_ids, by_sched
+
+
+class Command(BaseCommand):
+    help = "Benchmark the availability engines (original loop, sweep, bitmap) on synthetic groups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", default="10,100,1000", help="Comma-separated group sizes.")
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--step", type=int, default=30)
+        parser.add_argument("--events-per-member", type=int, default=40)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--skip-loop-above", type=int, default=1000,
+                            help="Skip the original loop for groups larger than this.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        engines = [("sweep", availability.busy_counts)]
+        if availability.np is not None:
+            engines.append(("bitmap", availability.busy_counts_bitmap))
+        else:
+            self.stderr.write("numpy is not installed; skipping the bitmap engine")
+
+        try:
+            sizes = [int(m) for m in opts["members"].split(",")]
+        except ValueError:
+            raise CommandError("--members must be a comma-separated list of integers")
+
+        start = datetime(2025, 1, 6, tzinfo=dt_timezone.utc)
+        end = start + timedelta(days=opts["days"])
+        step = opts["step"]
+        self.stdout.write(f"window={opts['days']}d step={step}m events/member={opts['events_per_member']}")
+        self.stdout.write(f"{'members':>8} {'engine':>8} {'best ms':>10} {'speedup':>8}")
+
+        for members in sizes:
+            schedule_ids, by_sched = synthetic_events(start, end, members, opts["events_per_member"], opts["seed"])
+            runs = list(engines)
+            if members <= opts["skip_loop_above"]:
+                runs.insert(0, ("loop", loop_busy_counts))
+            expected = None
+            baseline_ms = None
+            for name, fn in runs:
+                best = None
+                for _ in range(opts["repeat"]):
+                    t0 = time.perf_counter()
+                    counts = fn(start, end, step, schedule_ids, by_sched)
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    best = elapsed if best is None else min(best, elapsed)
+                if expected is None:
+                    expected = counts
+                elif counts != expected:
+                    raise CommandError(f"{name} disagrees with {runs[0][0]} at members={members}")
+                if baseline_ms is None:
+                    baseline_ms = best
+                self.stdout.write(f"{members:>8} {name:>8} {best:>10.2f} {baseline_ms / best:>7.1f}x")
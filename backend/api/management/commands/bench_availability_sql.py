@@ -0,0 +1,89 @@
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import availability, availability_sql
+from api.models import Event, Schedule, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark SQL-side availability (tstzrange + GiST) against the Python path. PostgreSQL only; data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", default="10,100,1000", help="Comma-separated group sizes.")
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--step", type=int, default=30)
+        parser.add_argument("--events-per-member", type=int, default=200,
+                            help="Events per schedule, spread over ten times the window.")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        if not availability_sql.supported():
+            raise CommandError("bench_availability_sql needs a PostgreSQL database")
+        sizes = [int(m) for m in opts["members"].split(",")]
+        try:
+            with transaction.atomic():
+                self.run(sizes, opts)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, opts):
+        rng = random.Random(opts["seed"])
+        start = datetime(2025, 1, 6, tzinfo=dt_timezone.utc)
+        end = start + timedelta(days=opts["days"])
+        horizon = int((end - start).total_seconds() // 60) * 10
+        step = opts["step"]
+
+        owner = User.objects.create_user(f"bench-{uuid.uuid4().hex}@example.com", "bench")
+        schedules = Schedule.objects.bulk_create(
+            Schedule(user=owner, name=f"bench {i}") for i in range(max(sizes))
+        )
+        events = []
+        for sc in schedules:
+            for _ in range(opts["events_per_member"]):
+                s = start - timedelta(minutes=horizon // 2) + timedelta(minutes=rng.randrange(horizon))
+                e = s + timedelta(minutes=rng.choice((15, 30, 60, 90, 120)))
+                events.append(Event(schedule=sc, title="bench", start=s, end=e, series_end=e))
+        Event.objects.bulk_create(events, batch_size=5000)
+        self.stdout.write(f"seeded {len(schedules)} schedules, {len(events)} events")
+        self.stdout.write(f"{'members':>8} {'path':>8} {'best ms':>10} {'rows':>8}")
+
+        for members in sizes:
+            ids = [sc.id for sc in schedules[:members]]
+
+            def python_path():
+                rows = Event.objects.filter(
+                    schedule_id__in=ids, end__gt=start, start__lt=end
+                ).values_list("schedule_id", "start", "end")
+                by_sched = {}
+                for sid, s, e in rows:
+                    by_sched.setdefault(sid, []).append((s, e))
+                return availability.busy_counts(start, end, step, ids, by_sched), len(rows)
+
+            def sql_path():
+                counts = availability_sql.busy_counts_sql(start, end, step, ids)
+                return counts, sum(1 for c in counts if c)
+
+            expected = None
+            for name, fn in (("python", python_path), ("sql", sql_path)):
+                best = None
+                for _ in range(opts["repeat"]):
+                    t0 = time.perf_counter()
+                    counts, rows = fn()
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    best = elapsed if best is None else min(best, elapsed)
+                if expected is None:
+                    expected = counts
+                elif counts != expected:
+                    raise CommandError(f"sql path disagrees with python path at members={members}")
+                self.stdout.write(f"{members:>8} {name:>8} {best:>10.2f} {rows:>8}")
@@ -0,0 +1,133 @@
+import asyncio
+import copy
+import statistics
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from channels.layers import channel_layers
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import metrics
+from api.models import Group, Membership, User
+
+MODES = ("per-request", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request, persistent (CONN_MAX_AGE) and pooled database connections on connect-heavy "
+        "workloads: authenticated API requests and WebSocket connects with the auth cache off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", default=",".join(MODES))
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--max-age", type=int, default=600, help="CONN_MAX_AGE for the persistent mode.")
+        parser.add_argument("--pool-max-size", type=int, default=10)
+
+    def handle(self, *args, **opts):
+        from backend.asgi import application
+
+        suffix = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            user = User.objects.create_user(f"db-bench-{suffix}@example.com", "bench")
+            group = Group.objects.create(name=f"db bench {suffix}", admin=user)
+            Membership.objects.create(user=user, group=group)
+        token = str(AccessToken.for_user(user))
+        workloads = {
+            "http": lambda: self.http(application, "/api/groups/", token),
+            "ws": lambda: self.ws(application, f"/ws/groups/{group.id}/?token={token}"),
+        }
+
+        db = connections.settings["default"]
+        saved = copy.deepcopy({k: db[k] for k in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")})
+        layers = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        try:
+            with override_settings(CHANNEL_LAYERS=layers, WS_AUTH_CACHE_TTL=0):
+                channel_layers.backends.clear()
+                for mode in opts["modes"].split(","):
+                    if not self.configure(db, mode, opts):
+                        continue
+                    for name, workload in workloads.items():
+                        result = asyncio.run(self.run(workload, opts["requests"], opts["concurrency"]))
+                        self.report(f"{name}/{mode}", opts["concurrency"], *result)
+                    self.reset(db, saved)
+        finally:
+            self.reset(db, saved)
+            channel_layers.backends.clear()
+            group.delete()
+            user.delete()
+
+    def configure(self, db, mode, opts):
+        if mode == "per-request":
+            db["CONN_MAX_AGE"] = 0
+        elif mode == "persistent":
+            db["CONN_MAX_AGE"] = opts["max_age"]
+            db["CONN_HEALTH_CHECKS"] = True
+        elif mode == "pool":
+            if connection.vendor != "postgresql" or not connection.features.is_psycopg3:
+                self.stdout.write("pool: skipped, needs PostgreSQL with psycopg 3")
+                return False
+            db["CONN_MAX_AGE"] = 0
+            db["OPTIONS"] = {**db["OPTIONS"], "pool": {"min_size": 2, "max_size": opts["pool_max_size"], "timeout": 30}}
+        else:
+            self.stderr.write(f"unknown mode {mode}")
+            return False
+        return True
+
+    def reset(self, db, saved):
+        connections.close_all()
+        if "pool" in db["OPTIONS"] and hasattr(connection, "close_pool"):
+            connection.close_pool()
+        db.update(copy.deepcopy(saved))
+
+    async def http(self, application, target, token):
+        comm = HttpCommunicator(application, "GET", target, headers=[(b"authorization", f"Bearer {token}".encode())])
+        response = await comm.get_response(timeout=60)
+        await comm.send_input({"type": "http.disconnect"})
+        await comm.wait(timeout=10)
+        return response["status"] == 200
+
+    async def ws(self, application, path):
+        comm = WebsocketCommunicator(application, path)
+        connected, _ = await comm.connect(timeout=60)
+        if connected:
+            await comm.disconnect()
+        return connected
+
+    async def run(self, workload, total, concurrency):
+        # Sync code runs on asgiref's shared thread; start and finish it with no open connection.
+        await sync_to_async(connections.close_all)()
+        opened = sum(v for _, v in metrics.DB_CONNECTIONS.samples())
+        sem = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                ok = await workload()
+                latencies.append((time.perf_counter() - t0) * 1000)
+                errors += not ok
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - t0
+        opened = sum(v for _, v in metrics.DB_CONNECTIONS.samples()) - opened
+        await sync_to_async(connections.close_all)()
+        return elapsed, latencies, errors, opened
+
+    def report(self, label, concurrency, elapsed, latencies, errors, opened):
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{label:>16} c={concurrency:<4} n={len(latencies)} rps={len(latencies) / elapsed:.1f} "
+            f"p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms connections={opened} errors={errors}"
+        )
@@ -0,0 +1,65 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from api.models import Event, Schedule, User
+
+
+class Command(BaseCommand):
+    help = "Benchmark event listing (full, windowed, keyset pages) on a large synthetic schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=100_000)
+        parser.add_argument("--days", type=int, default=3 * 365)
+        parser.add_argument("--limit", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        origin = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        span = opts["days"] * 1440
+        with transaction.atomic():
+            user = User.objects.create_user(f"event-bench-{uuid.uuid4().hex[:8]}@example.com", "bench")
+            schedule = Schedule.objects.create(user=user, name="bench")
+            events = []
+            for _ in range(opts["events"]):
+                start = origin + timedelta(minutes=rng.randrange(span))
+                event = Event(schedule=schedule, title="busy", start=start, end=start + timedelta(minutes=rng.choice((30, 60, 90))))
+                event.refresh_series_end()
+                events.append(event)
+            Event.objects.bulk_create(events, batch_size=5000)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f"/api/schedules/{schedule.id}/events/"
+        middle = origin + timedelta(days=opts["days"] // 2)
+        week = {"start": middle.isoformat(), "end": (middle + timedelta(days=7)).isoformat()}
+        try:
+            self.measure("full list", opts["repeat"], lambda: client.get(url))
+            self.measure("week window", opts["repeat"], lambda: client.get(url, week))
+            self.measure("first page", opts["repeat"], lambda: client.get(url, {"limit": opts["limit"]}))
+            deep = client.get(url, {"limit": opts["limit"]})
+            for _ in range(50):
+                deep = client.get(deep.data["next"])
+            self.measure("page 51", opts["repeat"], lambda: client.get(deep.data["next"]))
+            self.measure("week window page", opts["repeat"], lambda: client.get(url, {**week, "limit": opts["limit"]}))
+        finally:
+            user.delete()
+
+    def measure(self, label, repeat, call):
+        times = []
+        size = 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            response = call()
+            times.append((time.perf_counter() - t0) * 1000)
+            size = len(response.content)
+            assert response.status_code == 200, response.status_code
+        self.stdout.write(f"{label:>17}: median={statistics.median(times):.1f}ms bytes={size}")
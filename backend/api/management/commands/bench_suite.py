@@ -0,0 +1,240 @@
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+from channels.layers import channel_layers, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import availability_cache, busy_cache, synthetic
+from api.models import User
+
+SCENARIOS = ("availability", "event_crud", "bulk_members", "ws_connect", "ws_fanout")
+
+
+def summarize(name, samples_ms, **extra):
+    samples = sorted(samples_ms)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+    return {
+        "name": name,
+        "n": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(samples[-1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        **extra,
+    }
+
+
+def timed(call):
+    t0 = time.perf_counter()
+    result = call()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the benchmark suite (availability, event CRUD with broadcast, bulk membership add, "
+        "WebSocket connect/fan-out) on synthetic data and print JSON results."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--members-per-group", type=int, default=25)
+        parser.add_argument("--groups", type=int, default=2)
+        parser.add_argument("--events-per-schedule", type=int, default=100)
+        parser.add_argument("--days", type=int, default=28)
+        parser.add_argument("--density", choices=synthetic.DENSITIES, default="workweek")
+        parser.add_argument("--bulk-size", type=int, default=50, help="Emails per bulk membership request.")
+        parser.add_argument("--fanout", type=int, default=100, help="WebSocket clients for the fan-out scenario.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--cache", choices=("locmem", "configured"), default="locmem",
+                            help="Use an in-process cache (default) or the configured one (Redis).")
+
+    def handle(self, *args, **opts):
+        scenarios = [s for s in opts["scenarios"].split(",") if s]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError("unknown scenarios: " + ", ".join(sorted(unknown)))
+
+        overrides = {
+            "CHANNEL_LAYERS": {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+            "BROADCAST_COALESCE_MS": 0,
+            "REALTIME_OUTBOX": False,
+        }
+        if opts["cache"] == "locmem":
+            overrides["CACHES"] = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        report = {"meta": self.meta(opts), "results": []}
+        with override_settings(**overrides):
+            channel_layers.backends.clear()
+            try:
+                tenant = synthetic.generate(
+                    prefix, tenants=1, groups_per_tenant=opts["groups"],
+                    members_per_group=opts["members_per_group"],
+                    events_per_schedule=opts["events_per_schedule"], days=opts["days"],
+                    density=opts["density"], seed=opts["seed"],
+                )[0]
+                for scenario in scenarios:
+                    self.stderr.write(f"running {scenario}")
+                    report["results"].extend(getattr(self, f"bench_{scenario}")(tenant, opts))
+            finally:
+                synthetic.delete_tenants(prefix)
+                User.objects.filter(email__startswith=f"{prefix}-bulk").delete()
+                channel_layers.backends.clear()
+
+        out = json.dumps(report, indent=2)
+        if opts["output"]:
+            with open(opts["output"], "w") as f:
+                f.write(out + "\n")
+        else:
+            self.stdout.write(out)
+
+    def meta(self, opts):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "params": {k: v for k, v in opts.items() if k in (
+                "repeat", "members_per_group", "groups", "events_per_schedule", "days", "density",
+                "bulk_size", "fanout", "seed", "cache",
+            )},
+        }
+
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def bench_availability(self, tenant, opts):
+        client = self.client(tenant.users[0])
+        group = tenant.groups[0]
+        start = synthetic.ORIGIN
+        params = {"start": start.isoformat(), "end": (start + timedelta(days=7)).isoformat(), "step": "15"}
+        url = f"/api/groups/{group.id}/availability/"
+        cold, warm, cached, not_modified = [], [], [], []
+        for _ in range(opts["repeat"]):
+            for schedule in tenant.schedules:
+                busy_cache.invalidate(schedule.id)
+            availability_cache.clear()
+            cold.append(timed(lambda: client.get(url, params))[0])
+            availability_cache.clear()
+            warm.append(timed(lambda: client.get(url, params))[0])
+            ms, response = timed(lambda: client.get(url, params))
+            cached.append(ms)
+            etag = response["ETag"]
+            not_modified.append(timed(lambda: client.get(url, params, HTTP_IF_NONE_MATCH=etag))[0])
+        size = len(response.content)
+        members = opts["members_per_group"]
+        return [
+            summarize("availability.cold", cold, members=members, bytes=size),
+            summarize("availability.warm_busy_cache", warm, members=members, bytes=size),
+            summarize("availability.cached_body", cached, members=members, bytes=size),
+            summarize("availability.not_modified", not_modified, members=members),
+        ]
+
+    def bench_event_crud(self, tenant, opts):
+        schedule = tenant.schedules[0]
+        client = self.client(tenant.users[0])
+        url = f"/api/schedules/{schedule.id}/events/"
+        start = synthetic.ORIGIN + timedelta(days=3, hours=8)
+        create, update, delete = [], [], []
+        for i in range(opts["repeat"]):
+            body = {"title": f"bench {i}", "start": start.isoformat(), "end": (start + timedelta(hours=1)).isoformat()}
+            ms, response = timed(lambda: client.post(url, body, format="json"))
+            create.append(ms)
+            event_url = f"{url}{response.data['id']}/"
+            update.append(timed(lambda: client.patch(event_url, {"title": "moved"}, format="json"))[0])
+            delete.append(timed(lambda: client.delete(event_url))[0])
+        return [
+            summarize("event.create", create, broadcast=True),
+            summarize("event.update", update, broadcast=True),
+            summarize("event.delete", delete, broadcast=True),
+        ]
+
+    def bench_bulk_members(self, tenant, opts):
+        client = self.client(tenant.users[0])
+        group = tenant.groups[0]
+        prefix = tenant.users[0].email.split("-t0-")[0]
+        samples = []
+        for i in range(opts["repeat"]):
+            emails = [f"{prefix}-bulk{i}-{j}@example.com" for j in range(opts["bulk_size"])]
+            User.objects.bulk_create([User(email=e, display_name=e.split("@")[0]) for e in emails])
+            samples.append(timed(lambda: client.post(f"/api/groups/{group.id}/members/", {"emails": emails}, format="json"))[0])
+        return [summarize("members.bulk_add", samples, emails=opts["bulk_size"])]
+
+    def bench_ws_connect(self, tenant, opts):
+        from backend.asgi import application
+
+        cache.clear()
+        path = f"/ws/groups/{tenant.groups[0].id}/?token={AccessToken.for_user(tenant.users[0])}"
+
+        async def run():
+            samples = []
+            for _ in range(opts["repeat"]):
+                comm = WebsocketCommunicator(application, path)
+                t0 = time.perf_counter()
+                connected, _ = await comm.connect(timeout=10)
+                samples.append((time.perf_counter() - t0) * 1000)
+                if not connected:
+                    raise CommandError("WebSocket connect was rejected")
+                await comm.disconnect()
+            return samples
+
+        return [summarize("ws.connect", asyncio.run(run()))]
+
+    def bench_ws_fanout(self, tenant, opts):
+        from backend.asgi import application
+
+        group = tenant.groups[0]
+        members = tenant.users
+        paths = [
+            f"/ws/groups/{group.id}/?token={AccessToken.for_user(members[i % len(members)])}"
+            for i in range(opts["fanout"])
+        ]
+        room = f"group_{group.id}"
+
+        async def run():
+            comms = [WebsocketCommunicator(application, p) for p in paths]
+            for comm in comms:
+                connected, _ = await comm.connect(timeout=10)
+                if not connected:
+                    raise CommandError("WebSocket connect was rejected")
+            layer = get_channel_layer()
+            samples = []
+            try:
+                for i in range(opts["repeat"]):
+                    t0 = time.perf_counter()
+                    await layer.group_send(room, {"type": "broadcast", "room": room, "event": {"type": "bench", "seq": i}})
+                    await asyncio.gather(*(comm.receive_json_from(timeout=10) for comm in comms))
+                    samples.append((time.perf_counter() - t0) * 1000)
+            finally:
+                for comm in comms:
+                    await comm.disconnect()
+            return samples
+
+        return [summarize("ws.fanout", asyncio.run(run()), clients=opts["fanout"])]
@@ -0,0 +1,75 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from channels.layers import channel_layers
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Group, Membership, User
+
+
+class Command(BaseCommand):
+    help = "Measure WebSocket connect latency (auth + permission check) with and without the auth cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connects", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--ttl", type=int, default=30, help="WS_AUTH_CACHE_TTL for the cached run.")
+
+    def handle(self, *args, **opts):
+        from backend.asgi import application
+
+        suffix = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            user = User.objects.create_user(f"ws-bench-{suffix}@example.com", "bench")
+            group = Group.objects.create(name=f"ws bench {suffix}", admin=user)
+            Membership.objects.create(user=user, group=group)
+        token = str(AccessToken.for_user(user))
+        path = f"/ws/groups/{group.id}/?token={token}"
+
+        try:
+            # An in-process cache, so clearing it between runs leaves the shared one alone.
+            with override_settings(
+                CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            ):
+                channel_layers.backends.clear()
+                for label, ttl in (("uncached", 0), ("cached", opts["ttl"])):
+                    with override_settings(WS_AUTH_CACHE_TTL=ttl):
+                        cache.clear()
+                        latencies = asyncio.run(self.run(application, path, opts["connects"], opts["concurrency"]))
+                    self.report(label, latencies)
+        finally:
+            channel_layers.backends.clear()
+            group.delete()
+            user.delete()
+
+    async def run(self, application, path, connects, concurrency):
+        sem = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with sem:
+                comm = WebsocketCommunicator(application, path)
+                t0 = time.perf_counter()
+                connected, _ = await comm.connect(timeout=10)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if connected:
+                    await comm.disconnect()
+
+        await asyncio.gather(*(one() for _ in range(connects)))
+        return latencies
+
+    def report(self, label, latencies):
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{label:>9}: n={len(latencies)} p50={statistics.median(latencies):.2f}ms "
+            f"p99={p99:.2f}ms mean={statistics.fmean(latencies):.2f}ms"
+        )
@@ -0,0 +1,164 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import resource
+import statistics
+import time
+import uuid
+
+from channels.layers import channel_layers, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Group, Membership, User
+
+
+def rss_bytes():
+    """Current resident set size; peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive backend.asgi.application in-process with N group sockets per room size and measure "
+        "connect rate, group_send -> client receive latency and memory per connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated room sizes.")
+        parser.add_argument("--messages", type=int, default=20, help="Broadcasts per room size.")
+        parser.add_argument("--concurrency", type=int, default=200, help="Connects in flight at once.")
+        parser.add_argument("--json", action="store_true", help="Print one JSON object per room size.")
+
+    def handle(self, *args, **opts):
+        from backend.asgi import application
+
+        try:
+            sizes = [int(s) for s in opts["sizes"].split(",") if s]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+
+        suffix = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            user = User.objects.create_user(f"ws-fanout-{suffix}@example.com", "bench")
+            group = Group.objects.create(name=f"ws fanout {suffix}", admin=user)
+            Membership.objects.create(user=user, group=group)
+        path = f"/ws/groups/{group.id}/?token={AccessToken.for_user(user)}"
+
+        # Every client is the same user, so after the first connect the
+        # permission check is served by the auth cache; this measures the
+        # socket and fan-out cost, not the database. The cache is in-process so
+        # clearing it leaves the shared one alone.
+        layers = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": 1000}}}
+        caches = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        try:
+            with override_settings(CHANNEL_LAYERS=layers, CACHES=caches, WS_AUTH_CACHE_TTL=300):
+                channel_layers.backends.clear()
+                cache.clear()
+                for size in sizes:
+                    with self.quiet():
+                        result = asyncio.run(self.run(application, path, f"group_{group.id}", size, opts))
+                    self.report(result, opts["json"])
+        finally:
+            channel_layers.backends.clear()
+            group.delete()
+            user.delete()
+
+    @contextlib.contextmanager
+    def quiet(self):
+        # Per-connection log lines and prints would dominate the measurement.
+        logging.disable(logging.INFO)
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                yield
+        finally:
+            logging.disable(logging.NOTSET)
+
+    async def run(self, application, path, room, size, opts):
+        sem = asyncio.Semaphore(opts["concurrency"])
+        comms = []
+        rejected = 0
+
+        async def connect():
+            nonlocal rejected
+            async with sem:
+                comm = WebsocketCommunicator(application, path)
+                connected, _ = await comm.connect(timeout=30)
+                if connected:
+                    comms.append(comm)
+                else:
+                    rejected += 1
+
+        rss_before = rss_bytes()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(connect() for _ in range(size)))
+        connect_s = time.perf_counter() - t0
+        rss_after = rss_bytes()
+        if rejected:
+            raise CommandError(f"{rejected} of {size} connects were rejected")
+
+        layer = get_channel_layer()
+        latencies = []
+        sent_at = {}
+        remaining = [0]
+        all_received = asyncio.Event()
+
+        async def receive(comm):
+            for _ in range(opts["messages"]):
+                message = json.loads(await comm.receive_from(timeout=60))
+                latencies.append((time.perf_counter() - sent_at[message["event"]["seq"]]) * 1000)
+                remaining[0] -= 1
+                if not remaining[0]:
+                    all_received.set()
+
+        receivers = [asyncio.create_task(receive(comm)) for comm in comms]
+        send_ms = []
+        try:
+            for seq in range(opts["messages"]):
+                remaining[0] = len(comms)
+                all_received.clear()
+                sent_at[seq] = time.perf_counter()
+                await layer.group_send(room, {"type": "broadcast", "room": room, "event": {"type": "bench", "seq": seq}})
+                send_ms.append((time.perf_counter() - sent_at[seq]) * 1000)
+                await asyncio.wait_for(all_received.wait(), timeout=60)
+            await asyncio.gather(*receivers)
+        finally:
+            for task in receivers:
+                task.cancel()
+            await asyncio.gather(*(comm.disconnect() for comm in comms), return_exceptions=True)
+
+        latencies.sort()
+        return {
+            "room_size": size,
+            "connect_per_s": round(size / connect_s, 1),
+            "rss_per_conn_kb": round((rss_after - rss_before) / size / 1024, 2),
+            "group_send_p50_ms": round(statistics.median(send_ms), 3),
+            "receive_p50_ms": round(statistics.median(latencies), 3),
+            "receive_p99_ms": round(percentile(latencies, 0.99), 3),
+            "receive_max_ms": round(latencies[-1], 3),
+            "messages": opts["messages"],
+        }
+
+    def report(self, result, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(result))
+            return
+        self.stdout.write(
+            f"room={result['room_size']:>6}: connect={result['connect_per_s']:.0f}/s "
+            f"mem={result['rss_per_conn_kb']:.1f}KiB/conn group_send p50={result['group_send_p50_ms']:.2f}ms "
+            f"receive p50={result['receive_p50_ms']:.2f}ms p99={result['receive_p99_ms']:.2f}ms"
+        )
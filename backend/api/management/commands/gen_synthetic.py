@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api import synthetic
+
+
+class Command(BaseCommand):
+    help = "Generate reproducible synthetic tenants (users, groups, schedules, events) for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="synthetic")
+        parser.add_argument("--tenants", type=int, default=1)
+        parser.add_argument("--groups-per-tenant", type=int, default=2)
+        parser.add_argument("--members-per-group", type=int, default=10)
+        parser.add_argument("--schedules-per-user", type=int, default=1)
+        parser.add_argument("--events-per-schedule", type=int, default=50)
+        parser.add_argument("--days", type=int, default=28)
+        parser.add_argument("--density", choices=synthetic.DENSITIES, default="uniform")
+        parser.add_argument("--recurring-ratio", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--delete", action="store_true", help="Remove the tenants created under --prefix instead.")
+
+    def handle(self, *args, **opts):
+        if opts["delete"]:
+            self.stdout.write(f"deleted {synthetic.delete_tenants(opts['prefix'])} users")
+            return
+        tenants = synthetic.generate(
+            opts["prefix"],
+            tenants=opts["tenants"],
+            groups_per_tenant=opts["groups_per_tenant"],
+            members_per_group=opts["members_per_group"],
+            schedules_per_user=opts["schedules_per_user"],
+            events_per_schedule=opts["events_per_schedule"],
+            days=opts["days"],
+            density=opts["density"],
+            recurring_ratio=opts["recurring_ratio"],
+            seed=opts["seed"],
+        )
+        self.stdout.write(json.dumps([
+            {"groups": [str(g.id) for g in t.groups], "users": len(t.users), "schedules": len(t.schedules)}
+            for t in tenants
+        ]))
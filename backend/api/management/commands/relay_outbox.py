@@ -0,0 +1,48 @@
+import logging
+import time
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api import outbox
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deliver realtime notifications written to the outbox (REALTIME_OUTBOX)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--poll-ms", type=int, default=settings.OUTBOX_POLL_MS, help="Sleep when the outbox is empty.")
+        parser.add_argument("--stats-every", type=float, default=30, help="Seconds between lag/throughput log lines.")
+        parser.add_argument("--once", action="store_true", help="Drain what is pending and exit.")
+
+    def handle(self, *args, **opts):
+        layer = get_channel_layer()
+        if not layer:
+            raise CommandError("no channel layer configured")
+        poll = opts["poll_ms"] / 1000
+        sent_total = 0
+        next_stats = time.monotonic() + opts["stats_every"]
+        while True:
+            try:
+                sent = outbox.relay_batch(layer, opts["batch_size"])
+            except Exception:
+                # Rows stay in the outbox and are retried on the next pass.
+                log.exception("outbox relay batch failed")
+                sent = 0
+                time.sleep(poll)
+            sent_total += sent
+
+            if time.monotonic() >= next_stats:
+                log.info("outbox relay sent=%s lag_s=%.3f", sent_total, outbox.lag_seconds())
+                next_stats = time.monotonic() + opts["stats_every"]
+            if not sent:
+                if opts["once"]:
+                    break
+                close_old_connections()
+                time.sleep(poll)
+        self.stdout.write(f"sent={sent_total} lag_s={outbox.lag_seconds():.3f}")
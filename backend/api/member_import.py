@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from . import authcache
+from .models import Membership, User
+from .utils import broadcast_availability_change, broadcast_group_event, bump_availability_version
+
+log = logging.getLogger(__name__)
+
+# Bulk "add members by email". Each chunk costs four queries (users, existing
+# memberships, one bulk insert, re-reading which rows it inserted) whatever its
+# size. Requests above MEMBER_IMPORT_ASYNC_THRESHOLD emails run as a background
+# job instead: the view answers 202 with a job id, progress goes to the group's
+# WebSocket room as members_import_progress / members_import_done events, and
+# the job state is kept in the cache for clients that poll instead. Jobs run
+# on threads of the process that accepted them, so a restart loses them; a
+# queued or running job whose state has not been saved for
+# MEMBER_IMPORT_STALE_SECONDS is reported as failed.
+
+CHUNK_SIZE = 500
+JOB_TTL = 3600
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def normalize(emails):
+    return [User.objects.normalize_email(e).lower() for e in emails]
+
+
+def add_chunk(group, emails):
+    """Add the users behind emails to group; returns (created memberships, skipped)."""
+    user_by_email = {u.email.lower(): u for u in User.objects.filter(email__in=set(emails))}
+    member_ids = set(
+        Membership.objects.filter(group=group, user_id__in=[u.id for u in user_by_email.values()])
+        .values_list('user_id', flat=True)
+    )
+    new, skipped = [], []
+    for email in emails:
+        u = user_by_email.get(email)
+        if not u:
+            skipped.append({'email': email, 'reason': 'not_found'})
+        elif u.id in member_ids:
+            skipped.append({'email': email, 'reason': 'already_member'})
+        else:
+            member_ids.add(u.id)
+            new.append(Membership(user=u, group=group))
+    if not new:
+        return new, skipped
+    # ignore_conflicts only matters for a concurrent add of the same user; the
+    # losing rows keep their client-side ids, so re-select to see which landed.
+    Membership.objects.bulk_create(new, ignore_conflicts=True)
+    inserted = set(Membership.objects.filter(id__in=[m.id for m in new]).values_list('id', flat=True))
+    for m in new:
+        if m.id not in inserted:
+            skipped.append({'email': m.user.email.lower(), 'reason': 'already_member'})
+    new = [m for m in new if m.id in inserted]
+    # bulk_create sends no post_save, so clear cached WebSocket denials here.
+    user_ids = [m.user_id for m in new]
+    transaction.on_commit(lambda: authcache.forget_group_members(group.id, user_ids))
+    return new, skipped
+
+
+@transaction.atomic
+def add_members(group, emails):
+    created, skipped = [], []
+    for i in range(0, len(emails), CHUNK_SIZE):
+        new, skip = add_chunk(group, emails[i:i + CHUNK_SIZE])
+        created += new
+        skipped += skip
+    if created:
+        broadcast_availability_change(group.id)
+    return created, skipped
+
+
+def _job_key(job_id):
+    return f"member-import:{job_id}"
+
+
+def get_job(job_id):
+    job = cache.get(_job_key(job_id))
+    if job and job['status'] in ('queued', 'running') and time.time() - job['updatedAt'] > settings.MEMBER_IMPORT_STALE_SECONDS:
+        job = {**job, 'status': 'failed', 'error': 'interrupted'}
+    return job
+
+
+def _save(job):
+    job['updatedAt'] = time.time()
+    cache.set(_job_key(job['id']), job, timeout=JOB_TTL)
+
+
+def start(group, emails):
+    """Queue a background import of emails into group; returns the job state."""
+    global _executor
+    job = {
+        'id': str(uuid.uuid4()), 'groupId': str(group.id), 'status': 'queued',
+        'total': len(emails), 'processed': 0, 'created': 0, 'skipped': [],
+    }
+    _save(job)
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.MEMBER_IMPORT_WORKERS, thread_name_prefix="member-import")
+    _executor.submit(_run, dict(job), group, emails)
+    return job
+
+
+def _progress(job, event_type):
+    event = {'type': event_type, 'groupId': job['groupId'], 'jobId': job['id'], 'status': job['status'],
+             'total': job['total'], 'processed': job['processed'], 'created': job['created']}
+    if event_type == 'members_import_done':
+        event['skipped'] = job['skipped']
+    broadcast_group_event(job['groupId'], event)
+
+
+def _run(job, group, emails):
+    close_old_connections()
+    job['status'] = 'running'
+    try:
+        # One transaction per chunk so progress is real and a failure keeps
+        # what was already added; members become visible chunk by chunk.
+        for i in range(0, len(emails), CHUNK_SIZE):
+            chunk = emails[i:i + CHUNK_SIZE]
+            with transaction.atomic():
+                new, skipped = add_chunk(group, chunk)
+                if new:
+                    bump_availability_version(group_id=group.id)
+            job['processed'] += len(chunk)
+            job['created'] += len(new)
+            job['skipped'] += skipped
+            _save(job)
+            _progress(job, 'members_import_progress')
+        job['status'] = 'done'
+    except Exception:
+        log.exception("member import failed job=%s group=%s", job['id'], job['groupId'])
+        job['status'] = 'failed'
+    finally:
+        _save(job)
+        if job['created']:
+            broadcast_availability_change(group.id)
+        _progress(job, 'members_import_done')
+        close_old_connections()
@@ -0,0 +1,294 @@
+import bisect
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+log = logging.getLogger(__name__)
+
+# In-process metrics in the Prometheus text format, served at /metrics when
+# METRICS_ENABLED is on. Each process keeps its own registry, so scrape every
+# daphne/worker process. Counters and histograms are updated on the hot
+# paths; the stats() of the caches, the broadcaster and the outbox are read
+# at scrape time by collectors.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def collector(self, fn):
+        """Register fn() -> iterable of (name, kind, help, [(labels, value)]), called on every scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        families = [(m.name, m.kind, m.help, m.samples()) for m in self._metrics]
+        for fn in self._collectors:
+            try:
+                families.extend(fn())
+            except Exception:
+                log.exception("metrics collector %s failed", fn.__name__)
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in _expand(name, samples):
+                lines.append(f"{sample_name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _expand(name, samples):
+    for sample in samples:
+        if len(sample) == 3:
+            yield sample
+        else:
+            yield (name, *sample)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _label_dict(self, key):
+        return dict(zip(self.labels, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self._label_dict(k), v) for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        out = []
+        for key, counts, total in values:
+            labels = self._label_dict(key)
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                out.append((f"{self.name}_bucket", {**labels, "le": _number(bound)}, cumulative))
+            out.append((f"{self.name}_sum", labels, total))
+            out.append((f"{self.name}_count", labels, cumulative))
+        return out
+
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by URL name.", ("view", "method", "status"),
+)
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries per request by URL name.", ("view",), buckets=QUERY_BUCKETS,
+)
+AVAILABILITY_PHASE = Histogram(
+    "availability_phase_seconds", "Availability time spent loading busy data (query) and building the grid (compute).",
+    ("phase", "engine"),
+)
+AVAILABILITY_SLOTS = Histogram("availability_slots", "Slots per computed availability grid.", buckets=SIZE_BUCKETS)
+AVAILABILITY_MEMBERS = Histogram("availability_members", "Members per computed availability grid.", buckets=SIZE_BUCKETS)
+AVAILABILITY_EVENTS = Histogram(
+    "availability_events", "Busy intervals in the window per computed availability grid.", buckets=SIZE_BUCKETS,
+)
+GROUP_SEND_LATENCY = Histogram("channel_group_send_seconds", "Channel layer group_send latency.", ("source",))
+GROUP_SEND_FAILURES = Counter("channel_group_send_failures_total", "Channel layer group_send errors.", ("source",))
+WS_OPEN = Gauge("websocket_connections", "Open WebSocket connections by namespace.", ("namespace",))
+WS_REJECTED = Counter("websocket_rejections_total", "WebSocket connects closed before accept, by close code.", ("namespace", "code"))
+WS_AUTH = Counter("websocket_auth_total", "WebSocket token checks by result.", ("result",))
+WS_AUTH_CACHE = Counter("websocket_auth_cache_total", "WebSocket auth cache lookups.", ("kind", "result"))
+DB_CONNECTIONS = Counter(
+    "db_connections_total", "Database connections set up (new, or checked out of the pool).", ("alias",),
+)
+
+
+def observe_availability(engine, query_seconds, compute_seconds, slots, members, events=None):
+    AVAILABILITY_PHASE.observe(query_seconds, phase="query", engine=engine)
+    AVAILABILITY_PHASE.observe(compute_seconds, phase="compute", engine=engine)
+    AVAILABILITY_SLOTS.observe(slots)
+    AVAILABILITY_MEMBERS.observe(members)
+    if events is not None:
+        AVAILABILITY_EVENTS.observe(events)
+
+
+async def group_send(layer, group, message, source):
+    """layer.group_send with its latency and failures recorded under source."""
+    t0 = time.perf_counter()
+    try:
+        await layer.group_send(group, message)
+    except Exception:
+        GROUP_SEND_FAILURES.inc(source=source)
+        raise
+    finally:
+        GROUP_SEND_LATENCY.observe(time.perf_counter() - t0, source=source)
+
+
+def _stats_family(name, help, stats):
+    return (name, "gauge", help, [({"stat": k}, v) for k, v in stats.items()])
+
+
+@REGISTRY.collector
+def _cache_stats():
+    from . import availability_cache, busy_cache
+
+    yield _stats_family("busy_cache", "Busy-interval cache counters (api/busy_cache.py).", busy_cache.stats())
+    yield _stats_family(
+        "availability_result_cache", "Availability result cache counters (api/availability_cache.py).",
+        availability_cache.stats(),
+    )
+
+
+@REGISTRY.collector
+def _broadcaster_stats():
+    from . import broadcaster
+
+    if broadcaster._broadcaster is not None:
+        yield _stats_family("broadcast_coalescer", "Coalescing broadcaster counters.", broadcaster._broadcaster.stats())
+
+
+@REGISTRY.collector
+def _outbox_lag():
+    from . import outbox
+
+    if settings.REALTIME_OUTBOX:
+        yield ("outbox_lag_seconds", "gauge", "Age of the oldest undelivered outbox message.", [({}, outbox.lag_seconds())])
+
+
+@REGISTRY.collector
+def _db_pools():
+    samples = []
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            samples += [({"alias": alias, "stat": k}, v) for k, v in pool.get_stats().items()]
+    if samples:
+        yield ("db_pool", "gauge", "psycopg connection pool stats (DB_POOL).", samples)
+
+
+@receiver(connection_created)
+def _connection_created(sender, connection, **kwargs):
+    DB_CONNECTIONS.inc(alias=connection.alias)
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.url_name or match.view_name if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Records request latency per URL name (not per path, to bound label cardinality)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        t0 = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, t0)
+        return response
+
+    async def _acall(self, request):
+        t0 = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, t0)
+        return response
+
+    def _observe(self, request, response, t0):
+        HTTP_LATENCY.observe(
+            time.perf_counter() - t0,
+            view=view_name(request), method=request.method, status=f"{response.status_code // 100}xx",
+        )
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404()
+    if settings.METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,15 +1,18 @@
+import logging
+import time
 from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 from django.contrib.auth.models import AnonymousUser
-from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from . import authcache, metrics
 
-User = get_user_model()
+log = logging.getLogger(__name__)
 
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
+        scope["connect_started"] = time.perf_counter()
         query_string = scope.get("query_string", b"").decode()
         token = parse_qs(query_string).get("token", [None])[0]
         user = await self.get_user(token)
@@ -19,15 +22,17 @@ class JWTAuthMiddleware(BaseMiddleware):
     @database_sync_to_async
     def get_user(self, token):
         if not token:
-            print("❌ No token found in query string.")
+            metrics.WS_AUTH.inc(result="no_token")
             return None
         try:
             validated = UntypedToken(token)
             user_id = validated.get("user_id")
-            print(f"✅ Valid token for user_id: {user_id}")
-            return User.objects.get(id=user_id)
+            user = authcache.get_user(user_id)
+            if user is None:
+                log.info("ws token for unknown user_id=%s", user_id)
+            metrics.WS_AUTH.inc(result="valid" if user else "unknown_user")
+            return user
         except (TokenError, InvalidToken) as e:
-            print(f"❌ Invalid token: {e}")
-        except User.DoesNotExist:
-            print(f"❌ User does not exist for token.")
+            log.info("ws invalid token: %s", e)
+            metrics.WS_AUTH.inc(result="invalid")
         return None
\ No newline at end of file
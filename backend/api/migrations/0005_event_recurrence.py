@@ -0,0 +1,38 @@
+# Generated by Django 5.1.11 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+def fill_series_end(apps, schema_editor):
+    Event = apps.get_model('api', 'Event')
+    Event.objects.update(series_end=models.F('end'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_groupevent_groupeventattendee'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='exdates',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rrule',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['schedule', 'series_end'], name='api_event_sched_series_idx'),
+        ),
+        migrations.RunPython(fill_series_end, migrations.RunPython.noop),
+    ]
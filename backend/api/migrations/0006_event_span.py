@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# PostgreSQL only: a generated tstzrange over [start, end) with a GiST index,
+# used by api/availability_sql.py. Not declared on the model, so the ORM and
+# other backends are unaffected.
+
+ADD_SPAN = """
+ALTER TABLE api_event ADD COLUMN span tstzrange
+    GENERATED ALWAYS AS (tstzrange(LEAST(start, "end"), GREATEST(start, "end"), '[)')) STORED;
+CREATE INDEX api_event_span_gist ON api_event USING gist (span);
+"""
+
+DROP_SPAN = """
+DROP INDEX IF EXISTS api_event_span_gist;
+ALTER TABLE api_event DROP COLUMN IF EXISTS span;
+"""
+
+
+def add_span(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(ADD_SPAN)
+
+
+def drop_span(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SPAN)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_span, drop_span),
+    ]
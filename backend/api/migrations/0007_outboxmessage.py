@@ -0,0 +1,23 @@
+# Generated by Django 5.1.11 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_event_span'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('schedule_changed', 'schedule_changed'), ('group_changed', 'group_changed'), ('room_event', 'room_event')], max_length=32)),
+                ('target', models.CharField(max_length=100)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.11 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='availability_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
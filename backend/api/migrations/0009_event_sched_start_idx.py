@@ -0,0 +1,17 @@
+# Generated by Django 5.1.11 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_group_availability_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['schedule', 'start'], name='api_event_sched_start_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from api import recurrence
+
+
+def recompute_series_end(apps, schema_editor):
+    # Weekly BYDAY rules used to repeat DTSTART's weekday every week, which
+    # moved the last occurrence of COUNT rules.
+    Event = apps.get_model('api', 'Event')
+    changed = []
+    for event in Event.objects.filter(rrule__contains='BYDAY').only('id', 'start', 'end', 'rrule', 'series_end').iterator():
+        try:
+            series_end = recurrence.series_end(event.start, event.end, event.rrule)
+        except recurrence.RecurrenceError:
+            continue
+        if series_end != event.series_end:
+            event.series_end = series_end
+            changed.append(event)
+    Event.objects.bulk_update(changed, ['series_end'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_event_sched_start_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_series_end, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 import uuid
+from . import recurrence
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -36,6 +37,8 @@ class Group(models.Model):
     name = models.CharField(max_length=100)
     admin = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='admin_groups')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped with F() whenever the group's availability can change; see utils.bump_availability_version.
+    availability_version = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -57,6 +60,26 @@ class Event(models.Model):
     start = models.DateTimeField()
     end = models.DateTimeField()
     description = models.TextField(blank=True)
+    rrule = models.CharField(max_length=255, blank=True)
+    exdates = models.JSONField(default=list, blank=True)
+    # End of the last occurrence (== end for single events, NULL for unbounded
+    # series). Lets window queries find series without expanding them.
+    series_end = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['schedule', 'series_end'], name='api_event_sched_series_idx'),
+            models.Index(fields=['schedule', 'start'], name='api_event_sched_start_idx'),
+        ]
+
+    def refresh_series_end(self):
+        self.series_end = recurrence.series_end(self.start, self.end, self.rrule)
+
+    def save(self, *args, **kwargs):
+        self.refresh_series_end()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'series_end'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         owner = getattr(self.schedule.user, "display_name", None) or self.schedule.user.email
@@ -77,3 +100,91 @@ class Membership(models.Model):
     def __str__(self):
         owner = getattr(self.user, "display_name", None) or self.user.email
         return f"{owner} in {self.group.name} (using {self.active_schedule})"
+
+class GroupEvent(models.Model):
+    """An event proposed to the whole group.
+
+    Every member gets a GroupEventAttendee row and, when they have an active
+    schedule and have not declined, a linked personal Event in that schedule.
+    `version` goes up whenever the time or details change (see api/group_events.py).
+    """
+    SCHEDULED = 'scheduled'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [(SCHEDULED, SCHEDULED), (CANCELLED, CANCELLED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='events')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='group_events_created')
+    title = models.CharField(max_length=100)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=SCHEDULED)
+    version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.group.name})"
+
+class GroupEventAttendee(models.Model):
+    """A member's RSVP to a GroupEvent.
+
+    An acceptance records the event version it was given for, so an accepted
+    RSVP needs a new response once the event's version moves past
+    accepted_version; nothing is rewritten per attendee when the event
+    changes. The stored needs_response column is not maintained: use
+    needs_response_for() (the "changed" rsvp state is likewise derived).
+    """
+    PENDING = 'pending'
+    ACCEPTED = 'accepted'
+    DECLINED = 'declined'
+    CHANGED = 'changed'
+    RSVP_CHOICES = [(PENDING, PENDING), (ACCEPTED, ACCEPTED), (DECLINED, DECLINED), (CHANGED, CHANGED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group_event = models.ForeignKey(GroupEvent, on_delete=models.CASCADE, related_name='attendees')
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, related_name='group_event_attendance')
+    personal_event = models.ForeignKey(
+        Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='from_group_attendance'
+    )
+    rsvp = models.CharField(max_length=16, choices=RSVP_CHOICES, default=PENDING)
+    invited_at = models.DateTimeField(auto_now_add=True)
+    responded_at = models.DateTimeField(null=True, blank=True)
+    accepted_version = models.PositiveIntegerField(null=True, blank=True)
+    needs_response = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('group_event', 'membership')
+
+    @classmethod
+    def effective_rsvp(cls, rsvp, accepted_version, event_version):
+        if rsvp == cls.ACCEPTED and accepted_version != event_version:
+            return cls.CHANGED
+        return rsvp
+
+    @classmethod
+    def needs_response_for(cls, rsvp, accepted_version, event_version):
+        return cls.effective_rsvp(rsvp, accepted_version, event_version) in (cls.PENDING, cls.CHANGED)
+
+    def __str__(self):
+        return f"{self.membership_id} -> {self.group_event_id}: {self.rsvp}"
+
+class OutboxMessage(models.Model):
+    """A realtime notification written in the same transaction as the change it announces.
+
+    Drained and deleted by `manage.py relay_outbox` once sent (at least once).
+    """
+    SCHEDULE_CHANGED = 'schedule_changed'
+    GROUP_CHANGED = 'group_changed'
+    ROOM_EVENT = 'room_event'
+    KIND_CHOICES = [(SCHEDULE_CHANGED, SCHEDULE_CHANGED), (GROUP_CHANGED, GROUP_CHANGED), (ROOM_EVENT, ROOM_EVENT)]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    target = models.CharField(max_length=100)
+    payload = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.target}"
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+
+from . import metrics
+from .broadcaster import send_changes
+from .models import OutboxMessage
+
+log = logging.getLogger(__name__)
+
+# Transactional outbox for realtime notifications (REALTIME_OUTBOX). Writers
+# add rows inside the transaction that makes the change, so nothing is sent
+# for a rollback; `manage.py relay_outbox` sends pending rows in id order and
+# deletes them only after the channel layer accepted the batch. A crash in
+# between resends the batch, so delivery is at least once. Run one relay.
+
+
+def enqueue(kind, target, payload=None):
+    OutboxMessage.objects.create(kind=kind, target=str(target), payload=payload)
+
+
+def enqueue_many(kind, targets, payload=None):
+    """enqueue() for each target in one insert."""
+    OutboxMessage.objects.bulk_create([OutboxMessage(kind=kind, target=str(t), payload=payload) for t in targets])
+
+
+def lag_seconds():
+    """Age of the oldest undelivered message; 0 when the outbox is empty."""
+    oldest = OutboxMessage.objects.order_by("id").values_list("created_at", flat=True).first()
+    return 0.0 if oldest is None else max(0.0, (timezone.now() - oldest).total_seconds())
+
+
+async def _send_room(layer, room, events):
+    for event in events:
+        await metrics.group_send(layer, room, {"type": "broadcast", "room": room, "event": event}, "room_event")
+
+
+async def _send(layer, messages):
+    schedules, groups = Counter(), Counter()
+    rooms = {}
+    for m in messages:
+        if m.kind == OutboxMessage.SCHEDULE_CHANGED:
+            schedules[m.target] += 1
+        elif m.kind == OutboxMessage.GROUP_CHANGED:
+            groups[m.target] += 1
+        else:
+            rooms.setdefault(m.target, []).append(m.payload)
+    # Events for one room go out one after another in id order, so clients see
+    # them in commit order; different rooms and the collapsed schedule/group
+    # pings go out concurrently.
+    await asyncio.gather(
+        send_changes(layer, schedules, groups),
+        *(_send_room(layer, room, events) for room, events in rooms.items()),
+    )
+
+
+def relay_batch(layer, batch_size):
+    """Send and delete up to batch_size pending messages; returns how many were sent."""
+    messages = list(OutboxMessage.objects.order_by("id")[:batch_size])
+    if not messages:
+        return 0
+    async_to_sync(_send)(layer, messages)
+    OutboxMessage.objects.filter(id__in=[m.id for m in messages]).delete()
+    return len(messages)
@@ -0,0 +1,73 @@
+import base64
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+# Keyset pagination over (start, id) for event listings. Opt-in: list views
+# keep returning a plain array unless ?cursor= or ?limit= is present, and
+# then answer {"results": [...], "next": <url or null>}. The cursor encodes
+# the last (start, id) returned, so pages stay stable under inserts and cost
+# the same however deep they are. Works with DRF requests and, for the async
+# views, plain Django ones.
+
+
+def _params(request):
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPage:
+    default_limit = 100
+    max_limit = 1000
+
+    def __init__(self, request):
+        self.request = request
+        try:
+            self.limit = int(_params(request).get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError("limit must be an integer")
+        if not 0 < self.limit <= self.max_limit:
+            raise ValidationError(f"limit must be 1..{self.max_limit}")
+        cursor = _params(request).get('cursor')
+        self.after = self.decode(cursor) if cursor else None
+
+    @staticmethod
+    def requested(request):
+        return 'cursor' in _params(request) or 'limit' in _params(request)
+
+    @staticmethod
+    def encode(start, pk):
+        return base64.urlsafe_b64encode(f"{start.isoformat()}|{pk}".encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            start, pk = raw.split('|')
+            start = parse_datetime(start)
+            if start is None:
+                raise ValueError
+            return start, uuid.UUID(pk)
+        except ValueError:
+            raise ValidationError("Invalid cursor")
+
+    def filter(self, queryset):
+        """queryset ordered by (start, id), after the cursor, with one extra row to detect a next page."""
+        if self.after:
+            start, pk = self.after
+            queryset = queryset.filter(Q(start__gt=start) | Q(start=start, id__gt=pk))
+        return queryset.order_by('start', 'id')[:self.limit + 1]
+
+    def is_after(self, start, pk):
+        return self.after is None or (start, pk) > self.after
+
+    def response_data(self, rows):
+        """rows: (start, id, item) sorted by (start, id), at least the page plus one when more exist."""
+        page = rows[:self.limit]
+        next_url = None
+        if len(rows) > self.limit:
+            start, pk, _ = page[-1]
+            next_url = replace_query_param(self.request.build_absolute_uri(), 'cursor', self.encode(start, pk))
+        return {'results': [item for _, _, item in page], 'next': next_url}
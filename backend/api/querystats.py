@@ -0,0 +1,88 @@
+import contextvars
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+# Per-request query count and database time. Every connection gets an
+# execute wrapper when it is opened; the wrapper adds to the stats of the
+# request in the current context, which sync_to_async carries into worker
+# threads, so async views are counted too.
+
+_current = contextvars.ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+def _record(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - t0
+
+
+@receiver(connection_created)
+def _install(sender, connection, **kwargs):
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+class QueryStatsMiddleware:
+    """Logs query count and DB time per request; adds X-DB-Queries when QUERY_STATS_HEADER is on."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        stats, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    async def _acall(self, request):
+        stats, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    def _start(self):
+        stats = QueryStats()
+        return stats, _current.set(stats)
+
+    def _finish(self, request, response, stats):
+        db_ms = stats.seconds * 1000
+        if settings.QUERY_STATS_HEADER:
+            response["X-DB-Queries"] = f"{stats.queries}; time={db_ms:.1f}ms"
+        metrics.HTTP_DB_QUERIES.observe(stats.queries, view=metrics.view_name(request))
+        level = logging.WARNING if stats.queries > settings.QUERY_COUNT_WARN else logging.DEBUG
+        log.log(level, "query stats %s %s status=%s queries=%s db_ms=%.1f",
+                request.method, request.path, response.status_code, stats.queries, db_ms)
+        return response
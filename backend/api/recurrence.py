@@ -0,0 +1,192 @@
+import calendar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils.dateparse import parse_datetime
+
+# RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY with INTERVAL, COUNT or UNTIL, and
+# BYDAY for weekly rules. Rules are expanded in UTC: occurrences keep DTSTART's
+# UTC time of day and BYDAY names UTC weekdays, so there is no TZID or DST
+# handling (the ICS importer drops rules anchored in other zones). DTSTART is
+# always the first occurrence and counts towards COUNT; monthly rules skip
+# months that lack its day. COUNT is capped at MAX_COUNT and UNTIL at
+# MAX_UNTIL, so working out where a series ends stays cheap and in range.
+
+FREQS = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 5000
+MAX_UNTIL = datetime(2200, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+def parse_rrule(text):
+    parts = {}
+    for item in text.upper().removeprefix("RRULE:").split(";"):
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise RecurrenceError(f"Invalid RRULE part: {item}")
+        parts[key] = value
+
+    rule = {"freq": parts.pop("FREQ", None), "interval": 1, "count": None, "until": None, "byday": None}
+    if rule["freq"] not in FREQS:
+        raise RecurrenceError("FREQ must be one of " + ", ".join(FREQS))
+    try:
+        if "INTERVAL" in parts:
+            rule["interval"] = int(parts.pop("INTERVAL"))
+        if "COUNT" in parts:
+            rule["count"] = int(parts.pop("COUNT"))
+    except ValueError:
+        raise RecurrenceError("INTERVAL and COUNT must be integers")
+    if rule["interval"] < 1 or (rule["count"] is not None and rule["count"] < 1):
+        raise RecurrenceError("INTERVAL and COUNT must be positive")
+    if rule["count"] is not None:
+        rule["count"] = min(rule["count"], MAX_COUNT)
+    if "UNTIL" in parts:
+        rule["until"] = min(_parse_until(parts.pop("UNTIL")), MAX_UNTIL)
+    if rule["count"] is not None and rule["until"] is not None:
+        raise RecurrenceError("COUNT and UNTIL cannot both be set")
+    if "BYDAY" in parts:
+        if rule["freq"] != "WEEKLY":
+            raise RecurrenceError("BYDAY is only supported for WEEKLY rules")
+        days = parts.pop("BYDAY").split(",")
+        if any(d not in WEEKDAYS for d in days):
+            raise RecurrenceError("BYDAY must list MO..SU")
+        rule["byday"] = sorted({WEEKDAYS.index(d) for d in days})
+    if parts:
+        raise RecurrenceError("Unsupported RRULE parts: " + ", ".join(sorted(parts)))
+    return rule
+
+
+def _parse_until(value):
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            continue
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise RecurrenceError(f"Invalid UNTIL: {value}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def _add_months(dt, months):
+    total = dt.month - 1 + months
+    year, month = dt.year + total // 12, total % 12 + 1
+    if dt.day > calendar.monthrange(year, month)[1]:
+        return None
+    return dt.replace(year=year, month=month)
+
+
+def _starts_from(start, rule, at):
+    """Occurrence starts of the series, beginning near `at` without walking from DTSTART."""
+    freq, interval = rule["freq"], rule["interval"]
+    if freq == "DAILY":
+        period = timedelta(days=interval)
+        n = max(0, (at - start) // period)
+        while True:
+            yield start + n * period
+            n += 1
+
+    elif freq == "WEEKLY":
+        days = rule["byday"] or [start.weekday()]
+        week0 = start - timedelta(days=start.weekday())
+        period = timedelta(weeks=interval)
+        block = max(0, (at - week0) // period)
+        if block == 0 and start.weekday() not in days:
+            # DTSTART is an occurrence even when BYDAY does not match it.
+            yield start
+        while True:
+            base = week0 + block * period
+            for d in days:
+                occ = base + timedelta(days=d)
+                if occ >= start:
+                    yield occ
+            block += 1
+
+    else:
+        months = (at.year - start.year) * 12 + at.month - start.month
+        n = max(0, months // interval - 1)
+        while True:
+            occ = _add_months(start, n * interval)
+            if occ is not None:
+                yield occ
+            n += 1
+
+
+def last_start(start, rule):
+    """Start of the final occurrence, or None for an unbounded series."""
+    try:
+        if rule["until"] is not None:
+            last = None
+            # Jump next to UNTIL, then step forward; a few candidates at most.
+            probe = rule["until"] - _span(rule)
+            for occ in _starts_from(start, rule, max(start, probe)):
+                if occ > rule["until"]:
+                    break
+                last = occ
+            return last or start
+        if rule["count"] is not None:
+            return _nth_start(start, rule, rule["count"] - 1)
+    except (OverflowError, ValueError):
+        # Stepping past datetime.max (a huge INTERVAL).
+        raise RecurrenceError("The series ends outside the supported date range")
+    return None
+
+
+def _nth_start(start, rule, n):
+    """Start of occurrence n (0-based), by arithmetic where the rule allows it."""
+    freq = rule["freq"]
+    if freq == "DAILY":
+        return start + n * timedelta(days=rule["interval"])
+    if freq == "WEEKLY":
+        days = rule["byday"] or [start.weekday()]
+        week0 = start - timedelta(days=start.weekday())
+        first = [] if start.weekday() in days else [start]
+        first += [week0 + timedelta(days=d) for d in days if week0 + timedelta(days=d) >= start]
+        if n < len(first):
+            return first[n]
+        block, i = divmod(n - len(first), len(days))
+        return week0 + (block + 1) * timedelta(weeks=rule["interval"]) + timedelta(days=days[i])
+    for i, occ in enumerate(_starts_from(start, rule, start)):
+        if i == n:
+            return occ
+
+
+def _span(rule):
+    if rule["freq"] == "DAILY":
+        return timedelta(days=rule["interval"])
+    if rule["freq"] == "WEEKLY":
+        return timedelta(weeks=rule["interval"])
+    return timedelta(days=31 * rule["interval"] + 1)
+
+
+def series_end(start, end, rrule):
+    """End of the last occurrence (None if unbounded); the indexed bound used to find series."""
+    if not rrule:
+        return end
+    last = last_start(start, parse_rrule(rrule))
+    return None if last is None else last + (end - start)
+
+
+def occurrences(start, end, rrule, exdates, end_of_series, window_start, window_end):
+    """(start, end) of each occurrence overlapping [window_start, window_end).
+
+    end_of_series is the stored series_end, so reads never re-walk COUNT rules.
+    """
+    if not rrule:
+        if end > window_start and start < window_end:
+            yield start, end
+        return
+    duration = end - start
+    rule = parse_rrule(rrule)
+    skip = {parse_datetime(d) for d in exdates or ()}
+    last = None if end_of_series is None else end_of_series - duration
+    for occ in _starts_from(start, rule, window_start - duration):
+        if occ >= window_end or (last is not None and occ > last):
+            return
+        if occ + duration > window_start and occ not in skip:
+            yield occ, occ + duration
@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import Consumer
+from .consumers import Consumer, StreamConsumer
 
 websocket_urlpatterns = [
     re_path(r"^ws/(?P<namespace>groups|schedules)/(?P<obj_id>[\w-]+)/$", Consumer.as_asgi()),
+    re_path(r"^ws/stream/$", StreamConsumer.as_asgi()),
 ]
\ No newline at end of file
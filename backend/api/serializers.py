@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError as DjangoValidationError
-from .models import User, Group, Membership, Schedule, Event
+from .models import User, Group, Membership, Schedule, Event, GroupEvent, GroupEventAttendee
+from . import recurrence
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -66,7 +67,81 @@ class ScheduleSerializer(serializers.ModelSerializer):
         extra_kwargs = {'user': {'read_only': True}, 'created_at': {'read_only': True}}
 
 class EventSerializer(serializers.ModelSerializer):
+    exdates = serializers.ListField(child=serializers.DateTimeField(), required=False)
+
     class Meta:
         model = Event
-        fields = ['id', 'schedule', 'title', 'start', 'end', 'description']
+        fields = ['id', 'schedule', 'title', 'start', 'end', 'description', 'rrule', 'exdates']
         extra_kwargs = {'schedule': {'read_only': True}}
+
+    def validate_rrule(self, value):
+        if value:
+            try:
+                recurrence.parse_rrule(value)
+            except recurrence.RecurrenceError as e:
+                raise serializers.ValidationError(str(e))
+        return value.upper().removeprefix('RRULE:')
+
+    def validate_exdates(self, value):
+        return [serializers.DateTimeField().to_representation(d) for d in value]
+
+    def validate(self, attrs):
+        rrule = attrs.get('rrule', getattr(self.instance, 'rrule', ''))
+        start = attrs.get('start', getattr(self.instance, 'start', None))
+        end = attrs.get('end', getattr(self.instance, 'end', None))
+        if rrule and start and end and end <= start:
+            raise serializers.ValidationError("Recurring events must end after they start.")
+        if rrule and start and end:
+            try:
+                recurrence.series_end(start, end, rrule)
+            except recurrence.RecurrenceError as e:
+                raise serializers.ValidationError({'rrule': str(e)})
+        return attrs
+
+class GroupEventSerializer(serializers.ModelSerializer):
+    # my_rsvp/needs_response describe the requesting user's attendance and
+    # come from the my_rsvp/my_accepted_version annotations on the queryset.
+    my_rsvp = serializers.SerializerMethodField()
+    needs_response = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GroupEvent
+        fields = [
+            'id', 'group', 'created_by', 'title', 'start', 'end', 'description', 'status', 'version',
+            'created_at', 'updated_at', 'my_rsvp', 'needs_response',
+        ]
+        read_only_fields = ['group', 'created_by', 'version', 'created_at', 'updated_at']
+
+    def get_my_rsvp(self, obj):
+        rsvp = getattr(obj, 'my_rsvp', None)
+        return rsvp and GroupEventAttendee.effective_rsvp(rsvp, obj.my_accepted_version, obj.version)
+
+    def get_needs_response(self, obj):
+        rsvp = getattr(obj, 'my_rsvp', None)
+        return bool(rsvp) and GroupEventAttendee.needs_response_for(rsvp, obj.my_accepted_version, obj.version)
+
+    def validate(self, attrs):
+        start = attrs.get('start', getattr(self.instance, 'start', None))
+        end = attrs.get('end', getattr(self.instance, 'end', None))
+        if start and end and end <= start:
+            raise serializers.ValidationError("Group events must end after they start.")
+        return attrs
+
+class GroupEventAttendeeSerializer(serializers.ModelSerializer):
+    user = UserSerializer(source='membership.user', read_only=True)
+    rsvp = serializers.SerializerMethodField()
+    needs_response = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GroupEventAttendee
+        fields = ['id', 'membership', 'user', 'rsvp', 'needs_response', 'accepted_version', 'invited_at', 'responded_at', 'personal_event']
+        read_only_fields = fields
+
+    def get_rsvp(self, obj):
+        return GroupEventAttendee.effective_rsvp(obj.rsvp, obj.accepted_version, obj.group_event.version)
+
+    def get_needs_response(self, obj):
+        return GroupEventAttendee.needs_response_for(obj.rsvp, obj.accepted_version, obj.group_event.version)
+
+class GroupEventRSVPSerializer(serializers.Serializer):
+    rsvp = serializers.ChoiceField(choices=[GroupEventAttendee.ACCEPTED, GroupEventAttendee.DECLINED])
@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from .availability import iso
+
+# Meeting-time search. Candidate starts lie on a grid every `step` minutes
+# from the window start. Each member's busy intervals become merged ranges of
+# grid indices whose window would overlap them; a sweep over the range
+# endpoints yields runs of starts with the same number of free members. Work
+# grows with the number of busy intervals, not with the length of the window.
+# Zero-length and inverted events never block a start.
+
+
+def forbidden_ranges(intervals, start, step, duration):
+    """Merged [lo, hi) grid indices of starts whose window overlaps a busy interval."""
+    step_delta = timedelta(minutes=step)
+    ranges = []
+    for s, e in sorted(intervals):
+        if e <= s:
+            continue
+        # start + k*step clashes when s - duration < start + k*step < e.
+        lo = (s - duration - start) // step_delta + 1
+        hi = -((start - e) // step_delta)
+        if hi <= lo:
+            continue
+        if ranges and lo <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], hi)
+        else:
+            ranges.append([lo, hi])
+    return ranges
+
+
+def _covered(ranges, los, k):
+    i = bisect_right(los, k) - 1
+    return i >= 0 and k < ranges[i][1]
+
+
+def find_meeting_times(start, end, duration, step, busy, always_free=(), required=(), min_people=1, limit=5):
+    """Up to `limit` windows of `duration` within [start, end), best attendance first, then earliest.
+
+    busy maps member id -> busy intervals; always_free members (no calendar)
+    attend every window; every member in `required` must be free.
+    """
+    step_delta = timedelta(minutes=step)
+    last = (end - duration - start) // step_delta
+    if last < 0:
+        return []
+
+    ranges = {m: forbidden_ranges(intervals, start, step, duration) for m, intervals in busy.items()}
+    deltas = defaultdict(lambda: [0, 0])
+    for member, member_ranges in ranges.items():
+        is_required = member in required
+        for lo, hi in member_ranges:
+            lo, hi = max(lo, 0), min(hi, last + 1)
+            if lo >= hi:
+                continue
+            deltas[lo][0] += 1
+            deltas[hi][0] -= 1
+            if is_required:
+                deltas[lo][1] += 1
+                deltas[hi][1] -= 1
+
+    changes = []
+    busy_count = blocked = 0
+    previous = None
+    for k in sorted(deltas.keys() | {0}):
+        if k > last:
+            break
+        busy_count += deltas[k][0]
+        blocked += deltas[k][1]
+        state = (busy_count, blocked)
+        if state == previous:
+            continue
+        previous = state
+        attending = len(busy) - busy_count + len(always_free)
+        changes.append((k, attending, not blocked and attending >= min_people))
+    # Runs [lo, hi) of starts with the same attendance.
+    ends = [k for k, _, _ in changes[1:]] + [last + 1]
+    runs = [(attending, lo, hi) for (lo, attending, eligible), hi in zip(changes, ends) if eligible]
+
+    # Best attendance first, then earliest: whole runs in that order, each
+    # contributing its starts from the earliest on, until `limit` are taken.
+    results = []
+    los = {m: [lo for lo, _ in member_ranges] for m, member_ranges in ranges.items()}
+    for attending, lo, hi in sorted(runs, key=lambda run: (-run[0], run[1])):
+        for k in range(lo, min(hi, lo + limit - len(results))):
+            # Members can swap inside a run (one frees up as another gets busy).
+            members = [m for m in busy if not _covered(ranges[m], los[m], k)] + list(always_free)
+            slot_start = start + k * step_delta
+            results.append({
+                "start": iso(slot_start),
+                "end": iso(slot_start + duration),
+                "available": attending,
+                "memberIds": members,
+            })
+        if len(results) >= limit:
+            break
+    return results
@@ -0,0 +1,90 @@
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import Event, Group, Membership, Schedule, User
+
+# Reproducible synthetic data for benchmarks. A tenant is an isolated set of
+# users sharing groups; every generated email starts with the prefix, so a run
+# can be removed with delete_tenants(prefix). The same seed and parameters
+# always produce the same rows (apart from UUIDs).
+
+DENSITIES = ("uniform", "workweek", "clustered")
+DURATIONS = (15, 30, 45, 60, 90, 120)
+ORIGIN = datetime(2025, 1, 6, tzinfo=dt_timezone.utc)  # a Monday
+
+
+@dataclass
+class Tenant:
+    users: list = field(default_factory=list)
+    groups: list = field(default_factory=list)
+    schedules: list = field(default_factory=list)
+
+
+def _event_start(rng, density, days, centers):
+    if density == "workweek":
+        while True:
+            day = rng.randrange(days)
+            if (ORIGIN + timedelta(days=day)).weekday() < 5:
+                break
+        return ORIGIN + timedelta(days=day, hours=9, minutes=15 * rng.randrange(32))
+    if density == "clustered":
+        center = rng.choice(centers)
+        minutes = int(rng.gauss(center, 180))
+        return ORIGIN + timedelta(minutes=min(max(minutes, 0), days * 1440 - 1))
+    return ORIGIN + timedelta(minutes=rng.randrange(days * 1440))
+
+
+def generate(prefix, tenants=1, groups_per_tenant=2, members_per_group=10, schedules_per_user=1,
+             events_per_schedule=50, days=28, density="uniform", recurring_ratio=0.0, seed=0):
+    """Create tenants and return a list of Tenant with the created rows."""
+    if density not in DENSITIES:
+        raise ValueError("density must be one of " + ", ".join(DENSITIES))
+    rng = random.Random(seed)
+    password = make_password("bench")
+    result = []
+    with transaction.atomic():
+        for t in range(tenants):
+            tenant = Tenant()
+            tenant.users = User.objects.bulk_create([
+                User(email=f"{prefix}-t{t}-u{i}@example.com", display_name=f"{prefix} t{t} u{i}", password=password)
+                for i in range(members_per_group)
+            ])
+            tenant.groups = Group.objects.bulk_create([
+                Group(name=f"{prefix} t{t} g{g}", admin=tenant.users[0]) for g in range(groups_per_tenant)
+            ])
+            tenant.schedules = Schedule.objects.bulk_create([
+                Schedule(user=u, name=f"schedule {s}") for u in tenant.users for s in range(schedules_per_user)
+            ])
+            active = tenant.schedules[::schedules_per_user]
+            Membership.objects.bulk_create([
+                Membership(user=u, group=g, active_schedule=active[i])
+                for g in tenant.groups for i, u in enumerate(tenant.users)
+            ])
+
+            centers = [rng.randrange(days * 1440) for _ in range(max(1, days // 7))]
+            events = []
+            for schedule in tenant.schedules:
+                for _ in range(events_per_schedule):
+                    start = _event_start(rng, density, days, centers)
+                    event = Event(schedule=schedule, title="busy", start=start,
+                                  end=start + timedelta(minutes=rng.choice(DURATIONS)))
+                    if rng.random() < recurring_ratio:
+                        event.rrule = rng.choice(("FREQ=WEEKLY", "FREQ=DAILY;COUNT=10", "FREQ=WEEKLY;BYDAY=MO,WE,FR"))
+                    event.refresh_series_end()
+                    events.append(event)
+            Event.objects.bulk_create(events, batch_size=5000)
+            result.append(tenant)
+    return result
+
+
+def delete_tenants(prefix):
+    """Delete everything generate() created under prefix; returns the number of users removed."""
+    users = User.objects.filter(email__startswith=f"{prefix}-t")
+    count = users.count()
+    Group.objects.filter(admin__in=users).delete()
+    users.delete()
+    return count
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+# Query budgets for tests: wrap a request in query_budget(n), or use
+# request_within_budget() to apply the budget registered for the endpoint's
+# URL name, so an N+1 regression fails the test with the offending SQL.
+# Budgets are for GETs with force_authenticate and a cold busy cache; JWT
+# authentication adds one query for the user.
+
+ENDPOINT_QUERY_BUDGETS = {
+    "group-list-create": 2,
+    "group-availability": 3,
+    "group-availability-batch": 3,
+    "group-suggestions": 3,
+    "member-list-create": 3,
+    "event-list-create": 3,
+    "group-event-list-create": 2,
+    "group-event-detail": 2,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries, using="default"):
+    with CaptureQueriesContext(connections[using]) as ctx:
+        yield ctx
+    if len(ctx) > max_queries:
+        sql = "\n".join(f"  {i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1))
+        raise QueryBudgetExceeded(f"{len(ctx)} queries, budget {max_queries}:\n{sql}")
+
+
+def request_within_budget(client, method, path, budget=None, **kwargs):
+    """Issue client.<method>(path, **kwargs) under the budget for path's URL name."""
+    if budget is None:
+        budget = ENDPOINT_QUERY_BUDGETS[resolve(path.split("?")[0]).url_name]
+    with query_budget(budget):
+        return getattr(client, method.lower())(path, **kwargs)
@@ -1,3 +1,874 @@
-from django.test import TestCase
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import (
+    authcache, availability, availability_cache, availability_push, broadcaster, busy_cache, db_router, group_events,
+    ics, member_import, outbox, recurrence, suggestions,
+)
+from .async_views import EventListAsyncView
+from .consumers import StreamConsumer
+from .views import ScheduleImportView
+from .models import Event, Group, GroupEvent, Membership, OutboxMessage, Schedule, User
+from .routing import websocket_urlpatterns
+from .serializers import EventSerializer
+from .testing import ENDPOINT_QUERY_BUDGETS, QueryBudgetExceeded, query_budget, request_within_budget
+
+T0 = datetime(2025, 3, 3, tzinfo=dt_timezone.utc)
+
+
+def baseline_counts(start, end, step, schedule_ids, by_sched):
+    # The original per-slot loop from GroupAvailabilityView.
+    counts = []
+    step_delta = timedelta(minutes=step)
+    cursor = start
+    while cursor < end:
+        slot_end = min(cursor + step_delta, end)
+        busy_count = 0
+        for sid in schedule_ids:
+            for s, ev in by_sched.get(sid, []):
+                if not (ev <= cursor or s >= slot_end):
+                    busy_count += 1
+                    break
+        counts.append(busy_count)
+        cursor = slot_end
+    return counts
+
+
+def random_case(rng):
+    step = rng.choice((1, 5, 15, 30, 45, 60, 240))
+    # Often not a whole number of steps, so the last slot is partial.
+    start = T0 + timedelta(minutes=rng.randrange(0, 120))
+    end = start + timedelta(minutes=rng.randrange(1, 600), seconds=rng.choice((0, 0, 30)))
+    span = int((end - start).total_seconds() // 60)
+    schedule_ids = [f"s{i}" for i in range(rng.randrange(1, 6))]
+    if rng.random() < 0.3:
+        schedule_ids.append(schedule_ids[0])  # duplicate active schedules count twice
+    by_sched = {}
+    for sid in set(schedule_ids):
+        events = by_sched.setdefault(sid, [])
+        for _ in range(rng.randrange(0, 8)):
+            kind = rng.random()
+            if kind < 0.3:
+                # Starts or ends exactly on a slot boundary, or on the window edges.
+                at = start + timedelta(minutes=step * rng.randrange(0, span // step + 2))
+                length = timedelta(minutes=rng.choice((0, step, 2 * step, rng.randrange(1, 90))))
+                s, e = (at, at + length) if rng.random() < 0.5 else (at - length, at)
+            else:
+                s = start + timedelta(minutes=rng.randrange(-60, span + 60), seconds=rng.choice((0, 0, 0, 15)))
+                e = s + timedelta(minutes=rng.choice((0, 0, 1, rng.randrange(1, 180))))
+            # The views only load events overlapping the window (end > start, start < end).
+            if e > start and s < end:
+                events.append((s, e))
+    return start, end, step, schedule_ids, by_sched
+
+
+class BusyCountsEquivalenceTests(SimpleTestCase):
+    def test_sweep_matches_baseline(self):
+        rng = random.Random(1)
+        for _ in range(3000):
+            case = random_case(rng)
+            with self.subTest(case=case):
+                self.assertEqual(availability.busy_counts(*case), baseline_counts(*case))
+
+    def test_bitmap_matches_baseline(self):
+        if availability.np is None:
+            self.skipTest("numpy is not installed")
+        rng = random.Random(2)
+        for _ in range(1000):
+            case = random_case(rng)
+            with self.subTest(case=case):
+                self.assertEqual(availability.busy_counts_bitmap(*case), baseline_counts(*case))
+
+    def test_compute_availability_matches_baseline(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            start, end, step, schedule_ids, by_sched = case = random_case(rng)
+            expected = availability.build_slots(start, end, step, baseline_counts(*case), len(schedule_ids))
+            grid, blocks = availability.compute_availability(*case)
+            self.assertEqual(grid["slots"], expected)
+            self.assertEqual(blocks, availability.all_free_blocks(expected, len(schedule_ids)))
+            for fmt in (availability.FORMAT_RLE, availability.FORMAT_BINARY):
+                _, compact_blocks = availability.compute_availability(*case, fmt=fmt)
+                self.assertEqual(compact_blocks, blocks)
+
+    def test_edge_cases(self):
+        step = 30
+        start, end = T0, T0 + timedelta(minutes=70)  # last slot is 10 minutes long
+        at = lambda minutes: T0 + timedelta(minutes=minutes)
+        by_sched = {
+            "zero": [(at(45), at(45))],  # zero-length, inside slot 1
+            "touch": [(at(0), at(30))],  # ends exactly on a slot boundary
+            "tail": [(at(65), at(90))],  # overlaps only the partial last slot
+        }
+        for sid in by_sched:
+            with self.subTest(sid=sid):
+                expected = baseline_counts(start, end, step, [sid], by_sched)
+                self.assertEqual(availability.busy_counts(start, end, step, [sid], by_sched), expected)
+                if availability.np is not None:
+                    self.assertEqual(availability.busy_counts_bitmap(start, end, step, [sid], by_sched), expected)
+        self.assertEqual(baseline_counts(start, end, step, ["zero"], by_sched), [0, 1, 0])
+        self.assertEqual(baseline_counts(start, end, step, ["touch"], by_sched), [1, 0, 0])
+        self.assertEqual(baseline_counts(start, end, step, ["tail"], by_sched), [0, 0, 1])
+
+
+class BusyCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('owner@example.com', 'pw')
+        self.schedule = Schedule.objects.create(user=user, name='s')
+        Event.objects.create(schedule=self.schedule, title='e', start=T0, end=T0 + timedelta(hours=1))
+        self.window = (T0 - timedelta(hours=1), T0 + timedelta(hours=2))
+
+    def test_data_read_failure_falls_back_to_database(self):
+        get_many = cache.get_many
+
+        def failing(keys):
+            if any(key.startswith('busy:data:') for key in keys):
+                raise ConnectionError('redis down')
+            return get_many(keys)
+
+        with mock.patch.object(busy_cache.cache, 'get_many', side_effect=failing), self.assertLogs('api.busy_cache', 'ERROR'):
+            found = busy_cache.window_intervals([self.schedule.id], *self.window)
+        self.assertEqual(found, {self.schedule.id: [(T0, T0 + timedelta(hours=1))]})
+
+    def test_data_write_failure_still_returns_intervals(self):
+        failing = mock.patch.object(busy_cache.cache, 'set_many', side_effect=ConnectionError('redis down'))
+        with failing, self.assertLogs('api.busy_cache', 'ERROR'):
+            found = busy_cache.window_intervals([self.schedule.id], *self.window)
+        self.assertEqual(found, {self.schedule.id: [(T0, T0 + timedelta(hours=1))]})
+
+
+@override_settings(AVAILABILITY_WATCH_MAX_DAYS=7, AVAILABILITY_WATCH_MAX_WINDOWS=2)
+class AvailabilityPushTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('owner@example.com', 'pw')
+        self.group = Group.objects.create(name='g', admin=user)
+        self.schedule = Schedule.objects.create(user=user, name='s')
+        Membership.objects.create(user=user, group=self.group, active_schedule=self.schedule)
+
+    def test_window_length_is_capped(self):
+        with self.assertRaises(ValueError):
+            availability_push.watch(self.group.id, T0, T0 + timedelta(days=8), 60)
+
+    def test_windows_per_group_are_capped(self):
+        availability_push.watch(self.group.id, T0, T0 + timedelta(days=1), 60)
+        availability_push.watch(self.group.id, T0, T0 + timedelta(days=2), 60)
+        availability_push.watch(self.group.id, T0, T0 + timedelta(days=1), 60)  # already registered
+        with self.assertRaises(ValueError):
+            availability_push.watch(self.group.id, T0, T0 + timedelta(days=3), 60)
+
+    def test_push_deltas_sends_changed_slots_and_frees_dead_windows(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f'group_{self.group.id}', channel)
+        day, _ = availability_push.watch(self.group.id, T0, T0 + timedelta(days=1), 60)
+        dead, _ = availability_push.watch(self.group.id, T0, T0 + timedelta(days=2), 60)
+        availability_push.unwatch(self.group.id, dead)
+
+        Event.objects.create(schedule=self.schedule, title='e', start=T0 + timedelta(hours=2), end=T0 + timedelta(hours=3))
+        busy_cache.invalidate(self.schedule.id)
+        availability_push.push_deltas(self.group.id, layer)
+
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message['window'], day)
+        self.assertEqual(message['event']['changes'], [[2, 0]])
+        self.assertEqual(list(cache.get_many(availability_push._slot_keys(self.group.id)).values()), [day])
+        # The freed slot can be claimed by another window.
+        availability_push.watch(self.group.id, T0, T0 + timedelta(days=3), 60)
+
+
+class AvailabilityETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        availability_cache.clear()
+        self.admin = User.objects.create(email='admin@example.com')
+        self.user = User.objects.create(email='member@example.com')
+        self.group = Group.objects.create(name='g', admin=self.admin)
+        self.schedule = Schedule.objects.create(user=self.user, name='s')
+        self.membership = Membership.objects.create(user=self.user, group=self.group, active_schedule=self.schedule)
+        Event.objects.create(schedule=self.schedule, title='busy', start=T0 + timedelta(hours=9), end=T0 + timedelta(hours=10))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.member = APIClient()
+        self.member.force_authenticate(self.user)
+        self.path = f'/api/groups/{self.group.id}/availability/'
+        self.params = {'start': '2025-03-03T00:00:00Z', 'end': '2025-03-04T00:00:00Z', 'step': '60'}
+        # The realtime send runs in database_sync_to_async, which closes the
+        # test transaction's connection on PostgreSQL; these tests only need the version bump.
+        patcher = mock.patch('api.utils.send_changes', new_callable=mock.AsyncMock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **headers):
+        return self.client.get(self.path, self.params, **headers)
+
+    def test_if_none_match_is_a_304_without_loading_events(self):
+        tag = self.get()['ETag']
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = self.get(HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], tag)
+        self.assertEqual(len(ctx), 1)  # the group lookup
+        self.assertFalse([q for q in ctx.captured_queries if 'api_event' in q['sql']])
+
+    def test_repeat_request_is_served_from_the_body_cache(self):
+        first = self.get()
+        hits = availability_cache.stats()['hits']
+        with self.assertNumQueries(1):
+            second = self.get()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(availability_cache.stats()['hits'], hits + 1)
+
+    def test_non_integer_params_are_a_400(self):
+        batch = '/api/groups/availability/'
+        for path, extra in ((self.path, {}), (batch, {'ids': str(self.group.id)})):
+            for param in ('step', 'min_people'):
+                response = self.client.get(path, {**self.params, **extra, param: 'abc'})
+                self.assertEqual(response.status_code, 400, (path, param))
+
+    def test_etag_changes_when_availability_can_change(self):
+        def changes_tag(request):
+            before = self.get()['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                response = request()
+            self.assertLess(response.status_code, 300)
+            self.assertNotEqual(self.get()['ETag'], before)
+            return response
+
+        events = f'/api/schedules/{self.schedule.id}/events/'
+        created = changes_tag(lambda: self.member.post(events, {
+            'title': 'new', 'start': '2025-03-03T12:00:00Z', 'end': '2025-03-03T13:00:00Z',
+        }, format='json'))
+        changes_tag(lambda: self.member.delete(f"{events}{created.data['id']}/"))
+        other = Schedule.objects.create(user=self.user, name='other')
+        changes_tag(lambda: self.member.patch(
+            f'/api/members/{self.membership.id}/', {'active_schedule': str(other.id)}, format='json',
+        ))
+        changes_tag(lambda: self.client.delete(f'/api/members/{self.membership.id}/delete/'))
+
+
+class CoalescingBroadcasterTests(SimpleTestCase):
+    def test_window_defaults_to_zero_without_redis_channel_layer(self):
+        in_memory = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+        redis = {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer'}}
+        with override_settings(BROADCAST_COALESCE_MS=None, CHANNEL_LAYERS=in_memory):
+            self.assertEqual(broadcaster.coalesce_window_ms(), 0)
+            self.assertIsNone(broadcaster.get_broadcaster())
+        with override_settings(BROADCAST_COALESCE_MS=None, CHANNEL_LAYERS=redis):
+            self.assertEqual(broadcaster.coalesce_window_ms(), 150)
+        with override_settings(BROADCAST_COALESCE_MS=40, CHANNEL_LAYERS=in_memory):
+            self.assertEqual(broadcaster.coalesce_window_ms(), 40)
+
+    def test_crashed_flush_is_logged(self):
+        coalescer = broadcaster.CoalescingBroadcaster(1)
+        with mock.patch.object(broadcaster, 'get_channel_layer', side_effect=RuntimeError('boom')), \
+                self.assertLogs('api.broadcaster', 'ERROR') as logs:
+            coalescer._enqueue('groups', 'g1')
+            deadline = time.monotonic() + 2
+            while not logs.records and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertIn('flush crashed', logs.output[0])
+        self.assertIsNone(coalescer._task)
+
+
+class ScheduleExportTests(TransactionTestCase):
+    async def test_export_streams_an_async_iterator(self):
+        user = await User.objects.acreate(email='owner@example.com')
+        schedule = await Schedule.objects.acreate(user=user, name='Work')
+        for i in range(3):
+            await Event.objects.acreate(
+                schedule=schedule, title=f'e{i}', start=T0 + timedelta(hours=i), end=T0 + timedelta(hours=i, minutes=30),
+            )
+        response = await self.async_client.get(
+            f'/api/schedules/{schedule.id}/export/', headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertLess(body.index('SUMMARY:e0'), body.index('SUMMARY:e2'))
+
+
+def vevent(i, start=T0, **props):
+    lines = ['BEGIN:VEVENT', f'UID:{i}@test', f'DTSTART:{start:%Y%m%dT%H%M%SZ}', 'DURATION:PT30M', f'SUMMARY:e{i}']
+    return '\r\n'.join(lines + [f'{k}:{v}' for k, v in props.items()] + ['END:VEVENT']) + '\r\n'
+
+
+def vcalendar(events):
+    return 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\n' + ''.join(events) + 'END:VCALENDAR\r\n'
+
+
+class ScheduleImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='owner@example.com')
+        self.schedule = Schedule.objects.create(user=self.user, name='s')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, body, schedule=None):
+        schedule = schedule or self.schedule
+        return self.client.post(f'/api/schedules/{schedule.id}/import/', body.encode(), content_type='text/calendar')
+
+    def test_rrule_and_exdate_survive_an_export_and_import(self):
+        Event.objects.create(
+            schedule=self.schedule, title='standup', start=T0 + timedelta(hours=9), end=T0 + timedelta(hours=9, minutes=15),
+            rrule='FREQ=WEEKLY;BYDAY=MO,WE;COUNT=6', exdates=['2025-03-05T09:00:00Z'],
+        )
+        rows = list(Event.objects.filter(schedule=self.schedule).values('id', 'title', 'start', 'end', 'description', 'rrule', 'exdates'))
+
+        async def export():
+            async def events():
+                for row in rows:
+                    yield row
+            return ''.join([chunk async for chunk in ics.aiter_calendar(events())])
+
+        copy = Schedule.objects.create(user=self.user, name='copy')
+        response = self.post(async_to_sync(export)(), copy)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'imported': 1})
+        fields = ('title', 'start', 'end', 'rrule', 'exdates', 'series_end')
+        self.assertEqual(
+            Event.objects.filter(schedule=copy).values(*fields).get(),
+            Event.objects.filter(schedule=self.schedule).values(*fields).get(),
+        )
+
+    def test_malformed_vevent_is_a_400_and_imports_nothing(self):
+        events = [vevent(i, T0 + timedelta(hours=i)) for i in range(ScheduleImportView.batch_size + 10)]
+        events.append('BEGIN:VEVENT\r\nDTSTART:not-a-date\r\nEND:VEVENT\r\n')
+        response = self.post(vcalendar(events))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Event.objects.filter(schedule=self.schedule).exists())
+
+    @override_settings(QUERY_COUNT_WARN=10 ** 6)
+    def test_large_file_is_inserted_in_batches(self):
+        n = 5000
+        body = vcalendar(vevent(i, T0 + timedelta(minutes=30 * i)) for i in range(n))
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = self.post(body)
+        self.assertEqual(response.data, {'imported': n})
+        self.assertEqual(Event.objects.filter(schedule=self.schedule).count(), n)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "api_event"')]
+        # batch_size rows per insert, or fewer where the backend caps parameters (SQLite: 100 here).
+        self.assertLessEqual(len(inserts), n // 100)
+
+
+class RecurrenceTests(SimpleTestCase):
+    def expand(self, start, rrule, window_start, window_end, duration=timedelta(hours=1)):
+        end = start + duration
+        series_end = recurrence.series_end(start, end, rrule)
+        return [s for s, _ in recurrence.occurrences(start, end, rrule, [], series_end, window_start, window_end)]
+
+    def test_weekly_byday_only_repeats_listed_days(self):
+        monday = datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc)
+        found = self.expand(monday, 'FREQ=WEEKLY;BYDAY=TU,TH;COUNT=4', monday, monday + timedelta(days=60))
+        self.assertEqual([d.day for d in found], [6, 7, 9, 14])
+        found = self.expand(monday, 'FREQ=WEEKLY;BYDAY=TU,TH', monday, monday + timedelta(days=14))
+        self.assertEqual([d.day for d in found], [6, 7, 9, 14, 16])
+
+    def test_weekly_dtstart_on_a_byday_day_is_not_repeated(self):
+        tuesday = datetime(2025, 1, 7, 9, tzinfo=dt_timezone.utc)
+        found = self.expand(tuesday, 'FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,FR;COUNT=5', tuesday, tuesday + timedelta(days=60))
+        self.assertEqual([d.day for d in found], [7, 10, 21, 24, 4])
+
+    def test_weekly_without_byday_and_late_window(self):
+        monday = datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc)
+        window = monday + timedelta(days=70)
+        found = self.expand(monday, 'FREQ=WEEKLY;BYDAY=WE', window, window + timedelta(days=14))
+        self.assertEqual(found, [monday + timedelta(days=72), monday + timedelta(days=79)])
+        found = self.expand(monday, 'FREQ=WEEKLY', window, window + timedelta(days=14))
+        self.assertEqual(found, [window, window + timedelta(days=7)])
+
+    def test_ics_drops_rules_anchored_in_local_zones(self):
+        def parse(dtstart):
+            lines = ['BEGIN:VEVENT', dtstart, 'DURATION:PT1H', 'RRULE:FREQ=WEEKLY;BYDAY=MO', 'END:VEVENT']
+            return next(ics.parse_events(lines))
+
+        self.assertNotIn('rrule', parse('DTSTART;TZID=Europe/Berlin:20250106T090000'))
+        self.assertNotIn('rrule', parse('DTSTART;TZID=Europe/London:20250106T090000'))
+        self.assertEqual(parse('DTSTART;TZID=UTC:20250106T090000')['rrule'], 'FREQ=WEEKLY;BYDAY=MO')
+        self.assertEqual(parse('DTSTART:20250106T090000Z')['rrule'], 'FREQ=WEEKLY;BYDAY=MO')
+
+    def test_count_and_until_are_capped(self):
+        start = datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc)
+        self.assertEqual(recurrence.parse_rrule('FREQ=DAILY;COUNT=10000000')['count'], recurrence.MAX_COUNT)
+        self.assertEqual(recurrence.parse_rrule('FREQ=DAILY;UNTIL=99991231')['until'], recurrence.MAX_UNTIL)
+        t0 = time.perf_counter()
+        end = recurrence.series_end(start, start + timedelta(hours=1), 'FREQ=MONTHLY;COUNT=10000000')
+        self.assertLess(time.perf_counter() - t0, 0.5)
+        self.assertLessEqual(end, recurrence.MAX_UNTIL + timedelta(days=31 * recurrence.MAX_COUNT))
+        for rrule in ('FREQ=DAILY;UNTIL=99991231', 'FREQ=MONTHLY;UNTIL=99991231'):
+            self.assertLessEqual(recurrence.series_end(start, start, rrule), recurrence.MAX_UNTIL)
+
+    def test_count_end_by_arithmetic_matches_walking_the_series(self):
+        for start in (datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc), datetime(2025, 1, 9, 9, tzinfo=dt_timezone.utc)):
+            for rrule in ('FREQ=DAILY;INTERVAL=3', 'FREQ=WEEKLY;INTERVAL=2', 'FREQ=WEEKLY;BYDAY=MO,WE,SA'):
+                rule = recurrence.parse_rrule(rrule)
+                walked = recurrence._starts_from(start, rule, start)
+                for n in range(20):
+                    self.assertEqual(recurrence._nth_start(start, rule, n), next(walked), (start, rrule, n))
+
+    def test_out_of_range_series_is_a_validation_error(self):
+        start = datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc)
+        with self.assertRaises(recurrence.RecurrenceError):
+            recurrence.series_end(start, start + timedelta(hours=1), 'FREQ=DAILY;INTERVAL=99999999;COUNT=5000')
+        serializer = EventSerializer(data={
+            'title': 't', 'start': '2025-01-06T09:00:00Z', 'end': '2025-01-06T10:00:00Z',
+            'rrule': 'FREQ=MONTHLY;INTERVAL=999999;COUNT=100',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('rrule', serializer.errors)
+
+
+class ConsumerRoomIdTests(TransactionTestCase):
+    async def connect(self, user, path):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        communicator.scope['user'] = user
+        return communicator, await communicator.connect()
+
+    async def test_room_id_is_normalized_before_the_permission_check(self):
+        cache.clear()
+        user = await User.objects.acreate(email='owner@example.com')
+        group = await Group.objects.acreate(name='g', admin=user)
+        communicator, (connected, _) = await self.connect(user, f'/ws/groups/{str(group.id).upper()}/')
+        self.assertTrue(connected)
+        self.assertIs(cache.get(authcache._allowed_key('groups', str(group.id), user.id)), True)
+        await get_channel_layer().group_send(
+            f'group_{group.id}', {'type': 'broadcast', 'room': f'group_{group.id}', 'event': {'type': 'ping'}},
+        )
+        self.assertEqual(await communicator.receive_json_from(), {'event': {'type': 'ping'}})
+        await communicator.disconnect()
+
+    async def test_unparseable_room_id_is_rejected(self):
+        user = await User.objects.acreate(email='owner@example.com')
+        communicator, (connected, code) = await self.connect(user, '/ws/groups/not-a-uuid/')
+        self.assertFalse(connected)
+        self.assertEqual(code, 4400)
+        self.assertFalse(await database_sync_to_async(authcache.is_allowed)('groups', 'not-a-uuid', user.id))
+
+
+class StreamConsumerTests(TransactionTestCase):
+    async def open(self):
+        await cache.aclear()
+        self.user = await User.objects.acreate(email='owner@example.com')
+        self.group = await Group.objects.acreate(name='g', admin=self.user)
+        self.room = f'groups/{self.group.id}'
+        self.communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/stream/')
+        self.communicator.scope['user'] = self.user
+        connected, _ = await self.communicator.connect()
+        self.assertTrue(connected)
+
+    async def send(self, **message):
+        await self.communicator.send_json_to(message)
+        return await self.communicator.receive_json_from()
+
+    async def test_subscribe_joins_allowed_rooms_and_reports_the_rest(self):
+        await self.open()
+        other = await User.objects.acreate(email='other@example.com')
+        foreign = f'groups/{(await Group.objects.acreate(name="h", admin=other)).id}'
+        malformed = ['groups/not-a-uuid', f'teams/{self.group.id}', 42]
+        reply = await self.send(action='subscribe', rooms=[f'groups/{str(self.group.id).upper()}', foreign, *malformed])
+        self.assertEqual(reply, {'action': 'subscribed', 'rooms': [self.room], 'denied': [*malformed, foreign]})
+        await get_channel_layer().group_send(
+            f'group_{self.group.id}', {'type': 'broadcast', 'room': f'group_{self.group.id}', 'event': {'type': 'ping'}},
+        )
+        self.assertEqual(await self.communicator.receive_json_from(), {'room': self.room, 'event': {'type': 'ping'}})
+        await self.communicator.disconnect()
+
+    async def test_subscribing_past_max_rooms_is_refused(self):
+        await self.open()
+        groups = [await Group.objects.acreate(name=f'g{i}', admin=self.user) for i in range(2)]
+        with mock.patch.object(StreamConsumer, 'max_rooms', 2):
+            reply = await self.send(action='subscribe', rooms=[self.room, *(f'groups/{g.id}' for g in groups)])
+        self.assertEqual(reply, {'error': 'at most 2 rooms per connection'})
+        self.assertEqual(await self.send(action='publish', room=self.room, event={}), {'error': 'not subscribed', 'room': self.room})
+        await self.communicator.disconnect()
+
+    async def test_publish_needs_a_subscription(self):
+        await self.open()
+        reply = await self.send(action='publish', room=self.room, event={'type': 'hello'})
+        self.assertEqual(reply, {'error': 'not subscribed', 'room': self.room})
+        await self.send(action='subscribe', rooms=[self.room])
+        reply = await self.send(action='publish', room=self.room, event={'type': 'hello'})
+        self.assertEqual(reply, {'room': self.room, 'event': {'type': 'hello'}})
+        await self.communicator.disconnect()
+
+    @override_settings(AVAILABILITY_PUSH_DELTAS=True)
+    async def test_unsubscribe_tears_down_watches(self):
+        await self.open()
+        await self.send(action='subscribe', rooms=[self.room])
+        reply = await self.send(
+            action='watch_availability', room=self.room, start='2025-03-03T00:00:00Z', end='2025-03-04T00:00:00Z', step=60,
+        )
+        key = reply['event']['window']
+        ref_key = availability_push._ref_key(str(self.group.id), key)
+        self.assertEqual(await cache.aget(ref_key), 1)
+        self.assertEqual(await self.send(action='unsubscribe', rooms=[self.room]), {'action': 'unsubscribed', 'rooms': [self.room]})
+        self.assertEqual(await cache.aget(ref_key), 0)
+        await get_channel_layer().group_send(f'group_{self.group.id}', {
+            'type': 'availability_delta', 'room': f'group_{self.group.id}', 'window': key, 'event': {'type': 'delta'},
+        })
+        self.assertTrue(await self.communicator.receive_nothing())
+        await self.communicator.disconnect()
+
+
+class OutboxRelayTests(SimpleTestCase):
+    def test_room_events_keep_id_order_per_room(self):
+        sent = []
+
+        class SlowLayer:
+            async def group_send(self, room, message):
+                # Later events finish sooner, so any concurrency within a room reorders them.
+                await asyncio.sleep(0.01 * (5 - message['event']['seq']))
+                sent.append((room, message['event']['seq']))
+
+        messages = [
+            OutboxMessage(id=i, kind=OutboxMessage.ROOM_EVENT, target=room, payload={'seq': seq})
+            for i, (seq, room) in enumerate(((seq, room) for seq in range(5) for room in ('group_a', 'group_b')), 1)
+        ]
+        async_to_sync(outbox._send)(SlowLayer(), messages)
+        for room in ('group_a', 'group_b'):
+            self.assertEqual([seq for r, seq in sent if r == room], list(range(5)))
+        # The two rooms were sent concurrently, so their events interleave.
+        self.assertNotEqual([room for room, _ in sent], ['group_a'] * 5 + ['group_b'] * 5)
+
+
+def brute_force_meeting_times(start, end, duration, step, busy, always_free=(), required=(), min_people=1, limit=5):
+    candidates = []
+    k = 0
+    while start + k * timedelta(minutes=step) + duration <= end:
+        s = start + k * timedelta(minutes=step)
+        free = [m for m, intervals in busy.items() if not any(b < s + duration and e > s and e > b for b, e in intervals)]
+        members = free + list(always_free)
+        if set(required) <= set(free) and len(members) >= min_people:
+            candidates.append((-len(members), k, availability.iso(s), members))
+        k += 1
+    return [{'start': iso, 'available': -neg, 'memberIds': members} for neg, _, iso, members in sorted(candidates)[:limit]]
+
+
+class MeetingTimeTests(SimpleTestCase):
+    def find(self, *args, **kwargs):
+        return [
+            {'start': r['start'], 'available': r['available'], 'memberIds': r['memberIds']}
+            for r in suggestions.find_meeting_times(*args, **kwargs)
+        ]
+
+    def test_free_day_returns_limit_windows(self):
+        day = T0 + timedelta(hours=8)
+        found = self.find(day, day + timedelta(hours=10), timedelta(hours=1), 15, {'a': [], 'b': []}, limit=5)
+        self.assertEqual([r['start'] for r in found], [availability.iso(day + timedelta(minutes=15 * i)) for i in range(5)])
+
+    def test_top_k_by_attendance_then_earliest(self):
+        day = T0 + timedelta(hours=8)
+        busy = {'a': [(day + timedelta(hours=1), day + timedelta(hours=2))], 'b': []}
+        found = self.find(day, day + timedelta(hours=10), timedelta(hours=1), 15, busy, limit=5)
+        self.assertEqual(
+            [(r['start'][11:16], r['available']) for r in found],
+            [('08:00', 2), ('10:00', 2), ('10:15', 2), ('10:30', 2), ('10:45', 2)],
+        )
+
+    def test_matches_brute_force(self):
+        rng = random.Random(5)
+        members = ['a', 'b', 'c', 'd', 'e']
+        for _ in range(400):
+            start = T0 + timedelta(minutes=rng.randrange(0, 60))
+            end = start + timedelta(minutes=rng.randrange(30, 24 * 60))
+            duration = timedelta(minutes=rng.choice((15, 30, 45, 60, 90)))
+            step = rng.choice((5, 15, 30))
+            busy = {}
+            for m in members[:rng.randrange(1, 6)]:
+                busy[m] = []
+                for _ in range(rng.randrange(0, 6)):
+                    s = start + timedelta(minutes=rng.randrange(-60, 24 * 60))
+                    busy[m].append((s, s + timedelta(minutes=rng.choice((0, 10, 30, 60, 120)))))
+            kwargs = {
+                'always_free': ['x'] if rng.random() < 0.3 else [],
+                'required': set(rng.sample(list(busy), rng.randrange(0, 2))),
+                'min_people': rng.randrange(1, 4),
+                'limit': rng.choice((1, 5, 20)),
+            }
+            with self.subTest(start=start, end=end, duration=duration, step=step, busy=busy, **kwargs):
+                self.assertEqual(
+                    self.find(start, end, duration, step, busy, **kwargs),
+                    brute_force_meeting_times(start, end, duration, step, busy, **kwargs),
+                )
+
+
+class EventPagingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw')
+        self.schedule = Schedule.objects.create(user=self.user, name='s')
+        for i in range(7):
+            Event.objects.create(schedule=self.schedule, title=f'e{i}', start=T0 + timedelta(hours=5 * i), end=T0 + timedelta(hours=5 * i + 1))
+        Event.objects.create(
+            schedule=self.schedule, title='standup', start=T0 + timedelta(hours=9), end=T0 + timedelta(hours=9, minutes=15),
+            rrule='FREQ=DAILY;COUNT=5',
+        )
+        self.path = f'/api/schedules/{self.schedule.id}/events/'
+        self.window = {'start': '2025-03-03T00:00:00Z', 'end': '2025-03-10T00:00:00Z'}
+
+    def pages(self, get, params):
+        items, url, params = [], self.path, {**params, 'limit': '3'}
+        while url:
+            body = get(url, params)
+            self.assertLessEqual(len(body['results']), 3)
+            items += body['results']
+            url, params = body['next'], {}
+        return items
+
+    def sync_get(self, url, params):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(url, params).json()
+
+    def async_get(self, url, params):
+        request = AsyncRequestFactory().get(url, params, headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'})
+        response = async_to_sync(EventListAsyncView.as_view())(request, schedule_id=self.schedule.id)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_async_view_pages_like_the_sync_view(self):
+        everything = self.sync_get(self.path, self.window)
+        self.assertEqual(len(everything), 12)
+        for params in (self.window, {}):
+            with self.subTest(params=params):
+                expected = self.pages(self.sync_get, params)
+                self.assertEqual(self.pages(self.async_get, params), expected)
+        self.assertEqual([e['start'] for e in self.pages(self.async_get, self.window)], [e['start'] for e in everything])
+
+    def test_async_view_without_paging_returns_a_list(self):
+        self.assertIsInstance(self.async_get(self.path, self.window), list)
+
+
+class QueryBudgetTests(TestCase):
+    window = 'start=2025-03-03T00:00:00Z&end=2025-03-10T00:00:00Z'
+
+    def seed(self, members):
+        admin = User.objects.create(email=f'admin{members}@example.com')
+        groups = [Group.objects.create(name=f'g{i}', admin=admin) for i in range(2)]
+        schedules = []
+        for i in range(members):
+            user = admin if i == 0 else User.objects.create(email=f'm{members}-{i}@example.com')
+            schedule = Schedule.objects.create(user=user, name='s') if i % 4 != 3 else None  # some members have none
+            for group in groups:
+                Membership.objects.create(user=user, group=group, active_schedule=schedule)
+            if schedule is not None:
+                schedules.append(schedule)
+                for d in range(3):
+                    Event.objects.create(schedule=schedule, title='e', start=T0 + timedelta(days=d, hours=i % 8), end=T0 + timedelta(days=d, hours=i % 8 + 1))
+                Event.objects.create(
+                    schedule=schedule, title='r', start=T0 + timedelta(hours=12), end=T0 + timedelta(hours=13), rrule='FREQ=DAILY;COUNT=4',
+                )
+        group_event = GroupEvent.objects.create(
+            group=groups[0], created_by=admin, title='offsite', start=T0 + timedelta(days=1), end=T0 + timedelta(days=1, hours=2),
+        )
+        group_events.sync(group_event)
+        client = APIClient()
+        client.force_authenticate(admin)
+        g = groups[0].id
+        paths = {
+            'group-list-create': '/api/groups/',
+            'group-availability': f'/api/groups/{g}/availability/?{self.window}&step=30',
+            'group-availability-batch': f'/api/groups/availability/?ids={groups[0].id},{groups[1].id}&{self.window}',
+            'group-suggestions': f'/api/groups/{g}/suggestions/?{self.window}&duration=60',
+            'member-list-create': f'/api/groups/{g}/members/',
+            'event-list-create': f'/api/schedules/{schedules[0].id}/events/?{self.window}',
+            'group-event-list-create': f'/api/groups/{g}/events/',
+            'group-event-detail': f'/api/group-events/{group_event.id}/',
+        }
+        return client, paths
+
+    def test_every_budgeted_endpoint_stays_within_budget(self):
+        for members in (3, 15):
+            client, paths = self.seed(members)
+            self.assertEqual(set(paths), set(ENDPOINT_QUERY_BUDGETS))
+            for name, path in paths.items():
+                with self.subTest(members=members, endpoint=name):
+                    cache.clear()
+                    availability_cache.clear()
+                    response = request_within_budget(client, 'get', path)
+                    self.assertEqual(response.status_code, 200, response.content)
+
+    def test_budget_failure_lists_the_queries(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries, budget 1'):
+            with query_budget(1):
+                list(User.objects.all())
+                list(Group.objects.all())
+
+
+class MemberImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(email='admin@example.com')
+        self.group = Group.objects.create(name='g', admin=self.admin)
+        self.users = [User.objects.create(email=f'u{i}@example.com') for i in range(3)]
+        self.emails = [u.email for u in self.users]
+
+    def test_rows_lost_to_a_concurrent_add_are_reported_as_already_member(self):
+        bulk_create = Membership.objects.bulk_create
+
+        def racing(objs, **kwargs):
+            Membership.objects.create(user=self.users[1], group=self.group)  # another request wins
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Membership.objects, 'bulk_create', side_effect=racing):
+            created, skipped = member_import.add_chunk(self.group, self.emails)
+        self.assertEqual(sorted(m.user_id for m in created), sorted([self.users[0].id, self.users[2].id]))
+        self.assertEqual(skipped, [{'email': 'u1@example.com', 'reason': 'already_member'}])
+        self.assertEqual(Membership.objects.filter(id__in=[m.id for m in created]).count(), 2)
+
+    @override_settings(MEMBER_IMPORT_STALE_SECONDS=60)
+    def test_job_not_heard_from_reads_as_failed(self):
+        job = {'id': 'j', 'groupId': str(self.group.id), 'status': 'running', 'total': 3, 'processed': 0, 'created': 0, 'skipped': []}
+        with mock.patch('api.member_import.time.time', return_value=1000):
+            member_import._save(job)
+        with mock.patch('api.member_import.time.time', return_value=1060):
+            self.assertEqual(member_import.get_job('j')['status'], 'running')
+        with mock.patch('api.member_import.time.time', return_value=1061):
+            self.assertEqual(member_import.get_job('j')['status'], 'failed')
+            member_import._save({**job, 'status': 'done'})
+            self.assertEqual(member_import.get_job('j')['status'], 'done')
+
+    def test_added_members_lose_cached_room_denials(self):
+        for user in self.users:
+            self.assertFalse(authcache.is_allowed('groups', self.group.id, user.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            member_import.add_members(self.group, self.emails)
+        for user in self.users:
+            self.assertTrue(authcache.is_allowed('groups', self.group.id, user.id))
+
+
+class GroupEventAnnounceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(email='admin@example.com')
+        self.group = Group.objects.create(name='g', admin=self.admin)
+        self.schedules = []
+        for i in range(2):
+            user = User.objects.create(email=f'u{i}@example.com')
+            self.schedules.append(Schedule.objects.create(user=user, name='s'))
+            Membership.objects.create(user=user, group=self.group, active_schedule=self.schedules[-1])
+        self.group_event = GroupEvent.objects.create(
+            group=self.group, created_by=self.admin, title='t', start=T0, end=T0 + timedelta(hours=1),
+        )
+
+    def announce(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            group_events.announce(self.group_event, group_events.sync(self.group_event), 'created')
+
+    @override_settings(REALTIME_OUTBOX=False, BROADCAST_COALESCE_MS=0)
+    def test_touched_schedules_are_sent_as_one_schedule_change(self):
+        with mock.patch('api.utils.send_changes', new_callable=mock.AsyncMock) as send, \
+                mock.patch('api.group_events.broadcast_group_event') as group_event_changed:
+            self.announce()
+        send.assert_called_once()
+        _, schedules, groups = send.call_args.args
+        self.assertEqual(schedules, Counter(str(s.id) for s in self.schedules))
+        self.assertEqual(groups, Counter())
+        self.assertEqual(group_event_changed.call_args.args[1]['type'], 'group_event_changed')
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.availability_version, 1)
+
+    def test_update_saves_onto_the_locked_row(self):
+        stale = GroupEvent.objects.get(id=self.group_event.id)
+        GroupEvent.objects.filter(id=stale.id).update(description='set by a concurrent update', version=2)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with mock.patch('api.views.GroupEventDetailView.get_object', return_value=stale):
+            response = client.patch(f'/api/group-events/{stale.id}/', {'title': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.group_event.refresh_from_db()
+        self.assertEqual(
+            (self.group_event.title, self.group_event.description, self.group_event.version),
+            ('renamed', 'set by a concurrent update', 3),
+        )
+        self.assertEqual(response.data['version'], 3)
+
+    @override_settings(REALTIME_OUTBOX=True)
+    def test_touched_schedules_go_through_the_outbox(self):
+        for i in range(2, 6):
+            user = User.objects.create(email=f'u{i}@example.com')
+            self.schedules.append(Schedule.objects.create(user=user, name='s'))
+            Membership.objects.create(user=user, group=self.group, active_schedule=self.schedules[-1])
+        # Eight queries whatever the group size: sync() reads and bulk-inserts,
+        # the version bump, one outbox insert for all the schedules and one for
+        # group_event_changed.
+        with self.assertNumQueries(8):
+            self.announce()
+        self.assertEqual(
+            set(OutboxMessage.objects.filter(kind=OutboxMessage.SCHEDULE_CHANGED).values_list('target', flat=True)),
+            {str(s.id) for s in self.schedules},
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica_test'], REPLICA_STICKY_SECONDS=1)
+class ReplicaRoutingTests(TransactionTestCase):
+    # A replica alias mirroring the test database (TEST: MIRROR), so which
+    # connection ran each query is observable. It is registered in setUpClass
+    # because the settings only define replicas when DB_REPLICA_HOSTS is set.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings['replica_test'] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        cls.databases = cls.databases | {'replica_test'}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica_test'].close()
+        del connections['replica_test']
+        del connections.settings['replica_test']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='owner@example.com')
+        self.schedule = Schedule.objects.create(user=self.user, name='s')
+        self.path = f'/api/schedules/{self.schedule.id}/events/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read(self):
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica_test']) as replica:
+            self.assertEqual(self.client.get(self.path).status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_replica_then_primary_after_a_write_until_the_pin_expires(self):
+        self.assertEqual(self.read(), (0, 2))
+        response = self.client.post(self.path, {'title': 'e', 'start': '2025-03-03T09:00:00Z', 'end': '2025-03-03T10:00:00Z'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.read(), (2, 0))
+        time.sleep(1.1)
+        self.assertEqual(self.read(), (0, 2))
+
+    def test_views_outside_replica_read_views_use_the_primary(self):
+        with CaptureQueriesContext(connections['replica_test']) as replica:
+            self.assertEqual(self.client.get(f'/api/schedules/{self.schedule.id}/').status_code, 200)
+        self.assertEqual(len(replica), 0)
+
+    async def test_async_write_pins_the_user(self):
+        response = await self.async_client.post(
+            self.path, {'title': 'e', 'start': '2025-03-03T09:00:00Z', 'end': '2025-03-03T10:00:00Z'},
+            content_type='application/json', headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIs(await cache.aget(db_router._sticky_key(self.user.pk)), True)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
@@ -9,12 +10,23 @@ from .views import (
     ScheduleDetailView,
     EventListCreateView,
     EventDetailView,
+    ScheduleImportView,
+    ScheduleExportView,
     MembershipListCreateView,
+    MemberImportStatusView,
     MembershipUpdateView,
     MembershipDeleteView,
+    GroupEventListCreateView,
+    GroupEventDetailView,
+    GroupEventRSVPView,
     GroupAvailabilityView,
+    GroupAvailabilityBatchView,
+    GroupSuggestionsView,
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import EventListAsyncView as EventListCreateView, GroupAvailabilityAsyncView as GroupAvailabilityView
+
 urlpatterns = [
     path('register/', UserCreateView.as_view(), name='user-register'),
     path('token/', TokenObtainPairView.as_view(), name='token-obtain'),
@@ -24,16 +36,26 @@ urlpatterns = [
     path('groups/<uuid:group_id>/', GroupDetailView.as_view(), name='group-detail'),
 
     path('groups/<uuid:group_id>/members/', MembershipListCreateView.as_view(), name='member-list-create'),
+    path('groups/<uuid:group_id>/members/jobs/<uuid:job_id>/', MemberImportStatusView.as_view(), name='member-import-status'),
     path('members/<uuid:membership_id>/', MembershipUpdateView.as_view(), name='member-update'),
     path('members/<uuid:membership_id>/delete/', MembershipDeleteView.as_view(), name='member-delete'),
 
+    path('groups/<uuid:group_id>/events/', GroupEventListCreateView.as_view(), name='group-event-list-create'),
+    path('group-events/<uuid:group_event_id>/', GroupEventDetailView.as_view(), name='group-event-detail'),
+    path('group-events/<uuid:group_event_id>/rsvp/', GroupEventRSVPView.as_view(), name='group-event-rsvp'),
+
     path('schedules/', ScheduleListCreateView.as_view(), name='schedule-list-create'),
     path('schedules/<uuid:schedule_id>/', ScheduleDetailView.as_view(), name='schedule-detail'),
 
+    path('schedules/<uuid:schedule_id>/import/', ScheduleImportView.as_view(), name='schedule-import'),
+    path('schedules/<uuid:schedule_id>/export/', ScheduleExportView.as_view(), name='schedule-export'),
+
     path('schedules/<uuid:schedule_id>/events/', EventListCreateView.as_view(), name='event-list-create'),
     path('schedules/<uuid:schedule_id>/events/<uuid:event_id>/', EventDetailView.as_view(), name='event-detail'),
 
+    path('groups/availability/', GroupAvailabilityBatchView.as_view(), name='group-availability-batch'),
     path('groups/<uuid:group_id>/availability/', GroupAvailabilityView.as_view(), name='group-availability'),
+    path('groups/<uuid:group_id>/suggestions/', GroupSuggestionsView.as_view(), name='group-suggestions'),
 
     path('user/', CurrentUserView.as_view(), name='current-user'),
 ]
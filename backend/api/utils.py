@@ -1,23 +1,76 @@
 import logging
+from collections import Counter
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from .models import Membership
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from . import busy_cache, metrics, outbox
+from .broadcaster import get_broadcaster, send_changes
+from .models import Group, Membership, OutboxMessage
 
 log = logging.getLogger(__name__)
 
-def broadcast_schedule_change(schedule_id):
+def _send_after_commit(send, *args):
     layer = get_channel_layer()
     if not layer:
         log.error("no channel layer")
         return
-    async_to_sync(layer.group_send)(
-        f"schedule_{schedule_id}",
-        {"type": "broadcast", "event": {"type": "event_changed", "scheduleId": str(schedule_id)}},
-    )
-    group_ids = list(Membership.objects.filter(active_schedule_id=schedule_id).values_list("group_id", flat=True).distinct())
-    log.info("broadcast schedule=%s -> groups=%s", schedule_id, group_ids)
-    for gid in group_ids:
-        async_to_sync(layer.group_send)(
-            f"group_{gid}",
-            {"type": "broadcast", "event": {"type": "availability_changed", "groupId": str(gid)}},
+    transaction.on_commit(lambda: async_to_sync(send)(layer, *args))
+
+def bump_availability_version(schedule_id=None, group_id=None, schedule_ids=None):
+    """Invalidate availability ETags of the group, or of every group using the schedule(s).
+
+    Runs after commit (and after busy_cache invalidation), so any reader that
+    sees the new version also sees the change.
+    """
+    if group_id:
+        group_ids = [group_id]
+    else:
+        schedule_ids = [schedule_id] if schedule_ids is None else list(schedule_ids)
+        group_ids = list(
+            Membership.objects.filter(active_schedule_id__in=schedule_ids).values_list('group_id', flat=True).distinct()
+        )
+    if group_ids:
+        transaction.on_commit(
+            lambda: Group.objects.filter(id__in=group_ids).update(availability_version=F('availability_version') + 1)
         )
+
+def broadcast_schedule_change(schedule_id):
+    broadcast_schedules_change([schedule_id])
+
+def broadcast_schedules_change(schedule_ids):
+    """Invalidate and announce a batch of changed schedules as one change."""
+    for sid in schedule_ids:
+        transaction.on_commit(lambda sid=sid: busy_cache.invalidate(sid))
+    bump_availability_version(schedule_ids=schedule_ids)
+    if settings.REALTIME_OUTBOX:
+        outbox.enqueue_many(OutboxMessage.SCHEDULE_CHANGED, schedule_ids)
+        return
+    broadcaster = get_broadcaster()
+    if broadcaster:
+        for sid in schedule_ids:
+            broadcaster.schedule_changed(sid)
+        return
+    _send_after_commit(send_changes, Counter(str(sid) for sid in schedule_ids), Counter())
+
+def broadcast_availability_change(group_id):
+    bump_availability_version(group_id=group_id)
+    if settings.REALTIME_OUTBOX:
+        outbox.enqueue(OutboxMessage.GROUP_CHANGED, group_id)
+        return
+    broadcaster = get_broadcaster()
+    if broadcaster:
+        broadcaster.group_changed(group_id)
+        return
+    _send_after_commit(send_changes, Counter(), Counter([str(group_id)]))
+
+def broadcast_group_event(group_id, event):
+    room = f"group_{group_id}"
+    if settings.REALTIME_OUTBOX:
+        outbox.enqueue(OutboxMessage.ROOM_EVENT, room, event)
+        return
+    _send_after_commit(_send_room, room, event)
+
+async def _send_room(layer, room, event):
+    await metrics.group_send(layer, room, {"type": "broadcast", "room": room, "event": event}, "room_event")
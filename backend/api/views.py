@@ -1,17 +1,28 @@
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.permissions import IsAuthenticated, AllowAny, SAFE_METHODS, BasePermission
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .serializers import UserSerializer, GroupSerializer, ScheduleSerializer, EventSerializer, MembershipSerializer, MembershipAddByEmailSerializer
-from .models import User, Group, Schedule, Event, Membership
+from .serializers import GroupEventSerializer, GroupEventAttendeeSerializer, GroupEventRSVPSerializer
+from .models import User, Group, Schedule, Event, Membership, GroupEvent, GroupEventAttendee
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Exists, OuterRef
-from django.http import Http404
-from datetime import timedelta, timezone as dt_timezone
-from django.utils.dateparse import parse_datetime
-from django.utils import timezone
-from .utils import broadcast_schedule_change
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, Exists, OuterRef, Subquery
+from django.http import Http404, StreamingHttpResponse
+from django.db import transaction
+import time
+from datetime import timedelta
+from itertools import islice, repeat
+from types import SimpleNamespace
+from .pagination import KeysetPage
+from .utils import broadcast_availability_change, broadcast_group_event, broadcast_schedule_change, bump_availability_version
+from . import availability_cache, availability_sql, busy_cache, group_events, ics, member_import, metrics, recurrence, suggestions
+from .availability import (
+    ENGINES, FORMAT_SLOTS, FORMATS, availability_from_counts, choose_engine, compute_availability, parse_range, parse_window, slot_count,
+)
 
 class CurrentUserView(APIView):
     permission_classes = [IsAuthenticated]
@@ -37,7 +48,7 @@ class GroupListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Group.objects.filter(memberships__user=self.request.user)
+        return Group.objects.filter(memberships__user=self.request.user).select_related('admin')
     
     def perform_create(self, serializer):
         group = serializer.save(admin=self.request.user)
@@ -52,16 +63,10 @@ class GroupDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Group.objects.filter(Q(admin=self.request.user) | Q(memberships__user=self.request.user)).distinct()
     
+    @transaction.atomic
     def perform_update(self, serializer):
         obj = serializer.save()
-        from asgiref.sync import async_to_sync
-        from channels.layers import get_channel_layer
-        layer = get_channel_layer()
-        if layer:
-            async_to_sync(layer.group_send)(
-                f"group_{obj.id}",
-                {"type": "broadcast", "event": {"type": "group_name_updated", "groupId": str(obj.id), "name": obj.name}},
-            )
+        broadcast_group_event(obj.id, {"type": "group_name_updated", "groupId": str(obj.id), "name": obj.name})
 
 class ScheduleListCreateView(generics.ListCreateAPIView):
     serializer_class = ScheduleSerializer
@@ -82,6 +87,51 @@ class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Schedule.objects.filter(user=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        bump_availability_version(schedule_id=instance.id)
+        instance.delete()
+
+def expand_events(events, start, end, serialize):
+    """Serialized events overlapping [start, end), one item per occurrence of recurring ones, by start."""
+    as_str = serializers.DateTimeField().to_representation
+    rows = []
+    for event in events:
+        item = serialize(event)
+        if not event.rrule:
+            rows.append((event.start, item))
+            continue
+        for occ_start, occ_end in recurrence.occurrences(
+            event.start, event.end, event.rrule, event.exdates, event.series_end, start, end
+        ):
+            rows.append((occ_start, {
+                **item, 'start': as_str(occ_start), 'end': as_str(occ_end), 'recurrence_id': as_str(occ_start),
+            }))
+    rows.sort(key=lambda row: row[0])
+    return [item for _, item in rows]
+
+def occurrence_page(events, start, end, page, serialize):
+    """The next page of occurrences as (start, event id, item). Single events come
+    straight from the keyset query; series are expanded from the cursor, a page at most."""
+    as_str = serializers.DateTimeField().to_representation
+    rows = [(e.start, e.id, serialize(e)) for e in page.filter(events.filter(rrule=''))]
+    from_start = max(start, page.after[0]) if page.after else start
+    for series in events.exclude(rrule=''):
+        taken = list(islice((
+            (occ_start, occ_end) for occ_start, occ_end in recurrence.occurrences(
+                series.start, series.end, series.rrule, series.exdates, series.series_end, from_start, end
+            ) if page.is_after(occ_start, series.id)
+        ), page.limit + 1))
+        if not taken:
+            continue
+        item = serialize(series)
+        rows.extend(
+            (occ_start, series.id, {**item, 'start': as_str(occ_start), 'end': as_str(occ_end), 'recurrence_id': as_str(occ_start)})
+            for occ_start, occ_end in taken
+        )
+    rows.sort(key=lambda row: (row[0], row[1]))
+    return rows[:page.limit + 1]
+
 class EventListCreateView(generics.ListCreateAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
@@ -93,10 +143,81 @@ class EventListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return Event.objects.filter(schedule=self.get_schedule())
 
+    def list(self, request, *args, **kwargs):
+        start_str = request.query_params.get('start')
+        end_str = request.query_params.get('end')
+        page = KeysetPage(request) if KeysetPage.requested(request) else None
+        if not start_str and not end_str:
+            if page is None:
+                return super().list(request, *args, **kwargs)
+            rows = [(e.start, e.id, self.get_serializer(e).data) for e in page.filter(self.get_queryset())]
+            return Response(page.response_data(rows))
+        try:
+            start, end = parse_range(start_str, end_str)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        events = self.get_queryset().filter(start__lt=end).filter(
+            Q(series_end__isnull=True) | Q(series_end__gt=start)
+        )
+        if page is None:
+            return Response(expand_events(events.order_by('start'), start, end, lambda event: self.get_serializer(event).data))
+        return Response(page.response_data(occurrence_page(events, start, end, page, lambda event: self.get_serializer(event).data)))
+
+    @transaction.atomic
     def perform_create(self, serializer):
         obj = serializer.save(schedule=self.get_schedule())
         broadcast_schedule_change(obj.schedule_id)
 
+class ScheduleImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    batch_size = 500
+
+    def post(self, request, schedule_id):
+        schedule = get_object_or_404(Schedule, id=schedule_id, user=request.user)
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                raise ValidationError("Upload an iCalendar file as 'file' or send it as text/calendar.")
+            lines = upload
+        else:
+            lines = request.stream or []
+
+        imported = 0
+        events = map(self.build_event, ics.parse_events(lines), repeat(schedule))
+        try:
+            with transaction.atomic():
+                while True:
+                    batch = list(islice(events, self.batch_size))
+                    if not batch:
+                        break
+                    Event.objects.bulk_create(batch, batch_size=self.batch_size)
+                    imported += len(batch)
+                if imported:
+                    broadcast_schedule_change(schedule.id)
+        except ics.ICSError as e:
+            raise ValidationError(str(e))
+        return Response({'imported': imported}, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def build_event(fields, schedule):
+        event = Event(schedule=schedule, **fields)
+        event.refresh_series_end()
+        return event
+
+class ScheduleExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, schedule_id):
+        schedule = get_object_or_404(Schedule, id=schedule_id, user=request.user)
+        events = (
+            Event.objects.filter(schedule=schedule).order_by('start', 'id')
+            .values('id', 'title', 'start', 'end', 'description', 'rrule', 'exdates').aiterator(chunk_size=2000)
+        )
+        response = StreamingHttpResponse(ics.aiter_calendar(events, name=schedule.name), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="schedule-{schedule.id}.ics"'
+        return response
+
 class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
@@ -107,27 +228,32 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
         schedule_id = self.kwargs['schedule_id']
         return Event.objects.filter(schedule_id=schedule_id, schedule__user=self.request.user)
     
+    @transaction.atomic
     def perform_update(self, serializer):
         obj = serializer.save()
         broadcast_schedule_change(obj.schedule_id)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         sid = instance.schedule_id
         super().perform_destroy(instance)
         broadcast_schedule_change(sid)
 
+def visible_group(user, group_id):
+    """The group if user is its admin or a member, else 404."""
+    member_exists = Membership.objects.filter(group_id=OuterRef('id'), user=user)
+    qs = Group.objects.filter(id=group_id).annotate(is_member=Exists(member_exists)).filter(Q(admin=user) | Q(is_member=True))
+    group = qs.first()
+    if not group:
+        raise Http404("Group not found")
+    return group
+
 class MembershipListCreateView(generics.ListCreateAPIView):
     serializer_class = MembershipSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_group(self):
-        group_id = self.kwargs['group_id']
-        member_exists = Membership.objects.filter(group_id=OuterRef('id'), user=self.request.user)
-        qs = Group.objects.filter(id=group_id).annotate(is_member=Exists(member_exists)).filter(Q(admin=self.request.user) | Q(is_member=True))
-        group = qs.first()
-        if not group:
-            raise Http404("Group not found")
-        return group
+        return visible_group(self.request.user, self.kwargs['group_id'])
 
     def get_queryset(self):
         group = self.get_group()
@@ -135,27 +261,28 @@ class MembershipListCreateView(generics.ListCreateAPIView):
 
     def create(self, request, *args, **kwargs):
         group = self.get_group()
-        if group.admin != request.user:
+        if group.admin_id != request.user.id:
             raise PermissionDenied("Only the group owner can add members.")
         add_ser = MembershipAddByEmailSerializer(data=request.data)
         add_ser.is_valid(raise_exception=True)
-        emails = [User.objects.normalize_email(e).lower() for e in add_ser.validated_data['emails']]
-        users = list(User.objects.filter(email__in=emails))
-        user_by_email = {u.email.lower(): u for u in users}
-        created = []
-        skipped = []
-        for email in emails:
-            u = user_by_email.get(email)
-            if not u:
-                skipped.append({'email': email, 'reason': 'not_found'})
-                continue
-            if Membership.objects.filter(user=u, group=group).exists():
-                skipped.append({'email': email, 'reason': 'already_member'})
-                continue
-            m = Membership.objects.create(user=u, group=group)
-            created.append(MembershipSerializer(m, context={'request': request}).data)
+        emails = member_import.normalize(add_ser.validated_data['emails'])
+        if len(emails) > settings.MEMBER_IMPORT_ASYNC_THRESHOLD:
+            return Response({'job': member_import.start(group, emails)}, status=status.HTTP_202_ACCEPTED)
+        created, skipped = member_import.add_members(group, emails)
+        created = MembershipSerializer(created, many=True, context={'request': request}).data
         return Response({'created': created, 'skipped': skipped}, status=status.HTTP_201_CREATED)
 
+class MemberImportStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, group_id, job_id):
+        job = member_import.get_job(job_id)
+        if not job or job['groupId'] != str(group_id):
+            raise Http404("Import job not found")
+        if not Group.objects.filter(id=group_id, admin=request.user).exists():
+            raise Http404("Import job not found")
+        return Response(job)
+
 class MembershipUpdateView(generics.UpdateAPIView):
     serializer_class = MembershipSerializer
     permission_classes = [IsAuthenticated]
@@ -165,18 +292,12 @@ class MembershipUpdateView(generics.UpdateAPIView):
     def get_queryset(self):
         return Membership.objects.filter(user=self.request.user)
     
+    @transaction.atomic
     def perform_update(self, serializer):
         prev = self.get_object().active_schedule_id
         obj = serializer.save()
         if obj.active_schedule_id != prev:
-            from asgiref.sync import async_to_sync
-            from channels.layers import get_channel_layer
-            layer = get_channel_layer()
-            if layer:
-                async_to_sync(layer.group_send)(
-                    f"group_{obj.group_id}",
-                    {"type": "broadcast", "event": {"type": "availability_changed", "groupId": str(obj.group_id)}},
-                )
+            broadcast_availability_change(obj.group_id)
 
 class MembershipDeleteView(generics.DestroyAPIView):
     serializer_class = MembershipSerializer
@@ -190,30 +311,149 @@ class MembershipDeleteView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         if self.request.user not in [instance.user, instance.group.admin]:
             raise PermissionDenied("Only the user or group admin can remove this membership.")
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
+            bump_availability_version(group_id=instance.group_id)
+
+def with_my_rsvp(queryset, user):
+    mine = GroupEventAttendee.objects.filter(group_event_id=OuterRef('id'), membership__user=user)
+    return queryset.annotate(
+        my_rsvp=Subquery(mine.values('rsvp')[:1]),
+        my_accepted_version=Subquery(mine.values('accepted_version')[:1]),
+    )
+
+class GroupEventListCreateView(generics.ListCreateAPIView):
+    """A group's events; the admin creates them, which invites every member."""
+    serializer_class = GroupEventSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        group = visible_group(self.request.user, self.kwargs['group_id'])
+        return with_my_rsvp(GroupEvent.objects.filter(group=group), self.request.user).order_by('start')
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        group = visible_group(self.request.user, self.kwargs['group_id'])
+        if group.admin_id != self.request.user.id:
+            raise PermissionDenied("Only the group owner can create group events.")
+        group_event = serializer.save(group=group, created_by=self.request.user)
+        group_events.announce(group_event, group_events.sync(group_event), 'created')
+        serializer.instance = with_my_rsvp(GroupEvent.objects.filter(id=group_event.id), self.request.user).get()
+
+class GroupEventDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = GroupEventSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = 'group_event_id'
+    lookup_field = 'id'
+
+    def get_queryset(self):
+        user = self.request.user
+        visible = GroupEvent.objects.filter(Q(group__admin=user) | Q(group__memberships__user=user)).distinct()
+        return with_my_rsvp(visible, user)
+
+    def retrieve(self, request, *args, **kwargs):
+        group_event = self.get_object()
+        attendees = group_event.attendees.select_related('membership__user')
+        for attendee in attendees:
+            attendee.group_event = group_event
+        data = self.get_serializer(group_event).data
+        data['attendees'] = GroupEventAttendeeSerializer(attendees, many=True).data
+        return Response(data)
+
+    def check_admin(self, group_event):
+        if group_event.group.admin_id != self.request.user.id:
+            raise PermissionDenied("Only the group owner can change group events.")
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        self.check_admin(serializer.instance)
+        current = GroupEvent.objects.select_for_update().get(id=serializer.instance.id)
+        data = serializer.validated_data
+        details_changed = any(f in data and data[f] != getattr(current, f) for f in group_events.DETAIL_FIELDS)
+        rescheduled = current.status == GroupEvent.CANCELLED and data.get('status') == GroupEvent.SCHEDULED
+        # A new version asks attendees who accepted an older one to respond again.
+        version = current.version + 1 if details_changed or rescheduled else current.version
+        # Save onto the locked row, not the copy get_object() read before the lock.
+        serializer.instance = current
+        group_event = serializer.save(version=version)
+        group_events.announce(group_event, group_events.sync(group_event, details_changed=details_changed), 'updated')
+        serializer.instance = with_my_rsvp(GroupEvent.objects.filter(id=group_event.id), self.request.user).get()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self.check_admin(instance)
+        group_events.announce(instance, group_events.delete(instance), 'deleted')
+
+class GroupEventRSVPView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request, group_event_id):
+        ser = GroupEventRSVPSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        attendee = (
+            GroupEventAttendee.objects.select_for_update(of=('self',))
+            .select_related('group_event', 'membership', 'personal_event')
+            .filter(group_event_id=group_event_id, membership__user=request.user).first()
+        )
+        if not attendee:
+            raise Http404("Not invited to this group event")
+        touched = group_events.respond(attendee, ser.validated_data['rsvp'])
+        group_events.announce(
+            attendee.group_event, touched, 'rsvp', membershipId=str(attendee.membership_id), rsvp=attendee.rsvp,
+        )
+        return Response(GroupEventAttendeeSerializer(attendee).data)
+
+def availability_params(query_params):
+    """(start, end, step, mode, min_people, engine, fmt) from an availability request's query string."""
+    start_str = query_params.get('start')
+    end_str = query_params.get('end')
+    try:
+        step = int(query_params.get('step', '30'))
+        min_people = int(query_params.get('min_people', '0'))
+    except ValueError:
+        raise ValidationError("step and min_people must be integers")
+    mode = query_params.get('mode', 'active_only')
+    engine = query_params.get('engine', 'auto')
+    fmt = query_params.get('format', FORMAT_SLOTS)
+
+    try:
+        start, end = parse_window(start_str, end_str, step)
+    except ValueError as e:
+        raise ValidationError(str(e))
+    if engine != 'auto' and engine != 'sql' and engine not in ENGINES:
+        raise ValidationError("engine must be one of auto, sql, " + ", ".join(ENGINES))
+    if engine == 'sql' and not availability_sql.supported():
+        raise ValidationError("engine=sql requires PostgreSQL")
+    if fmt not in FORMATS:
+        raise ValidationError("format must be one of " + ", ".join(FORMATS))
+    return start, end, step, mode, min_people, engine, fmt
+
+def availability_payload(step, mode, min_people, total_members, active_ids, missing_ids, grid, all_free_blocks):
+    return {
+        "stepMinutes": step,
+        "mode": mode,
+        "minPeople": min_people,
+        "activeCount": len(active_ids),
+        "totalMembers": total_members,
+        "missingCount": total_members - len(active_ids),
+        "memberCount": len(active_ids),
+        "activeMemberIds": active_ids,
+        "missingMemberIds": missing_ids,
+        **grid,
+        "allFreeBlocks": all_free_blocks
+    }
+
+class SlotFormatNegotiation(DefaultContentNegotiation):
+    """Leaves ?format= to the view (slot encoding) instead of renderer selection."""
+    settings = SimpleNamespace(URL_FORMAT_OVERRIDE=None)
 
 class GroupAvailabilityView(APIView):
     permission_classes = [IsAuthenticated]
+    content_negotiation_class = SlotFormatNegotiation
 
     def get(self, request, group_id):
-        start_str = request.query_params.get('start')
-        end_str = request.query_params.get('end')
-        step = int(request.query_params.get('step', '30'))
-        mode = request.query_params.get('mode', 'active_only')
-        min_people = int(request.query_params.get('min_people', '0'))
-
-        if not start_str or not end_str:
-            raise ValidationError("start and end are required ISO datetimes")
-        start = parse_datetime(start_str)
-        end = parse_datetime(end_str)
-        if start is None or end is None or start >= end:
-            raise ValidationError("Invalid start/end")
-        if timezone.is_naive(start):
-            start = timezone.make_aware(start, dt_timezone.utc)
-        if timezone.is_naive(end):
-            end = timezone.make_aware(end, dt_timezone.utc)
-        if step <= 0 or step > 240:
-            raise ValidationError("step must be 1..240 minutes")
+        start, end, step, mode, min_people, engine, fmt = availability_params(request.query_params)
 
         group = Group.objects.filter(
             Q(id=group_id) & (Q(admin=request.user) | Q(memberships__user=request.user))
@@ -221,86 +461,187 @@ class GroupAvailabilityView(APIView):
         if not group:
             raise PermissionDenied("Not allowed")
 
-        all_members = Membership.objects.filter(group=group).select_related('user', 'active_schedule')
-        actives = all_members.filter(active_schedule__isnull=False)
-        missing = all_members.filter(active_schedule__isnull=True)
-
-        total_members = all_members.count()
-        active_count = actives.count()
-        missing_count = total_members - active_count
+        tag = availability_cache.etag(group.id, group.availability_version, start, end, step, mode, min_people, engine, fmt)
+        headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+        if availability_cache.matches(tag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        body = availability_cache.get(tag)
+        if body is not None:
+            return Response(body, headers=headers)
+
+        t0 = time.perf_counter()
+        active_ids, missing_ids, schedule_ids = [], [], []
+        for mid, sid in Membership.objects.filter(group=group).values_list('id', 'active_schedule_id'):
+            if sid is None:
+                missing_ids.append(mid)
+            else:
+                active_ids.append(mid)
+                schedule_ids.append(sid)
+        total_members = len(active_ids) + len(missing_ids)
+        active_count = len(active_ids)
 
         if active_count == 0:
-            return Response({
-                "stepMinutes": step,
-                "mode": mode,
-                "minPeople": min_people,
-                "activeCount": 0,
-                "totalMembers": total_members,
-                "missingCount": missing_count,
-                "memberCount": 0,
-                "activeMemberIds": [],
-                "missingMemberIds": list(missing.values_list('id', flat=True)),
-                "slots": [],
-                "allFreeBlocks": []
-            })
-
-        schedule_ids = list(actives.values_list('active_schedule_id', flat=True))
-        events = Event.objects.filter(
-            schedule_id__in=schedule_ids,
-            end__gt=start, start__lt=end
-        ).values('schedule_id', 'start', 'end')
-
-        by_sched = {}
-        for e in events:
-            by_sched.setdefault(e['schedule_id'], []).append((e['start'], e['end']))
-
-        slots = []
-        step_delta = timedelta(minutes=step)
-        cursor = start
-        while cursor < end:
-            slot_end = min(cursor + step_delta, end)
-            busy_count = 0
-            for sid in schedule_ids:
-                busy = False
-                for s, ev in by_sched.get(sid, []):
-                    if not (ev <= cursor or s >= slot_end):
-                        busy = True
-                        break
-                if busy:
-                    busy_count += 1
-            available = active_count - busy_count
-            slots.append({
-                "start": cursor.isoformat().replace("+00:00", "Z"),
-                "end": slot_end.isoformat().replace("+00:00", "Z"),
-                "available": available
-            })
-            cursor = slot_end
-
-        all_free_blocks = []
-        curr_start = None
-        last_end = None
-        for s in slots:
-            if s["available"] == active_count:
-                if curr_start is None:
-                    curr_start = s["start"]
-                last_end = s["end"]
+            grid, _ = availability_from_counts(start, end, step, [], 0, fmt=fmt)
+            body = availability_payload(step, mode, min_people, total_members, [], missing_ids, grid, [])
+            availability_cache.put(tag, body)
+            return Response(body, headers=headers)
+
+        cache_stats = {'hits': 0, 'misses': 0}
+        events = None
+        if engine == 'sql' and not availability_sql.has_series(schedule_ids, start, end):
+            counts = availability_sql.busy_counts_sql(start, end, step, schedule_ids)
+            t1 = time.perf_counter()
+            grid, all_free_blocks = availability_from_counts(start, end, step, counts, active_count, fmt=fmt)
+        else:
+            by_sched = busy_cache.window_intervals(schedule_ids, start, end, stats=cache_stats)
+            events = sum(map(len, by_sched.values()))
+            t1 = time.perf_counter()
+            engine = choose_engine(
+                start, end, step, schedule_ids,
+                requested=None if engine in ('auto', 'sql') else engine,
+                min_cells=settings.AVAILABILITY_BITMAP_MIN_CELLS,
+            )
+            grid, all_free_blocks = compute_availability(start, end, step, schedule_ids, by_sched, engine=engine, fmt=fmt)
+        metrics.observe_availability(
+            engine, t1 - t0, time.perf_counter() - t1, slot_count(start, end, step), total_members, events,
+        )
+
+        body = availability_payload(step, mode, min_people, total_members, active_ids, missing_ids, grid, all_free_blocks)
+        availability_cache.put(tag, body)
+        headers["X-Busy-Cache"] = f"hits={cache_stats['hits']} misses={cache_stats['misses']}"
+        return Response(body, headers=headers)
+
+class GroupAvailabilityBatchView(APIView):
+    """Availability for several groups over one window, from one shared busy-interval fetch."""
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = SlotFormatNegotiation
+    max_groups = 100
+
+    def get(self, request):
+        start, end, step, mode, min_people, engine, fmt = availability_params(request.query_params)
+        group_ids = list(dict.fromkeys(g for g in request.query_params.get('ids', '').split(',') if g))
+        if not group_ids:
+            raise ValidationError("ids must list one or more group ids")
+        if len(group_ids) > self.max_groups:
+            raise ValidationError(f"at most {self.max_groups} groups per request")
+        try:
+            versions = dict(
+                Group.objects.filter(id__in=group_ids)
+                .filter(Q(admin=request.user) | Q(memberships__user=request.user))
+                .distinct().values_list('id', 'availability_version')
+            )
+        except DjangoValidationError:
+            raise ValidationError("ids must be group UUIDs")
+        versions = {str(gid): version for gid, version in versions.items()}
+
+        bodies = {}
+        tags = {}
+        for gid, version in versions.items():
+            tags[gid] = availability_cache.etag(gid, version, start, end, step, mode, min_people, engine, fmt)
+            body = availability_cache.get(tags[gid])
+            if body is not None:
+                bodies[gid] = body
+
+        t0 = time.perf_counter()
+        pending = [gid for gid in versions if gid not in bodies]
+        members = {gid: ([], [], []) for gid in pending}
+        for gid, mid, sid in Membership.objects.filter(group_id__in=pending).values_list('group_id', 'id', 'active_schedule_id'):
+            active_ids, missing_ids, schedule_ids = members[str(gid)]
+            if sid is None:
+                missing_ids.append(mid)
+            else:
+                active_ids.append(mid)
+                schedule_ids.append(sid)
+
+        union = list({sid for _, _, schedule_ids in members.values() for sid in schedule_ids})
+        by_sched = busy_cache.window_intervals(union, start, end) if union else {}
+        query_seconds = time.perf_counter() - t0
+        for gid, (active_ids, missing_ids, schedule_ids) in members.items():
+            if schedule_ids:
+                t1 = time.perf_counter()
+                group_engine = choose_engine(
+                    start, end, step, schedule_ids,
+                    requested=None if engine in ('auto', 'sql') else engine,
+                    min_cells=settings.AVAILABILITY_BITMAP_MIN_CELLS,
+                )
+                grid, all_free_blocks = compute_availability(start, end, step, schedule_ids, by_sched, engine=group_engine, fmt=fmt)
+                # The shared fetch is split evenly across the groups it served.
+                metrics.observe_availability(
+                    group_engine, query_seconds / len(members), time.perf_counter() - t1, slot_count(start, end, step),
+                    len(active_ids) + len(missing_ids), sum(len(by_sched[sid]) for sid in set(schedule_ids)),
+                )
             else:
-                if curr_start is not None:
-                    all_free_blocks.append({"start": curr_start, "end": last_end})
-                    curr_start = None
-        if curr_start is not None:
-            all_free_blocks.append({"start": curr_start, "end": last_end})
+                grid, all_free_blocks = availability_from_counts(start, end, step, [], 0, fmt=fmt)
+            bodies[gid] = availability_payload(
+                step, mode, min_people, len(active_ids) + len(missing_ids), active_ids, missing_ids, grid, all_free_blocks,
+            )
+            availability_cache.put(tags[gid], bodies[gid])
+
+        return Response({
+            "groups": {gid: bodies[gid] for gid in group_ids if gid in bodies},
+            "denied": [gid for gid in group_ids if gid not in bodies],
+        })
+
+class GroupSuggestionsView(APIView):
+    permission_classes = [IsAuthenticated]
+    modes = ('active_only', 'all_members')
+    max_limit = 50
+
+    def get(self, request, group_id):
+        params = request.query_params
+        try:
+            duration = int(params.get('duration', ''))
+            step = int(params.get('step', '15'))
+            limit = int(params.get('limit', '5'))
+            min_people = params.get('min_people')
+            min_people = None if min_people in (None, '') else int(min_people)
+        except ValueError:
+            raise ValidationError("duration, step, limit and min_people must be integers")
+        mode = params.get('mode', 'active_only')
+        required = [r for r in params.get('required', '').split(',') if r]
+        try:
+            start, end = parse_window(params.get('start'), params.get('end'), step)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        if not 0 < duration <= 7 * 24 * 60:
+            raise ValidationError("duration must be 1..10080 minutes")
+        if not 0 < limit <= self.max_limit:
+            raise ValidationError(f"limit must be 1..{self.max_limit}")
+        if mode not in self.modes:
+            raise ValidationError("mode must be one of " + ", ".join(self.modes))
+
+        group = Group.objects.filter(
+            Q(id=group_id) & (Q(admin=request.user) | Q(memberships__user=request.user))
+        ).distinct().first()
+        if not group:
+            raise PermissionDenied("Not allowed")
 
+        schedule_by_member = {
+            str(mid): sid for mid, sid in Membership.objects.filter(group=group).values_list('id', 'active_schedule_id')
+        }
+        unknown = [r for r in required if r not in schedule_by_member]
+        if unknown:
+            raise ValidationError("required must list membership ids of this group: " + ", ".join(unknown))
+        active = {mid: sid for mid, sid in schedule_by_member.items() if sid is not None}
+        always_free = [mid for mid in schedule_by_member if mid not in active] if mode == 'all_members' else []
+        if mode == 'active_only' and any(r not in active for r in required):
+            raise ValidationError("required members need an active schedule when mode=active_only")
+        if min_people is None:
+            min_people = max(1, len(required))
+
+        by_sched = busy_cache.window_intervals(list(active.values()), start, end)
+        busy = {mid: by_sched[sid] for mid, sid in active.items()}
+        results = suggestions.find_meeting_times(
+            start, end, timedelta(minutes=duration), step, busy,
+            always_free=always_free, required=set(required), min_people=min_people, limit=limit,
+        )
         return Response({
+            "durationMinutes": duration,
             "stepMinutes": step,
             "mode": mode,
             "minPeople": min_people,
-            "activeCount": active_count,
-            "totalMembers": total_members,
-            "missingCount": missing_count,
-            "memberCount": active_count,
-            "activeMemberIds": list(actives.values_list('id', flat=True)),
-            "missingMemberIds": list(missing.values_list('id', flat=True)),
-            "slots": slots,
-            "allFreeBlocks": all_free_blocks
+            "required": required,
+            "activeCount": len(active),
+            "totalMembers": len(schedule_by_member),
+            "suggestions": results,
         })
@@ -65,6 +65,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.querystats.QueryStatsMiddleware',
+    'api.db_router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -111,10 +114,52 @@ DATABASES = {
         'PORT': os.getenv('POSTGRES_PORT'),
         'OPTIONS': {
             'sslmode': 'disable',
-        }
+        },
+        # Seconds to keep a connection open between uses (0 closes it after
+        # each request or database_sync_to_async call); health checks
+        # re-validate a reused connection before its first query. Under daphne
+        # every HTTP request runs on its own thread, so only the consumers'
+        # calls reuse connections: use DB_POOL for the views (see
+        # `manage.py bench_db_connections`).
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() in ('1', 'true', 'yes'),
     }
 }
 
+# psycopg 3 connection pool per process (DB_POOL=true), shared by the DRF
+# views and the Channels consumers' database_sync_to_async calls. Connections
+# are checked on checkout; requests wait up to DB_POOL_TIMEOUT seconds for one
+# once DB_POOL_MAX_SIZE are in use. Persistent connections are turned off
+# because the pool already keeps them open.
+DB_POOL = os.getenv('DB_POOL', 'false').lower() in ('1', 'true', 'yes')
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'check': ConnectionPool.check_connection,
+    }
+
+# Read replicas: comma-separated hosts sharing the primary's credentials,
+# exposed as the aliases replica_0, replica_1, ... GET requests to
+# REPLICA_READ_VIEWS read from a random replica (api/db_router.py) unless the
+# user wrote something in the last REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = []
+for i, host in enumerate(h for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h):
+    DATABASES[f'replica_{i}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{i}')
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+REPLICA_READ_VIEWS = ('group-availability', 'group-list-create', 'event-list-create')
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,15 +179,91 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            'hosts': [('redis', 6379)],
+            'hosts': [(REDIS_HOST, REDIS_PORT)],
         },
     },
 }
 
+# Shares the channel layer's Redis instance, on a separate logical database.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/1',
+    },
+}
+
+# Per-schedule merged busy intervals (api/busy_cache.py): entries kept in the
+# in-process LRU, and seconds each entry lives in Redis.
+BUSY_CACHE_LRU_SIZE = int(os.getenv('BUSY_CACHE_LRU_SIZE', '2048'))
+BUSY_CACHE_TTL = int(os.getenv('BUSY_CACHE_TTL', '3600'))
+
+# Group availability: requests covering at least this many (schedule x minute)
+# cells are computed with the NumPy bitmap engine instead of the sweep-line one.
+AVAILABILITY_BITMAP_MIN_CELLS = int(os.getenv('AVAILABILITY_BITMAP_MIN_CELLS', '5000000'))
+
+# Recent availability response bodies kept per process, keyed by ETag
+# (api/availability_cache.py). 0 disables the body cache; 304s still work.
+AVAILABILITY_RESULT_CACHE_SIZE = int(os.getenv('AVAILABILITY_RESULT_CACHE_SIZE', '256'))
+
+# When enabled, group sockets may watch an availability window and receive
+# per-slot deltas computed once per change, instead of refetching on every ping.
+AVAILABILITY_PUSH_DELTAS = os.getenv('AVAILABILITY_PUSH_DELTAS', 'false').lower() in ('1', 'true', 'yes')
+# Limits on watched windows: length, distinct windows per group (each one is
+# recomputed on every change) and windows per connection.
+AVAILABILITY_WATCH_MAX_DAYS = int(os.getenv('AVAILABILITY_WATCH_MAX_DAYS', '31'))
+AVAILABILITY_WATCH_MAX_WINDOWS = int(os.getenv('AVAILABILITY_WATCH_MAX_WINDOWS', '32'))
+AVAILABILITY_WATCH_MAX_PER_SOCKET = int(os.getenv('AVAILABILITY_WATCH_MAX_PER_SOCKET', '8'))
+
+# Window (ms) in which repeated schedule/group change notifications are
+# collapsed into one message, sent after commit from a background loop.
+# 0 sends every notification inline, as before. Unset, it is 150 with a Redis
+# channel layer and 0 otherwise: InMemoryChannelLayer cannot be written to from
+# the coalescer's own event loop.
+BROADCAST_COALESCE_MS = int(os.environ['BROADCAST_COALESCE_MS']) if os.getenv('BROADCAST_COALESCE_MS') else None
+
+# Seconds WebSocket connects may reuse a cached user and room permission
+# (api/authcache.py). 0 checks the database on every connect.
+WS_AUTH_CACHE_TTL = int(os.getenv('WS_AUTH_CACHE_TTL', '30'))
+
+# Write realtime notifications to the api_outboxmessage table inside the
+# request's transaction instead of sending them from the request; run
+# `python manage.py relay_outbox` to deliver them.
+REALTIME_OUTBOX = os.getenv('REALTIME_OUTBOX', 'false').lower() in ('1', 'true', 'yes')
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '200'))
+OUTBOX_POLL_MS = int(os.getenv('OUTBOX_POLL_MS', '200'))
+
+# Serve group availability and event listing from the async views in
+# api/async_views.py, which do not hold an ASGI thread while waiting on I/O.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() in ('1', 'true', 'yes')
+
+# Per-request query count and DB time (api/querystats.py): sent as an
+# X-DB-Queries response header when enabled, and logged as a warning above
+# QUERY_COUNT_WARN queries. The header is off unless asked for, since DEBUG is
+# on in this file.
+QUERY_STATS_HEADER = os.getenv('QUERY_STATS_HEADER', 'false').lower() in ('1', 'true', 'yes')
+QUERY_COUNT_WARN = int(os.getenv('QUERY_COUNT_WARN', '50'))
+
+# Member adds with more emails than this run as a background job (202 plus
+# progress events on the group's WebSocket room) on up to
+# MEMBER_IMPORT_WORKERS threads per process.
+MEMBER_IMPORT_ASYNC_THRESHOLD = int(os.getenv('MEMBER_IMPORT_ASYNC_THRESHOLD', '500'))
+MEMBER_IMPORT_WORKERS = int(os.getenv('MEMBER_IMPORT_WORKERS', '2'))
+# A job not heard from for this long (its process restarted) reads as failed.
+MEMBER_IMPORT_STALE_SECONDS = int(os.getenv('MEMBER_IMPORT_STALE_SECONDS', '300'))
+
+# Prometheus text metrics for this process at /metrics (api/metrics.py), off
+# unless METRICS_ENABLED is set. Set METRICS_TOKEN to require "Authorization:
+# Bearer <token>" on scrapes.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
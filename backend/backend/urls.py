@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
+from api.metrics import metrics_view
 
 def home(request):
     return HttpResponse('Hello, World!')
@@ -8,6 +9,7 @@ def home(request):
 urlpatterns = [
     path('', home),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),
     path('api/', include('api.urls')),
     path('api-auth/', include('rest_framework.urls'))
 ]
@@ -19,13 +19,12 @@ export function useGroupAvailability(groupId, rangeStart, rangeEnd, stepMinutes
       step: String(stepMinutes),
       mode,
       min_people: String(minPeople),
-      _: String(Date.now()),
     });
     setLoading(true);
     try {
-      const res = await api.get(`/api/groups/${groupId}/availability/?${params.toString()}`, {
-        headers: { 'Cache-Control': 'no-cache' },
-      });
+      // The server sends an ETag with Cache-Control: no-cache, so the browser
+      // revalidates each time and reuses its copy on 304.
+      const res = await api.get(`/api/groups/${groupId}/availability/?${params.toString()}`);
       setData(res.data);
     } catch {
       setData({ slots: [], activeCount: 0, totalMembers: 0, missingCount: 0, stepMinutes, mode, minPeople });